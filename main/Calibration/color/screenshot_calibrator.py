@@ -6,15 +6,27 @@ using screenshots with highlighted borders. It detects the orange highlights
 and calculates the grid parameters automatically.
 
 Uses the utilities from utils.calibration.vision for detection and configuration.
+
+Captures are submitted to a background worker thread. The worker streams
+its progress, a preview of the detected grid and the result through a queue
+that the Tk main loop drains with after(), so only the main thread touches
+the widgets and the window stays responsive while the fallback cascade runs.
+
+Performance considerations:
+- The preview is downscaled and drawn by the worker, then handed to Tk as
+  PPM bytes in memory; nothing is read from or written to debug/
+- The keyboard listener only queues a request, it never calls Tk
 """
 
 import os
 import sys
-import tkinter as tk
-from tkinter import ttk, messagebox
-import json
+import queue
 import threading
-import time
+import traceback
+import tkinter as tk
+from tkinter import ttk
+import numpy as np
+import cv2
 from pynput.keyboard import Key, Listener
 
 # Get the absolute path to the project root directory
@@ -22,7 +34,9 @@ project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '../../..
 sys.path.insert(0, project_root)
 
 # Import utilities
-from utils.calibration.vision import take_screenshot, detect_inventory_slots, save_debug_image
+from utils.calibration.vision import take_screenshot, detect_inventory_slots
+from utils.vision.window import client_quadrant
+from utils.vision.drift import save_drift_reference
 from utils.calibration.config import (
     load_inventory_config, 
     save_inventory_config, 
@@ -30,6 +44,46 @@ from utils.calibration.config import (
     DEFAULT_INVENTORY_CONFIG
 )
 
+# GUI settings
+POLL_INTERVAL_MS = 50          # Milliseconds between queue checks in the main loop
+PREVIEW_MAX_SIZE = (440, 260)  # Largest preview width and height
+
+# Progress bar values of the calibration steps, detection fills the range between
+PROGRESS_CAPTURE = 10
+PROGRESS_DETECT = 20
+PROGRESS_PREVIEW = 95
+
+def preview_ppm(image, result=None, offset=(0, 0), max_size=PREVIEW_MAX_SIZE):
+    """
+    Downscale a capture, draw the detected grid on it and encode it for Tk.
+    
+    Args:
+        image (numpy.ndarray): BGR or BGRA capture
+        result (dict, optional): Detection result with slot_centers in screen coordinates
+        offset (tuple): (left, top) screen position of the capture
+        max_size (tuple): Largest preview width and height
+        
+    Returns:
+        bytes: Binary PPM image, accepted by tk.PhotoImage(data=...)
+    """
+    height, width = image.shape[:2]
+    scale = min(max_size[0] / width, max_size[1] / height, 1.0)
+    size = (max(1, int(width * scale)), max(1, int(height * scale)))
+    preview = cv2.resize(np.ascontiguousarray(image[..., :3]), size,
+                         interpolation=cv2.INTER_AREA)
+    
+    if result and not result.get('using_defaults') and result.get('slot_centers'):
+        half_w = max(1, int(round(result['x_spacing'] * scale / 2)))
+        half_h = max(1, int(round(result['y_spacing'] * scale / 2)))
+        centers = (np.asarray(result['slot_centers']) - offset) * scale
+        for x, y in np.rint(centers).astype(int):
+            cv2.rectangle(preview, (x - half_w, y - half_h), (x + half_w, y + half_h),
+                          (0, 0, 255), 1)
+            cv2.circle(preview, (x, y), 2, (0, 255, 0), -1)
+    
+    rgb = cv2.cvtColor(preview, cv2.COLOR_BGR2RGB)
+    return b"P6\n%d %d\n255\n" % size + rgb.tobytes()
+
 class ScreenshotCalibratorGUI(tk.Tk):
     """
     GUI for the screenshot-based calibration tool.
@@ -43,7 +97,7 @@ class ScreenshotCalibratorGUI(tk.Tk):
         
         # Window setup
         self.title("Inventory Screenshot Calibrator")
-        self.geometry("500x500")  # Increased height for new buttons
+        self.geometry("500x800")  # Room for the preview
         
         # Configure style
         self.style = ttk.Style()
@@ -134,6 +188,11 @@ class ScreenshotCalibratorGUI(tk.Tk):
         )
         self.detected_slots_label.pack(anchor=tk.W)
         
+        # Preview of the capture with the detected grid
+        self.preview_label = ttk.Label(self.results_frame)
+        self.preview_label.pack(pady=(10, 0))
+        self.preview_image = None  # Keeps the PhotoImage alive while shown
+        
         # Current config frame
         self.current_config_frame = ttk.LabelFrame(
             self.main_frame,
@@ -188,15 +247,6 @@ class ScreenshotCalibratorGUI(tk.Tk):
         )
         self.revert_btn.pack(side=tk.LEFT, padx=5)
         
-        # View debug button - Initially disabled
-        self.debug_btn = ttk.Button(
-            self.button_frame,
-            text="View Debug Images",
-            command=self.view_debug_images,
-            state=tk.DISABLED
-        )
-        self.debug_btn.pack(side=tk.LEFT, padx=5)
-        
         # Bottom button frame
         self.bottom_button_frame = ttk.Frame(self.main_frame)
         self.bottom_button_frame.pack(pady=5)
@@ -209,91 +259,134 @@ class ScreenshotCalibratorGUI(tk.Tk):
         )
         self.close_btn.pack()
         
-        # Calibration thread and results
-        self.calibration_thread = None
+        # Calibration results
         self.calibration_results = None
         self.screenshot = None
+        self.screenshot_origin = None
+        
+        # Captures go to the worker through jobs, everything it reports comes back
+        # through messages, which the main loop drains in poll_messages()
+        self.jobs = queue.Queue()
+        self.messages = queue.Queue()
+        self.worker = threading.Thread(target=self.calibration_worker, name="CalibrationWorker")
+        self.worker.daemon = True
+        self.worker.start()
+        
+        # Flag to prevent multiple screenshots while processing (main thread only)
+        self.processing = False
         
         # Set up keyboard listener for LEFT CTRL
         self.keyboard_listener = Listener(on_press=self.on_key_press)
         self.keyboard_listener.start()
         
-        # Flag to prevent multiple screenshots while processing
-        self.processing = False
+        self.after(POLL_INTERVAL_MS, self.poll_messages)
     
     def on_key_press(self, key):
         """Handle key press events, looking for LEFT CTRL to trigger screenshot."""
-        if key == Key.ctrl_l and not self.processing:
-            self.start_calibration()
+        # Runs on the listener thread, so only queue the request for the main loop
+        if key == Key.ctrl_l:
+            self.messages.put(('capture',))
     
     def start_calibration(self):
-        """Start the calibration process in a separate thread."""
+        """Submit a capture to the calibration worker."""
         if self.processing:
             return
             
         self.processing = True
         self.save_btn.configure(state=tk.DISABLED)
         self.revert_btn.configure(state=tk.DISABLED)
-        self.debug_btn.configure(state=tk.DISABLED)
         self.close_btn.configure(state=tk.DISABLED)
         
         self.status_label.configure(text="Taking screenshot now...")
-        self.update_progress(10)
+        self.progress["value"] = PROGRESS_CAPTURE
         self.save_status_label.configure(text="")
         
-        # Start calibration in a separate thread
-        self.calibration_thread = threading.Thread(target=self.perform_calibration)
-        self.calibration_thread.daemon = True
-        self.calibration_thread.start()
-        
-        # Check thread status periodically
-        self.after(100, self.check_calibration)
+        self.jobs.put(client_quadrant())
     
-    def perform_calibration(self):
-        """Perform the actual calibration."""
-        try:
-            # Take screenshot and save for debugging
-            self.update_progress_threadsafe(20)
-            self.screenshot = take_screenshot()
-            
-            if self.screenshot is None:
-                self.update_status_threadsafe("Error: Failed to take screenshot")
+    def calibration_worker(self):
+        """Worker loop: capture and detect each submitted region, never touching Tk."""
+        while True:
+            region = self.jobs.get()
+            if region is None:
                 return
-                
-            self.update_progress_threadsafe(40)
-            save_debug_image(self.screenshot, "screenshot.png")
-            
-            # Detect inventory slots
-            self.update_status_threadsafe("Detecting inventory slots...")
-            self.calibration_results = detect_inventory_slots(self.screenshot)
-            
-            self.update_progress_threadsafe(100)
-            
-            if self.calibration_results:
-                self.update_status_threadsafe("Detection successful! Review results before saving.")
-            else:
-                self.update_status_threadsafe("Detection failed. Check debug images for details.")
-                
-        except Exception as e:
-            self.update_status_threadsafe(f"Error: {str(e)}")
-            import traceback
-            traceback.print_exc()
+            try:
+                self.perform_calibration(region)
+            except Exception as e:
+                traceback.print_exc()
+                self.messages.put(('status', f"Error: {str(e)}"))
+            finally:
+                self.messages.put(('done',))
     
-    def check_calibration(self):
-        """Check if the calibration thread has finished."""
-        if self.calibration_thread and not self.calibration_thread.is_alive():
-            self.calibration_thread = None
-            self.close_btn.configure(state=tk.NORMAL)
-            self.revert_btn.configure(state=tk.NORMAL)
-            self.processing = False
-            
-            if self.calibration_results:
-                self.save_btn.configure(state=tk.NORMAL)
-                self.debug_btn.configure(state=tk.NORMAL)
-                self.update_results()
-            
+    def perform_calibration(self, region):
+        """
+        Capture a region and detect the inventory grid in it (worker thread).
+        
+        Args:
+            region (tuple): (left, top, width, height), the bottom right quadrant of the client
+        """
+        screenshot = take_screenshot(region)
+        if screenshot is None:
+            self.messages.put(('status', "Error: Failed to take screenshot"))
+            return
+        offset = region[:2]
+        self.messages.put(('preview', preview_ppm(screenshot)))
+        self.messages.put(('progress', PROGRESS_DETECT, "Detecting inventory slots..."))
+        
+        def report(stage, fraction, found):
+            value = PROGRESS_DETECT + fraction * (PROGRESS_PREVIEW - PROGRESS_DETECT)
+            self.messages.put(('progress', value, f"Detecting inventory slots: {stage}, "
+                                                  f"{found} found"))
+        
+        results = detect_inventory_slots(screenshot, offset=offset, progress=report)
+        self.messages.put(('preview', preview_ppm(screenshot, results, offset)))
+        self.messages.put(('result', results, screenshot, offset))
+    
+    def poll_messages(self):
+        """Apply everything the worker and the keyboard listener queued (main thread)."""
+        try:
+            while True:
+                message = self.messages.get_nowait()
+                kind = message[0]
+                if kind == 'capture':
+                    self.start_calibration()
+                elif kind == 'progress':
+                    self.progress["value"] = message[1]
+                    self.status_label.configure(text=message[2])
+                elif kind == 'status':
+                    self.status_label.configure(text=message[1])
+                elif kind == 'preview':
+                    self.show_preview(message[1])
+                elif kind == 'result':
+                    self.finish_calibration(*message[1:])
+                elif kind == 'done':
+                    self.processing = False
+                    self.close_btn.configure(state=tk.NORMAL)
+                    self.revert_btn.configure(state=tk.NORMAL)
+        except queue.Empty:
+            pass
+        self.after(POLL_INTERVAL_MS, self.poll_messages)
+    
+    def show_preview(self, data):
+        """Show a preview encoded by preview_ppm()."""
+        self.preview_image = tk.PhotoImage(data=data)
+        self.preview_label.configure(image=self.preview_image)
+    
+    def finish_calibration(self, results, screenshot, offset):
+        """Show a detection result from the worker."""
+        self.progress["value"] = 100
+        self.calibration_results = results
+        self.screenshot = screenshot
+        self.screenshot_origin = offset
+        
+        if not results:
+            self.status_label.configure(text="Detection failed. Check the preview for details.")
+            return
+        if results.get('using_defaults', False):
+            self.status_label.configure(text="Detection failed, defaults shown. Check the preview.")
         else:
-            self.after(100, self.check_calibration)
+            self.status_label.configure(text="Detection successful! Review results before saving.")
+        self.save_btn.configure(state=tk.NORMAL)
+        self.update_results()
     
     def update_results(self):
         """Update the results display with calibration data."""
@@ -333,6 +426,10 @@ class ScreenshotCalibratorGUI(tk.Tk):
                     style="Success.TLabel"
                 )
                 
+                # Reference patches let running bots detect a moved client
+                if not self.calibration_results.get('using_defaults', False):
+                    save_drift_reference(config_to_save, self.screenshot, self.screenshot_origin)
+                
                 # Update current config display
                 self.current_config = config_to_save
                 self.current_base_label.configure(
@@ -383,43 +480,13 @@ class ScreenshotCalibratorGUI(tk.Tk):
                 style="Warning.TLabel"
             )
     
-    def update_progress(self, value):
-        """Update the progress bar."""
-        self.progress["value"] = value
-        self.update_idletasks()
-    
-    def update_status_threadsafe(self, text):
-        """Update the status label from a non-main thread."""
-        self.after(0, lambda: self.status_label.configure(text=text))
-        
-    def update_progress_threadsafe(self, value):
-        """Update the progress bar from a non-main thread."""
-        self.after(0, lambda: self.update_progress(value))
-    
-    def view_debug_images(self):
-        """Open debug images in the default image viewer."""
-        try:
-            debug_dir = os.path.join(project_root, 'debug')
-            
-            # Just open the directory in explorer for now
-            if sys.platform == 'win32':
-                os.startfile(debug_dir)
-            elif sys.platform == 'darwin':
-                import subprocess
-                subprocess.Popen(['open', debug_dir])
-            else:
-                import subprocess
-                subprocess.Popen(['xdg-open', debug_dir])
-                
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to open debug images: {str(e)}")
-    
     def quit(self):
         """Clean up and exit."""
         try:
-            # Stop the keyboard listener
+            # Stop the keyboard listener and the worker
             if hasattr(self, 'keyboard_listener'):
                 self.keyboard_listener.stop()
+            self.jobs.put(None)
         finally:
             super().quit()
 
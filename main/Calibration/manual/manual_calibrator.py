@@ -25,7 +25,6 @@ import tkinter as tk
 from tkinter import ttk, messagebox
 import random as rnd
 from pynput.keyboard import Listener, Key
-import json
 
 try:
     # Get the absolute path to the project root directory
@@ -38,6 +37,7 @@ try:
     from utils.movements import bezierMove  # Available for potential future click movement
     from utils.clicker import click  # Available for potential future click actions
     from utils.item_slots import inv_slot  # Reference for coordinate system
+    from utils.calibration.config import save_inventory_config
 
     # Global control variables - available for future integration with hotkey system
     running = False  # Controls bot operation state
@@ -261,12 +261,9 @@ try:
                     'y_spacing': y_spacing
                 }
                 
-                # Ensure config directory exists
-                os.makedirs(os.path.dirname(CONFIG_FILE), exist_ok=True)
-                
-                # Save to file
-                with open(CONFIG_FILE, 'w') as f:
-                    json.dump(config, f, indent=4)
+                # Save to file, recorded as the profile of the current display setup
+                if not save_inventory_config(config):
+                    raise IOError(f"could not write {CONFIG_FILE}")
                 
                 print(f"Calibration saved to {CONFIG_FILE}")
                 self.status_label.config(text="Calibration saved!")
@@ -19,9 +19,27 @@ from utils.movements import *
 from utils.clicker import *
 from utils.item_slots import *
 from utils.gui.base_gui import BaseGUI
+from utils.vision.watcher import wait_for_change
 
 welcome()
 
+def ore_point(name, x1, x2, y1, y2):
+    """
+    Pick a random point in an ore's click box.
+
+    The boxes are tuned for the default layout and follow moves of the client
+    window, see ui_box().
+
+    Args:
+        name: Template name of the ore
+        x1, x2, y1, y2: Default click box
+
+    Returns:
+        tuple: (x, y) on the screen
+    """
+    x1, x2, y1, y2 = ui_box(name, x1, x2, y1, y2)
+    return rnd.randint(x1, x2), rnd.randint(y1, y2)
+
 #------------------------------------------------------------------------------------------------------------------------------------------------------------------------
 # Iron Miner Bot GUI
 #------------------------------------------------------------------------------------------------------------------------------------------------------------------------
@@ -85,6 +103,13 @@ def Timebot():
         if (rnd.random() > 0.917):
             Notbotting()
 
+def inventory_full(dug):
+    """Check for a full inventory on screen, falling back to the ore count without capture."""
+    count = inv_count()
+    if count is None:
+        return dug >= 26
+    return count >= 28
+
 def walker(gui):
     """Walker implementation for iron mining with human-like behavior.
     Walks between three iron ore spots, mining and dropping inventory when full."""
@@ -94,9 +119,9 @@ def walker(gui):
         while gui.running:
             if rnd.random() > 0.02:  # 95% chance to execute the ore mining
                 # Ore 1 (Top ore)
-                bezierMove(rnd.randint(933,983), rnd.randint(361, 421), rnd.random() * 0.281 + 0.88913)
+                bezierMove(*ore_point('iron_ore_top', 933, 983, 361, 421), rnd.random() * 0.281 + 0.88913)
                 if (rnd.random() > 0.388):
-                    bezierMove(rnd.randint(936,983), rnd.randint(381, 425), rnd.random() * 0.081 + 0.418913)
+                    bezierMove(*ore_point('iron_ore_top', 936, 983, 381, 425), rnd.random() * 0.081 + 0.418913)
                 sleep(.3,.1,.1)
                 if rnd.random() > 0.5:
                     sleep(.1,.1,.2)
@@ -106,7 +131,8 @@ def walker(gui):
                     gui.append_message("Nice double click!")
                     if rnd.random() > 0.97:
                         click()
-                time.sleep(rnd.random() *0.28 + 0.661)
+                # Continue as soon as the ore lands in the inventory (at most the old wait)
+                wait_for_change(inv_region(), timeout=rnd.random() *0.28 + 0.661)
                 sleep(.3,.2,.2)
                 if rnd.random() > 0.97:
                     sleep(.3, 4, 2)
@@ -116,7 +142,7 @@ def walker(gui):
                 gui.walk_count += 1
                 gui.append_message(f"Mined ore {dug}/26 (Total: {gui.walk_count})")
                 
-                if dug == 26:
+                if inventory_full(dug):
                     if rnd.random() > 0.412:
                         drop_inventory(rnd.randint(23, 27))
                     else:
@@ -134,9 +160,9 @@ def walker(gui):
 
             if rnd.random() > 0.02:  # 95% chance to execute the ore mining
                 # Ore 2 (middle ore)
-                bezierMove(rnd.randint(685, 765), rnd.randint(595, 645), rnd.random() * 0.2832 + 0.881)
+                bezierMove(*ore_point('iron_ore_middle', 685, 765, 595, 645), rnd.random() * 0.2832 + 0.881)
                 if (rnd.random() > 0.381):
-                    bezierMove(rnd.randint(695, 775), rnd.randint(595, 645), rnd.random() * 0.081 + 0.418913)
+                    bezierMove(*ore_point('iron_ore_middle', 695, 775, 595, 645), rnd.random() * 0.081 + 0.418913)
                 time.sleep(rnd.random() *0.381 + 0.683)
                 if rnd.random() > 0.5:
                     sleep(.2,.1,.2)
@@ -145,14 +171,14 @@ def walker(gui):
                     click()
                     gui.append_message("Nice double click!")
                 Timebot()
-                time.sleep(rnd.random() *0.36 + 0.651)
+                wait_for_change(inv_region(), timeout=rnd.random() *0.36 + 0.651)
                 if rnd.random() > 0.97:
                     sleep(.3, 4, 2)
                 dug += 1
                 gui.walk_count += 1
                 gui.append_message(f"Mined ore {dug}/26 (Total: {gui.walk_count})")
                 
-                if dug == 26:
+                if inventory_full(dug):
                     if rnd.random() > 0.112:
                         drop_inventory(25)
                     else:
@@ -170,9 +196,9 @@ def walker(gui):
 
             if rnd.random() > 0.02:  # 95% chance to execute the ore mining
                 # Ore 3 (Bottom ore)
-                bezierMove(rnd.randint(909, 960), rnd.randint(765, 835), rnd.random() * 0.281 + 0.889111)
+                bezierMove(*ore_point('iron_ore_bottom', 909, 960, 765, 835), rnd.random() * 0.281 + 0.889111)
                 if (rnd.random() > 0.381):
-                    bezierMove(rnd.randint(897, 963), rnd.randint(765, 835), rnd.random() * 0.081 + 0.4118913)
+                    bezierMove(*ore_point('iron_ore_bottom', 897, 963, 765, 835), rnd.random() * 0.081 + 0.4118913)
                 time.sleep(rnd.random() *0.51 + 0.513)
                 click()
                 if rnd.random() > 0.5:
@@ -180,7 +206,7 @@ def walker(gui):
                 if (rnd.random() > 0.939):
                     click()
                     gui.append_message("Nice double click!")
-                time.sleep(rnd.random() *0.61 + 0.631)
+                wait_for_change(inv_region(), timeout=rnd.random() *0.61 + 0.631)
                 if rnd.random() > 0.97:
                     sleep(.3, 4, 2)
                 Timebot()
@@ -193,7 +219,7 @@ def walker(gui):
                     sleep(1, 7)
                     Notbotting()
 
-            if dug == 26:
+            if inventory_full(dug):
                 if rnd.random() > 0.112:
                     drop_inventory(25)
                 else:
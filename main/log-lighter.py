@@ -17,9 +17,21 @@ from utils.movements import *
 from utils.clicker import *
 from utils.item_slots import *
 from utils.gui.base_gui import BaseGUI
+from utils.vision.watcher import wait_until_done
+
+# Screen states need screen capture, walkers keep their fixed waits without it
+try:
+    from utils.vision.states import wait_for_state
+except ImportError:
+    wait_for_state = None
 
 welcome()
 
+# Seconds without an inventory change that end the wait for the logs to burn:
+# longer than the slowest normal gap, i.e. a few failed lights in a row plus
+# stepping to the next tile when the current one already has a fire
+BURN_STABLE_FOR = 12.0
+
 #------------------------------------------------------------------------------------------------------------------------------------------------------------------------
 # Fire Burner Bot
 #------------------------------------------------------------------------------------------------------------------------------------------------------------------------
@@ -50,15 +62,28 @@ def burn_logs(gui):
             gui.append_message("Starting Fire Burning Sequence")
             
             # Click bank
-            bezier_between(1166, 1252, 498, 572)
+            bezier_to('fire_bank', 1166, 1252, 498, 572)
             sleep(.5, 2)
             click()
             sleep()
             if rnd.random() > 0.813:
                 sleep(0, 3)
+            # Wait for the bank to open, click it once more if it did not, and
+            # stop rather than withdraw blind if it still is not open
+            opened = None if wait_for_state is None else wait_for_state('bank_open', timeout=10)
+            if opened is False:
+                gui.append_message("Bank did not open, clicking it again")
+                bezier_to('fire_bank', 1166, 1252, 498, 572)
+                sleep(.5, 1)
+                click()
+                opened = wait_for_state('bank_open', timeout=10)
+            if opened is False:
+                gui.running = False
+                gui.append_message("Bank still not open. Stopping bot.")
+                break
 
             # Get logs
-            bank_slot(8)
+            bank_slot(item_slot('logs', 'bank', 8))
             sleep()
             get_x_items()
             sleep()
@@ -68,7 +93,7 @@ def burn_logs(gui):
                 sleep(0, 3)
 
             # Light fire
-            bezier_between(935, 955, 808, 869)
+            bezier_to('fire_spot', 935, 955, 808, 869)
             sleep(0.5, 1)
             click()
             sleep(2, 2)
@@ -80,8 +105,11 @@ def burn_logs(gui):
                     sleep()
                     spacekey()
 
-            # Wait for fire to burn out
-            sleep(60, 9)
+            # Wait for fire to burn out: logs leave the inventory one by one, so
+            # continue once it stops changing (at most the old fixed wait)
+            if wait_until_done(inv_region(), timeout=60 + rnd.random() * 9,
+                               stable_for=BURN_STABLE_FOR):
+                gui.append_message("Logs burned early, moving on")
 
             sleep()
             if rnd.random() > 0.9:
@@ -18,6 +18,18 @@ from utils.clicker import *
 from utils.item_slots import *
 from utils.gui.base_gui import BaseGUI
 
+# Reading the absorption counter needs screen capture, the timer works without it
+try:
+    from utils.vision.digits import read_counter
+except ImportError:
+    read_counter = None
+
+ABSORPTION_COUNTER = 'absorption'  # Counter name, set up with python -m utils.vision.digits
+ABSORPTION_MIN = 200               # Sip absorption early below this many points
+ABSORPTION_RECHECK = 10            # Seconds between early sips, the counter needs time to update
+ABSORPTION_SLOTS = (9, 28)         # First and last inventory slot holding absorption potions
+ABSORPTION_DOSES = 4               # Sips per absorption potion
+
 welcome()
 
 class NMZGUI(BaseGUI):
@@ -37,6 +49,27 @@ class NMZGUI(BaseGUI):
         self.max_walks_entry.configure(bg=self.text_box_bg, fg=self.text_box_fg,
                                      insertbackground=self.text_box_fg)
 
+def sip_absorption(gui, potions, message):
+    """
+    Sip the current absorption potion and move on to the next slot once it is empty.
+
+    Args:
+        gui: Bot GUI the message is shown in
+        potions (dict): Absorption tracking, 'slot' in use and 'sips' taken from it
+        message (str): Message to show, {slot} is replaced by the slot sipped from
+    """
+    gui.append_message(message.format(slot=potions['slot']))
+    inv_slot(potions['slot'])
+    sleep(.5, 1)
+    click()  # Perform a click after moving to the absorption slot
+
+    potions['sips'] += 1
+    if potions['sips'] >= ABSORPTION_DOSES:
+        potions['sips'] = 0
+        potions['slot'] += 1
+        if potions['slot'] > ABSORPTION_SLOTS[1]:
+            potions['slot'] = ABSORPTION_SLOTS[0]
+
 def walker(gui):
     """Walker implementation for NMZ (Nightmare Zone) automation.
     Handles overload and absorption potion sipping with rock cake usage."""
@@ -50,9 +83,9 @@ def walker(gui):
         overload_sip_count = 0  # Track how many sips from current slot
         true_overload_sip_count = 0
         
-        # Absorption tracking
-        current_absorption_slot = 9  # Track which absorption slot we're using (9-28)
-        absorption_sip_count = 0  # Track how many sips from current slot
+        # Absorption tracking, shared by the timed and the early sips
+        absorption_potions = {'slot': ABSORPTION_SLOTS[0], 'sips': 0}
+        last_absorption_time = 0  # Track last early absorption sip
         
         while gui.running:
             current_time = time.time()
@@ -75,34 +108,18 @@ def walker(gui):
                         current_overload_slot = 1
                 
                 # Take absorption sip (twice with a 2-second rest in between)
-                gui.append_message(f"Taking first absorption sip from slot {current_absorption_slot}")
-                inv_slot(current_absorption_slot)
-                sleep(.5, 1)
-                click()  # Perform a click after moving to the absorption slot
+                sip_absorption(gui, absorption_potions, "Taking first absorption sip from slot {slot}")
                 sleep(.5, 2)  # Rest at least 2 seconds before the second sip
-                
-                # Update absorption slot counter
-                absorption_sip_count += 1
-                if absorption_sip_count >= 4:
-                    current_absorption_slot += 1
-                    absorption_sip_count = 0
-                    if current_absorption_slot > 28:
-                        current_absorption_slot = 9
-
-                gui.append_message(f"Taking second absorption sip from slot {current_absorption_slot}")
-                inv_slot(current_absorption_slot)
-                sleep(.5, 1)
-                click()  # Perform a click after moving to the absorption slot
-                
+                sip_absorption(gui, absorption_potions, "Taking second absorption sip from slot {slot}")
+
                 last_potion_time = current_time
-                
-                # Update absorption slot counter
-                absorption_sip_count += 1
-                if absorption_sip_count >= 4:
-                    current_absorption_slot += 1
-                    absorption_sip_count = 0
-                    if current_absorption_slot > 28:
-                        current_absorption_slot = 9
+
+            # Top up absorption early when the counter is readable and low
+            absorption = read_counter(ABSORPTION_COUNTER) if read_counter else None
+            if (absorption is not None and absorption < ABSORPTION_MIN
+                    and current_time - last_absorption_time >= ABSORPTION_RECHECK):
+                sip_absorption(gui, absorption_potions, f"Absorption at {absorption}, sipping from slot {{slot}}")
+                last_absorption_time = current_time
 
             # Handle rock slot (every minute)
             if current_time - last_rock_time >= 60:
@@ -18,6 +18,13 @@ from utils.movements import *
 from utils.clicker import *
 from utils.item_slots import *
 from utils.gui.base_gui import BaseGUI
+from utils.vision.watcher import wait_until_done
+
+# Screen states need screen capture, walkers keep their fixed waits without it
+try:
+    from utils.vision.states import wait_for_state
+except ImportError:
+    wait_for_state = None
 
 welcome()
 
@@ -27,6 +34,11 @@ running_lock = threading.Lock()
 bot_thread = None  # Track the bot thread globally
 loops = 0  # Keep track of loops in the bot logic
 
+# Seconds without an inventory change that end the wait for the smithing:
+# longer than the slowest normal gap, i.e. one multi-bar item (up to 5 ticks)
+# with a lagging client, so only a stop or level-up dialog ends it early
+SMITH_STABLE_FOR = 10.0
+
 class SmitherGUI(BaseGUI):
     def __init__(self):
         super().__init__(bot_name="Smither Bot", bot_function=self.walker)
@@ -40,18 +52,32 @@ class SmitherGUI(BaseGUI):
 
             sleep(1, 1)
             gui.append_message("Starting Smithing Sequence")
-            bezier_between(886, 893, 281, 289) #clicking on the bank is slightly off
+            bezier_to('smith_bank', 886, 893, 281, 289) #clicking on the bank is slightly off
             sleep(.5, 2)
             click()
             sleep()
             if rnd.random() > 0.843:
                 sleep(0,3)
 
-            sleep(4, 3)
+            # Continue as soon as the bank is open, or wait out the walk without
+            # references. Click the bank once more if it did not open, and stop
+            # rather than withdraw blind if it still is not open
+            opened = None if wait_for_state is None else wait_for_state('bank_open', timeout=10)
+            if opened is None:
+                sleep(4, 3)
+            elif not opened:
+                gui.append_message("Bank did not open, clicking it again")
+                bezier_to('smith_bank', 886, 893, 281, 289)
+                sleep(.5, 1)
+                click()
+                if not wait_for_state('bank_open', timeout=10):
+                    gui.append_message("Bank still not open. Stopping bot.")
+                    self.running = False
+                    break
             if rnd.random() > 0.913:
                 Notbotting()
 
-            bank_slot(8)
+            bank_slot(item_slot('smith_bars', 'bank', 8))
             sleep()
             get_x_items()
             sleep()
@@ -62,7 +88,7 @@ class SmitherGUI(BaseGUI):
             if rnd.random() > 0.813:
                 sleep(0,3)
 
-            bezier_between(1065, 1075, 894, 910)
+            bezier_to('smith_station', 1065, 1075, 894, 910)
             sleep(0.2, 1)
             click()
             sleep(3.9, 2.5)
@@ -81,7 +107,10 @@ class SmitherGUI(BaseGUI):
                     spacekey()
 
             Notbotting()
-            sleep(65, 9, 7)
+            # Wait until the inventory stops changing (at most the old fixed wait)
+            if wait_until_done(inv_region(), timeout=65 + rnd.random() * 9 + rnd.random() * 7,
+                               stable_for=SMITH_STABLE_FOR):
+                gui.append_message("Smithing finished early, moving on")
             if rnd.random() > 0.813:
                 sleep(0,18)
 
@@ -22,15 +22,20 @@ def main():
     print("============================")
     print("\nAvailable tests:")
     print("1. Screenshot-based Calibration Test")
-    print("2. Exit")
+    print("2. Lattice Fit Regression Test")
+    print("3. Exit")
     
-    choice = input("\nEnter your choice (1-2): ")
+    choice = input("\nEnter your choice (1-3): ")
     
     if choice == "1":
         print("\nRunning Screenshot Calibration Test...")
         # Import and run the screenshot test
         import tests.calibration.test_screenshot_calibration as screenshot_test
         screenshot_test.main()
+    elif choice == "2":
+        print("\nRunning Lattice Fit Regression Test...")
+        import tests.calibration.test_lattice_fit as lattice_test
+        sys.exit(1 if lattice_test.main() else 0)
     else:
         print("\nExiting...")
         sys.exit(0)
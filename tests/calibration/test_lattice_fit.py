@@ -0,0 +1,78 @@
+#!/usr/bin/env python
+"""
+Lattice Fit Regression Test
+
+This script checks that fit_lattice() finds the real 4x7 inventory grid when
+stray blobs line up with the lattice outside of it, e.g. a highlighted item
+two columns left of the inventory. Such a stray used to anchor the grid at
+its own column and row, giving a wrong fit with only half the slots.
+
+Usage:
+  python tests/calibration/test_lattice_fit.py
+  python -m pytest tests/calibration/test_lattice_fit.py
+"""
+
+import os
+import sys
+import numpy as np
+
+# Get the absolute path to the project root directory
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '../..'))
+sys.path.insert(0, project_root)
+
+from utils.calibration.vision.lattice import fit_lattice, predict_centers, grid_indices
+
+# Grid of a 1920x1080 client
+BASE = (1625.4, 638.2)
+SPACING = (61.3, 51.1)
+TOLERANCE = 1.0  # Pixels
+
+def lattice_points(indices):
+    """Centres of (col, row) indices on the test lattice."""
+    return predict_centers(BASE, (SPACING[0], 0.0), (0.0, SPACING[1]), np.asarray(indices))
+
+def check_fit(fit):
+    """Assert that a fit found the full test grid."""
+    assert fit is not None, "no lattice fitted"
+    assert abs(fit['base_x'] - BASE[0]) < TOLERANCE, f"base_x {fit['base_x']:.1f}"
+    assert abs(fit['base_y'] - BASE[1]) < TOLERANCE, f"base_y {fit['base_y']:.1f}"
+    assert fit['num_inliers'] == 28, f"{fit['num_inliers']}/28 inliers"
+
+def test_aligned_stray_left_of_grid():
+    """A stray two columns left of the grid and three rows down."""
+    stray = lattice_points([[-2, 3]]) + (2.0, 0.0)
+    check_fit(fit_lattice(np.vstack([lattice_points(grid_indices()), stray]), seed=0))
+
+def test_aligned_stray_above_grid():
+    """A stray one row above the grid."""
+    stray = lattice_points([[1, -1]]) + (0.0, -1.5)
+    check_fit(fit_lattice(np.vstack([lattice_points(grid_indices()), stray]), seed=0))
+
+def test_random_aligned_strays():
+    """Up to three strays on the lattice around the grid, with detection noise."""
+    rng = np.random.default_rng(1)
+    for trial in range(100):
+        centers = lattice_points(grid_indices()) + rng.normal(0, 0.5, (28, 2))
+        count = rng.integers(1, 4)
+        strays = np.column_stack([rng.integers(-3, 7, count), rng.integers(-3, 10, count)])
+        strays = strays[(strays[:, 0] < 0) | (strays[:, 0] > 3) | (strays[:, 1] < 0) | (strays[:, 1] > 6)]
+        strays = lattice_points(strays) + rng.normal(0, 2, (len(strays), 2))
+        check_fit(fit_lattice(np.vstack([centers, strays]), seed=trial))
+
+def main():
+    """Run every test and report the results."""
+    tests = [test_aligned_stray_left_of_grid, test_aligned_stray_above_grid,
+             test_random_aligned_strays]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"PASS {test.__name__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"FAIL {test.__name__}: {e}")
+    print(f"\nPassed: {len(tests) - failed}/{len(tests)}")
+    return failed
+
+if __name__ == "__main__":
+    sys.exit(1 if main() else 0)
@@ -222,10 +222,11 @@ class ScreenshotCalibrationTest(tk.Tk):
         max_y = base_y + (6 * y_spacing)
         
         # Position overlay near the inventory
-        overlay_x = min_x - 50
-        overlay_y = min_y - 50
-        overlay_width = (max_x - min_x) + 100
-        overlay_height = (max_y - min_y) + 100
+        # (Tk geometry needs integers, calibrated values may be sub-pixel)
+        overlay_x = int(min_x - 50)
+        overlay_y = int(min_y - 50)
+        overlay_width = int(max_x - min_x) + 100
+        overlay_height = int(max_y - min_y) + 100
         
         # Set overlay size and position
         self.overlay.geometry(f"{overlay_width}x{overlay_height}+{overlay_x}+{overlay_y}")
@@ -265,7 +266,7 @@ class ScreenshotCalibrationTest(tk.Tk):
             # Draw coordinates below
             canvas.create_text(
                 x, y + rect_size // 2 + 10,
-                text=f"({base_x + col * x_spacing}, {base_y + row * y_spacing})",
+                text=f"({base_x + col * x_spacing:.0f}, {base_y + row * y_spacing:.0f})",
                 fill="black",
                 font=("Arial", 8)
             )
@@ -307,8 +308,8 @@ class ScreenshotCalibrationTest(tk.Tk):
             col = idx % 4
             
             # Calculate slot coordinates
-            x = base_x + (col * x_spacing)
-            y = base_y + (row * y_spacing)
+            x = round(base_x + (col * x_spacing))
+            y = round(base_y + (row * y_spacing))
             
             # Add small random variance
             z = 8
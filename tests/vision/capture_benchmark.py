@@ -0,0 +1,96 @@
+#!/usr/bin/env python
+"""
+Screen Capture Benchmark
+
+This script measures the capture rate of each available backend for the full
+screen, the bottom right quadrant and a small inventory-sized region.
+
+Usage:
+  python tests/vision/capture_benchmark.py [--xvfb] [--frames N]
+
+Options:
+  --xvfb             Start a private Xvfb server (1920x1080) for the benchmark
+  --frames N         Number of captures per measurement (default: 200)
+
+When run on a headless machine, --xvfb gives repeatable numbers that are
+independent of the desktop compositor.
+"""
+
+import os
+import sys
+import time
+import shutil
+import argparse
+import subprocess
+
+# Get the absolute path to the project root directory
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '../..'))
+sys.path.insert(0, project_root)
+
+XVFB_DISPLAY = ":99"
+XVFB_SCREEN = "1920x1080x24"
+
+def start_xvfb():
+    """Start an Xvfb server and point DISPLAY at it."""
+    if shutil.which("Xvfb") is None:
+        print("Xvfb is not installed. Install it (e.g. apt install xvfb) or run on a desktop.")
+        sys.exit(1)
+    process = subprocess.Popen(
+        ["Xvfb", XVFB_DISPLAY, "-screen", "0", XVFB_SCREEN, "-nolisten", "tcp"],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL
+    )
+    os.environ["DISPLAY"] = XVFB_DISPLAY
+    time.sleep(1)  # Give the server time to accept connections
+    return process
+
+def measure(grab, region, backend, frames):
+    """Return captures per second for one backend and region."""
+    grab(region, backend)  # Warm up (opens the X11 connection)
+    start = time.perf_counter()
+    for _ in range(frames):
+        grab(region, backend)
+    elapsed = time.perf_counter() - start
+    return frames / elapsed
+
+def main():
+    """Run the capture benchmark."""
+    parser = argparse.ArgumentParser(description="Screen capture benchmark")
+    parser.add_argument("--xvfb", action="store_true", help="Start a private Xvfb server")
+    parser.add_argument("--frames", type=int, default=200, help="Captures per measurement")
+    args = parser.parse_args()
+
+    xvfb = start_xvfb() if args.xvfb else None
+
+    try:
+        # Import after DISPLAY is set, pyautogui connects to X11 on import
+        from utils.vision.capture import (
+            grab_region, available_backends, full_screen_region, bottom_right_quadrant
+        )
+
+        width, height = full_screen_region()[2:]
+        quadrant = bottom_right_quadrant((width, height))
+        inventory = (quadrant[0] + quadrant[2] - 300, quadrant[1] + quadrant[3] - 400, 300, 400)
+        regions = [
+            ("full screen", full_screen_region()),
+            ("quadrant", quadrant),
+            ("inventory", inventory),
+        ]
+
+        print("\nOSWS Screen Capture Benchmark")
+        print("=============================")
+        print(f"Display: {os.environ.get('DISPLAY', 'default')} ({width}x{height})")
+        print(f"Frames per measurement: {args.frames}\n")
+        print(f"{'backend':<12}{'region':<14}{'size':<12}{'fps':>10}{'ms/frame':>10}")
+
+        for backend in available_backends():
+            for name, region in regions:
+                fps = measure(grab_region, region, backend, args.frames)
+                size = f"{region[2]}x{region[3]}"
+                print(f"{backend:<12}{name:<14}{size:<12}{fps:>10.1f}{1000 / fps:>10.2f}")
+    finally:
+        if xvfb is not None:
+            xvfb.terminate()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,281 @@
+#!/usr/bin/env python
+"""
+Inventory Detection Benchmark
+
+This script runs detect_inventory_slots() on every screenshot of an offline
+corpus and reports per-stage timings, accuracy against the expected grid and
+peak memory. No game client or display is needed, so it can be used as a
+regression gate when changing the detection pipeline.
+
+Usage:
+  python tests/vision/detection_benchmark.py [corpus] [--repeat N] [--tolerance PX] [--scale S] [--lut]
+  python tests/vision/detection_benchmark.py --generate [corpus]
+
+Options:
+  corpus             Corpus directory (default: tests/vision/corpus)
+  --repeat N         Timed runs per screenshot, the median is reported (default: 5)
+  --tolerance PX     Maximum slot centre error for a case to pass (default: 3.0)
+  --scale S          Coarse-to-fine downscale factor, 1, 2 or 4 (default: 1). Above 1,
+                     every case is also run at full resolution and the speedup and
+                     the largest slot centre difference to it are reported
+  --lut              Build the colour masks from the colour LUT instead of an HSV
+                     conversion (see utils/calibration/vision/color_lut.py)
+  --generate         Write a synthetic corpus to the corpus directory and exit
+  --save FILE        Also write the results as JSON, for comparing two runs
+
+See utils/calibration/vision/corpus.py for the corpus layout. The script
+exits with status 1 when any case falls back to defaults or misses the
+tolerance.
+
+Peak memory is measured with tracemalloc in a separate, untimed run. It covers
+NumPy arrays, including the ones OpenCV returns, but not OpenCV's internal
+temporary buffers.
+"""
+
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import tracemalloc
+
+import numpy as np
+import cv2
+
+# Get the absolute path to the project root directory
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '../..'))
+sys.path.insert(0, project_root)
+
+from utils.calibration.vision.screenshot import detect_inventory_slots
+from utils.calibration.vision.debug_writer import set_debug_level
+from utils.calibration.vision.color_lut import set_color_lut_enabled
+from utils.calibration.vision.stage_timer import (
+    STAGES, enable_stage_timing, reset_stage_timings, get_stage_timings
+)
+from utils.calibration.vision.corpus import (
+    CORPUS_IMAGE, CORPUS_EXPECTED, load_corpus, load_case_image, slot_errors
+)
+
+DEFAULT_CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'corpus')
+
+# Slot outline colour used by the synthetic corpus (BGR for #FF6A00)
+HIGHLIGHT_BGR = (0, 106, 255)
+
+# Synthetic cases: (name, screen size, base, spacing, options)
+SYNTHETIC_CASES = [
+    ("fixed_1080p", (1920, 1080), (1625, 638), (61, 51), {}),
+    ("fixed_1080p_missing_top_left", (1920, 1080), (1625, 638), (61, 51), {'missing': [0, 13]}),
+    ("fixed_1080p_distractors", (1920, 1080), (1625, 638), (61, 51), {'distractors': True}),
+    ("resizable_1440p", (2560, 1440), (2228, 1050), (69, 59), {}),
+    ("quadrant_capture_1080p", (1920, 1080), (1625, 638), (61, 51), {'quadrant': True}),
+    ("resizable_2160p", (3840, 2160), (3420, 1580), (92, 77), {}),
+]
+
+def synthetic_screenshot(size, base, spacing, missing=(), distractors=False, seed=0):
+    """
+    Draw a game-like screenshot with a highlighted 4x7 inventory.
+
+    Args:
+        size (tuple): (width, height) of the screen
+        base (tuple): Centre of the top-left slot
+        spacing (tuple): (x, y) spacing between slot centres
+        missing (list): Slot indices (0-27) left without a highlight
+        distractors (bool): Add orange shapes that are not slots
+        seed (int): Random seed for textures and items
+
+    Returns:
+        numpy.ndarray: BGR image
+    """
+    rng = np.random.default_rng(seed)
+    width, height = size
+
+    # Muted brown interface texture
+    image = np.empty((height, width, 3), np.uint8)
+    image[:] = (38, 48, 62)
+    image += rng.integers(0, 12, (height, width, 1), dtype=np.uint8)
+
+    slot = int(round(min(spacing) * 0.7))
+    for index in range(28):
+        row, col = divmod(index, 4)
+        x = base[0] + col * spacing[0]
+        y = base[1] + row * spacing[1]
+
+        # Item icon: a coloured disc that never matches the highlight hue
+        colour = tuple(int(c) for c in rng.integers(60, 200, 3))
+        colour = (colour[0], colour[1], 40)
+        cv2.circle(image, (x, y), slot // 3, colour, -1)
+
+        if index not in missing:
+            cv2.rectangle(image, (x - slot // 2, y - slot // 2),
+                          (x + slot // 2, y + slot // 2), HIGHLIGHT_BGR, 2)
+
+    if distractors:
+        # Orange elements elsewhere in the quadrant: a long bar and a small marker
+        cv2.rectangle(image, (width // 2 + 40, height // 2 + 60),
+                      (width // 2 + 240, height // 2 + 75), HIGHLIGHT_BGR, -1)
+        cv2.rectangle(image, (base[0] - 2 * spacing[0], base[1] + spacing[1]),
+                      (base[0] - 2 * spacing[0] + slot // 2, base[1] + spacing[1] + slot // 2),
+                      HIGHLIGHT_BGR, 2)
+
+    return image
+
+def generate_corpus(directory):
+    """Write the synthetic cases to a corpus directory."""
+    for seed, (name, size, base, spacing, options) in enumerate(SYNTHETIC_CASES):
+        case_dir = os.path.join(directory, name)
+        os.makedirs(case_dir, exist_ok=True)
+
+        image = synthetic_screenshot(size, base, spacing, options.get('missing', ()),
+                                     options.get('distractors', False), seed)
+        expected = {
+            'base_x': base[0],
+            'base_y': base[1],
+            'x_spacing': spacing[0],
+            'y_spacing': spacing[1]
+        }
+        if options.get('quadrant'):
+            left, top = size[0] // 2, size[1] // 2
+            image = image[top:, left:]
+            expected['offset'] = [left, top]
+
+        cv2.imwrite(os.path.join(case_dir, CORPUS_IMAGE), image)
+        with open(os.path.join(case_dir, CORPUS_EXPECTED), 'w') as f:
+            json.dump(expected, f, indent=4)
+        print(f"Wrote {case_dir}")
+
+def run_case(case, image, repeat, scale=1):
+    """
+    Benchmark one corpus case.
+
+    Returns:
+        dict: Timings in ms, accuracy and peak memory of the case
+    """
+    detect_inventory_slots(image, offset=case.offset, scale=scale)  # Warm up
+
+    totals = []
+    stages = {stage: [] for stage in STAGES}
+    for _ in range(repeat):
+        reset_stage_timings()
+        start = time.perf_counter()
+        result = detect_inventory_slots(image, offset=case.offset, scale=scale)
+        totals.append(time.perf_counter() - start)
+        timings = get_stage_timings()
+        for stage in STAGES:
+            stages[stage].append(timings.get(stage, 0.0))
+
+    tracemalloc.start()
+    detect_inventory_slots(image, offset=case.offset, scale=scale)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    errors = slot_errors(result, case.expected)
+    return {
+        'case': case.name,
+        'scale': scale,
+        'using_defaults': bool(result.get('using_defaults', False)),
+        'detected_slots': result.get('num_detected_slots', 0),
+        'max_error': float(errors.max()),
+        'mean_error': float(errors.mean()),
+        'residual': result.get('fit_residual'),
+        'total_ms': float(np.median(totals)) * 1000,
+        'stages_ms': {stage: float(np.median(stages[stage])) * 1000 for stage in STAGES},
+        'peak_mb': peak / (1024 * 1024),
+        'detection': result,
+    }
+
+def compare_with_full(case, image, result, repeat):
+    """
+    Add the full resolution time, the speedup and the largest slot centre
+    difference to the full resolution result of a downscaled run.
+    """
+    full = run_case(case, image, repeat)
+    result['full_ms'] = full['total_ms']
+    result['speedup'] = full['total_ms'] / result['total_ms']
+    if result['using_defaults'] or full['using_defaults']:
+        result['full_diff'] = float('inf')
+    else:
+        result['full_diff'] = float(slot_errors(result['detection'], full['detection']).max())
+
+def main():
+    """Run the detection benchmark."""
+    parser = argparse.ArgumentParser(description="Inventory detection benchmark")
+    parser.add_argument("corpus", nargs="?", default=DEFAULT_CORPUS, help="Corpus directory")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed runs per screenshot")
+    parser.add_argument("--tolerance", type=float, default=3.0, help="Maximum slot error in pixels")
+    parser.add_argument("--scale", type=int, default=1, choices=(1, 2, 4),
+                        help="Coarse-to-fine downscale factor")
+    parser.add_argument("--lut", action="store_true", help="Build colour masks from the colour LUT")
+    parser.add_argument("--generate", action="store_true", help="Write a synthetic corpus and exit")
+    parser.add_argument("--save", help="Write the results to a JSON file")
+    args = parser.parse_args()
+
+    if args.generate:
+        generate_corpus(args.corpus)
+        return
+
+    cases = load_corpus(args.corpus)
+    if not cases:
+        print(f"No cases found in {args.corpus}. Use --generate for a synthetic corpus.")
+        sys.exit(1)
+
+    # Benchmark the pipeline itself: no debug images, no per-range log lines
+    set_debug_level('off')
+    logging.disable(logging.WARNING)
+    enable_stage_timing()
+    set_color_lut_enabled(args.lut)
+
+    print("\nOSWS Inventory Detection Benchmark")
+    print("==================================")
+    print(f"Corpus: {args.corpus} ({len(cases)} cases, median of {args.repeat} runs, "
+          f"scale 1/{args.scale}, {'colour LUT' if args.lut else 'HSV'} masks)\n")
+    header = f"{'case':<32}{'slots':>6}{'max err':>9}{'total':>9}"
+    header += "".join(f"{stage:>11}" for stage in STAGES) + f"{'peak MB':>9}"
+    if args.scale > 1:
+        header += f"{'full':>9}{'speedup':>9}{'vs full':>9}"
+    header += "  result"
+    print(header)
+
+    results = []
+    for case in cases:
+        image = load_case_image(case)
+        if image is None:
+            continue
+        result = run_case(case, image, args.repeat, args.scale)
+        result['passed'] = not result['using_defaults'] and result['max_error'] <= args.tolerance
+        if args.scale > 1:
+            compare_with_full(case, image, result, args.repeat)
+        del result['detection']
+        results.append(result)
+
+        line = (f"{case.name:<32}{result['detected_slots']:>6}{result['max_error']:>9.2f}"
+                f"{result['total_ms']:>9.2f}")
+        line += "".join(f"{result['stages_ms'][stage]:>11.2f}" for stage in STAGES)
+        line += f"{result['peak_mb']:>9.1f}"
+        if args.scale > 1:
+            line += f"{result['full_ms']:>9.2f}{result['speedup']:>8.1f}x{result['full_diff']:>9.2f}"
+        line += f"  {'ok' if result['passed'] else 'FAIL'}"
+        print(line)
+
+    enable_stage_timing(False)
+
+    passed = sum(result['passed'] for result in results)
+    print(f"\nPassed: {passed}/{len(results)} (tolerance {args.tolerance}px)")
+    if results:
+        print(f"Median total: {np.median([r['total_ms'] for r in results]):.2f} ms, "
+              f"max peak memory: {max(r['peak_mb'] for r in results):.1f} MB")
+        if args.scale > 1:
+            print(f"Median speedup over full resolution: "
+                  f"{np.median([r['speedup'] for r in results]):.1f}x, largest centre difference: "
+                  f"{max(r['full_diff'] for r in results):.2f} px")
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(results, f, indent=4)
+        print(f"Results saved to {args.save}")
+
+    if passed < len(results):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
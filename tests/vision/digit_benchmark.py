@@ -0,0 +1,119 @@
+#!/usr/bin/env python
+"""
+Counter Reading Benchmark
+
+This script measures how long utils.vision.digits takes to read a counter
+and checks that every value is read correctly. Counters are rendered with a
+pixel font (OpenCV's Hershey font drawn once per digit without
+anti-aliasing) on a noisy dark background, so no game client or display is
+needed.
+
+Usage:
+  python tests/vision/digit_benchmark.py [--reads N] [--seed S]
+
+Options:
+  --reads N          Counter values read per measurement (default: 2000)
+  --seed S           Random seed for the values and backgrounds (default: 0)
+
+Two measurements are reported: cold reads with the glyph cache cleared before
+every read (segmentation plus correlation against the atlas) and warm reads
+as in a running script, where the glyphs were seen before. The script exits
+with status 1 when any value is misread.
+"""
+
+import os
+import sys
+import time
+import logging
+import argparse
+import tempfile
+
+import numpy as np
+import cv2
+
+# Get the absolute path to the project root directory
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '../..'))
+sys.path.insert(0, project_root)
+
+from utils.vision.digits import DigitReader
+
+COUNTER_SIZE = (80, 20)    # Width and height of the rendered counter
+TEXT_COLOR = (255, 255, 255)
+FONT = cv2.FONT_HERSHEY_PLAIN
+
+def font_sprites(chars="0123456789"):
+    """
+    Draw every character once into a sprite, like the bitmap fonts of the
+    game. Hershey glyphs drawn directly differ by a pixel between positions.
+    """
+    sprites = {}
+    for char in chars:
+        canvas = np.zeros((COUNTER_SIZE[1], 20), np.uint8)
+        cv2.putText(canvas, char, (2, COUNTER_SIZE[1] - 4), FONT, 1, 255, 1, cv2.LINE_8)
+        columns = np.flatnonzero(canvas.any(axis=0))
+        sprites[char] = canvas[:, columns[0]:columns[-1] + 1] > 0
+    return sprites
+
+def render_counter(text, sprites, rng, width=COUNTER_SIZE[0]):
+    """Render a counter value on a noisy dark background, one pixel between glyphs."""
+    image = rng.integers(0, 90, (COUNTER_SIZE[1], width, 3), dtype=np.uint8)
+    x = 3
+    for char in text:
+        sprite = sprites[char]
+        image[:, x:x + sprite.shape[1]][sprite] = TEXT_COLOR
+        x += sprite.shape[1] + 1
+    return image
+
+def measure(reader, frames, values, cold):
+    """Read every frame, return (times in ms, misreads)."""
+    times = []
+    misreads = 0
+    for frame, value in zip(frames, values):
+        if cold:
+            reader._cache.clear()
+        start = time.perf_counter()
+        result = reader.read('bench', frame)
+        times.append((time.perf_counter() - start) * 1000)
+        misreads += result != value
+    return np.array(times), misreads
+
+def main():
+    """Run the counter reading benchmark."""
+    parser = argparse.ArgumentParser(description="Counter reading benchmark")
+    parser.add_argument("--reads", type=int, default=2000, help="Values read per measurement")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed")
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    rng = np.random.default_rng(args.seed)
+    sprites = font_sprites()
+
+    with tempfile.TemporaryDirectory() as directory:
+        reader = DigitReader(counters_file=os.path.join(directory, 'counters.json'),
+                             atlas_file=os.path.join(directory, 'glyphs.npz'))
+        reader.register('bench', (0, 0, 120, COUNTER_SIZE[1]), color=TEXT_COLOR)
+        if not reader.learn('bench', '0123456789', render_counter('0123456789', sprites, rng, 120)):
+            print("Could not learn the glyph atlas")
+            sys.exit(1)
+
+        values = rng.integers(0, 100000, args.reads)
+        frames = [render_counter(str(value), sprites, rng) for value in values]
+
+        print("\nOSWS Counter Reading Benchmark")
+        print("==============================")
+        print(f"{args.reads} reads of {COUNTER_SIZE[0]}x{COUNTER_SIZE[1]} counters, values 0-99999\n")
+        print(f"{'mode':<8}{'median ms':>11}{'p99 ms':>9}{'max ms':>9}{'misreads':>10}")
+
+        total_misreads = 0
+        for mode, cold in (("cold", True), ("warm", False)):
+            measure(reader, frames[:20], values[:20], cold)  # Warm up
+            times, misreads = measure(reader, frames, values, cold)
+            total_misreads += misreads
+            print(f"{mode:<8}{np.median(times):>11.3f}{np.percentile(times, 99):>9.3f}"
+                  f"{times.max():>9.3f}{misreads:>10}")
+
+    if total_misreads:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
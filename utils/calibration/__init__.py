@@ -5,4 +5,4 @@ This package contains utilities for calibrating various aspects of
 the OSWS bots, particularly inventory slot positions.
 """
 
-__all__ = ["vision"] 
\ No newline at end of file
+__all__ = ["vision", "batch"] 
\ No newline at end of file
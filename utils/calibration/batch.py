@@ -0,0 +1,286 @@
+"""
+Batch Calibration
+
+This module calibrates the inventory on a folder of saved screenshots instead
+of one interactive capture at a time, so profiles for many clients or
+layouts can be produced in one run.
+
+Every image is treated as a full screenshot of one setup: the screen and the
+client are the image size, and the UI scale is the one set in the profile
+store (or --ui-scale). detect_inventory_slots() runs on each image in a pool
+of worker processes with the highlight ranges tuned for that setup (see
+color_tuner), never those of the live display, so workers do not talk to
+X11. The parent then writes one profile per image and a summary of the run.
+
+Files (under the output directory, <dir>/profiles by default):
+- <image path>.json: inventory config of each image with its profile name
+  and detection statistics, mirroring the folder layout of the input
+- summary.csv: one row per image with the detected slots, fit residual and
+  read/detect timings
+
+Key features:
+- Images are found recursively (png, jpg, bmp) and processed in sorted order
+- --record also stores calibrations that fitted all 28 slots with a residual
+  under RECORD_MAX_RESIDUAL in config/inventory_profiles.json under their
+  profile key; partial grids (e.g. a quadrant capture taken for a full
+  screenshot) are only written to the output directory
+- Command line:
+    python -m utils.calibration.batch screenshots/
+    python -m utils.calibration.batch screenshots/ --workers 4 --scale 2 --record
+
+Performance considerations:
+- Each worker caps OpenCV to CV_THREADS threads, so the pool runs one image
+  per core instead of every worker fighting over all cores, and throughput
+  grows with the number of workers up to the number of cores
+- Debug images are turned off in the workers, detection does no file I/O
+- Results are small dicts; images are read inside the workers and never
+  pickled between processes
+- All files are written by the parent process, so workers never race on the
+  profile store
+"""
+
+import os
+import csv
+import time
+import logging
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+import cv2
+
+from .config import DEFAULT_INVENTORY_CONFIG, save_config
+from .profiles import (
+    DEFAULT_UI_SCALE, ProfileKey, get_ui_scale, key_to_string, record_profile
+)
+
+# Set up logging
+logging.basicConfig(level=logging.INFO,
+                    format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Screenshot file types picked up from the input directory
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp')
+
+# Output settings
+OUTPUT_DIR_NAME = 'profiles'
+SUMMARY_FILE = 'summary.csv'
+SUMMARY_FIELDS = ('image', 'profile', 'num_detected_slots', 'num_fitted_slots',
+                  'using_defaults', 'recorded', 'fit_residual', 'rotation',
+                  'base_x', 'base_y', 'x_spacing', 'y_spacing', 'read_ms', 'detect_ms')
+
+# A calibration is only recorded as a profile when the whole grid was fitted
+RECORD_MIN_SLOTS = 28
+RECORD_MAX_RESIDUAL = 1.0  # Pixels
+
+# OpenCV threads per worker process
+CV_THREADS = 1
+
+def find_images(directory):
+    """
+    Find the screenshots in a directory and its subdirectories.
+
+    Args:
+        directory (str): Input directory
+
+    Returns:
+        list: Image paths relative to the directory, sorted
+    """
+    images = []
+    for root, dirs, files in os.walk(directory):
+        dirs.sort()
+        for name in sorted(files):
+            if name.lower().endswith(IMAGE_EXTENSIONS):
+                images.append(os.path.relpath(os.path.join(root, name), directory))
+    return images
+
+def _init_worker(threads):
+    """Set up a worker process: cap OpenCV threads, turn off debug images and detection logs."""
+    cv2.setNumThreads(threads)
+    logging.getLogger(__package__ + '.vision').setLevel(logging.WARNING)
+    # Imported here so the parent does not start a debug writer it never uses
+    from .vision.debug_writer import set_debug_level
+    set_debug_level('off')
+
+def image_profile_key(width, height, ui_scale):
+    """
+    Profile key of a full screenshot.
+
+    Args:
+        width, height (int): Image size
+        ui_scale (float): UI scale the screenshot was taken with
+
+    Returns:
+        ProfileKey: Key with the screen and the client both the image size
+    """
+    return ProfileKey(width, height, 0, 0, width, height, ui_scale)
+
+def calibrate_image(path, scale=1, ui_scale=DEFAULT_UI_SCALE):
+    """
+    Detect the inventory in one screenshot (runs in a worker process).
+
+    Args:
+        path (str): Image path
+        scale (int): Detection scale, see detect_inventory_slots()
+        ui_scale (float): UI scale the screenshot was taken with, selects the
+            tuned highlight ranges of the image's setup
+
+    Returns:
+        dict: Detection result with 'width', 'height', 'read_ms' and
+            'detect_ms', or with 'error' if the image cannot be read
+    """
+    from .vision.screenshot import detect_inventory_slots, detection_ranges
+
+    start = time.perf_counter()
+    image = cv2.imread(path, cv2.IMREAD_COLOR)
+    read_ms = (time.perf_counter() - start) * 1000
+    if image is None:
+        return {'error': f"cannot read {path}", 'read_ms': read_ms}
+
+    height, width = image.shape[:2]
+    highlight = detection_ranges(key_to_string(image_profile_key(width, height, ui_scale)))
+
+    start = time.perf_counter()
+    result = detect_inventory_slots(image, scale=scale, highlight=highlight)
+    result['detect_ms'] = (time.perf_counter() - start) * 1000
+    result['read_ms'] = read_ms
+    result['height'], result['width'] = height, width
+    return result
+
+def recordable(result):
+    """
+    Check that a calibration is complete enough to record as a profile.
+
+    Args:
+        result (dict): Result of calibrate_image()
+
+    Returns:
+        bool: True if every slot was fitted with a small residual
+    """
+    return ('error' not in result and not result.get('using_defaults', False)
+            and result.get('num_fitted_slots', 0) >= RECORD_MIN_SLOTS
+            and result.get('fit_residual', float('inf')) <= RECORD_MAX_RESIDUAL)
+
+def summary_row(image, result, profile='', recorded=False):
+    """
+    Build the summary CSV row of one image.
+
+    Args:
+        image (str): Image path relative to the input directory
+        result (dict): Result of calibrate_image()
+        profile (str): Profile name of the image
+        recorded (bool): Whether the calibration was stored in the profile store
+
+    Returns:
+        dict: Values for SUMMARY_FIELDS
+    """
+    row = {field: result.get(field, '') for field in SUMMARY_FIELDS}
+    row['image'] = image
+    row['profile'] = profile
+    row['recorded'] = int(recorded)
+    row['using_defaults'] = int(bool(result.get('using_defaults', 'error' in result)))
+    for field in ('read_ms', 'detect_ms'):
+        if field in result:
+            row[field] = round(result[field], 2)
+    return row
+
+def run_batch(directory, output=None, workers=None, scale=1, ui_scale=None, record=False):
+    """
+    Calibrate every screenshot in a directory.
+
+    Args:
+        directory (str): Input directory
+        output (str, optional): Output directory, defaults to <directory>/profiles
+        workers (int, optional): Worker processes, defaults to the number of cores
+        scale (int): Detection scale, see detect_inventory_slots()
+        ui_scale (float, optional): UI scale of the screenshots, defaults to
+            the one set in the profile store
+        record (bool): Also store complete calibrations (see recordable())
+            in the profile store
+
+    Returns:
+        list: Summary rows, None if no image was found
+    """
+    output = output or os.path.join(directory, OUTPUT_DIR_NAME)
+    images = [image for image in find_images(directory)
+              if not os.path.abspath(os.path.join(directory, image)).startswith(
+                  os.path.abspath(output) + os.sep)]
+    if not images:
+        logger.error(f"No screenshots found in {directory}")
+        return None
+
+    ui_scale = ui_scale if ui_scale is not None else get_ui_scale()
+    workers = max(1, min(workers or os.cpu_count() or 1, len(images)))
+    logger.info(f"Calibrating {len(images)} screenshots with {workers} workers")
+
+    paths = [os.path.join(directory, image) for image in images]
+    rows = []
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(CV_THREADS,)) as executor:
+        results = executor.map(calibrate_image, paths, [scale] * len(paths),
+                               [ui_scale] * len(paths))
+        for image, result in zip(images, results):
+            if 'error' in result:
+                logger.error(f"{image}: {result['error']}")
+                rows.append(summary_row(image, result))
+                continue
+
+            key = image_profile_key(result['width'], result['height'], ui_scale)
+            name = key_to_string(key)
+            profile = {k: result[k] for k in DEFAULT_INVENTORY_CONFIG}
+            profile['profile'] = name
+            for stat in ('num_detected_slots', 'num_fitted_slots', 'using_defaults',
+                         'fit_residual', 'rotation'):
+                if stat in result:
+                    profile[stat] = result[stat]
+            save_config(profile, os.path.join(output, os.path.splitext(image)[0] + '.json'))
+            recorded = False
+            if record:
+                if recordable(result):
+                    recorded = record_profile(key, profile)
+                else:
+                    logger.warning(f"{image}: incomplete grid "
+                                   f"({result.get('num_fitted_slots', 0)}/{RECORD_MIN_SLOTS} slots), "
+                                   f"not recorded as profile {name}")
+            rows.append(summary_row(image, result, name, recorded))
+    elapsed = time.perf_counter() - start
+
+    summary_path = os.path.join(output, SUMMARY_FILE)
+    try:
+        os.makedirs(output, exist_ok=True)
+        with open(summary_path, 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=SUMMARY_FIELDS)
+            writer.writeheader()
+            writer.writerows(rows)
+        logger.info(f"Summary saved to {summary_path}")
+    except OSError as e:
+        logger.error(f"Error saving summary to {summary_path}: {e}")
+
+    failed = sum(row['using_defaults'] for row in rows)
+    logger.info(f"Calibrated {len(rows) - failed}/{len(rows)} screenshots in {elapsed:.2f} s "
+                f"({len(rows) / elapsed:.1f} images/s)")
+    return rows
+
+def main():
+    """Calibrate a folder of screenshots."""
+    parser = argparse.ArgumentParser(description="Batch inventory calibration over screenshots")
+    parser.add_argument("directory", help="Folder of full screenshots, searched recursively")
+    parser.add_argument("--output", help=f"Output directory (default: <directory>/{OUTPUT_DIR_NAME})")
+    parser.add_argument("--workers", type=int, help="Worker processes (default: number of cores)")
+    parser.add_argument("--scale", type=int, default=1, choices=(1, 2, 4),
+                        help="Detection scale, 2 or 4 is faster on large screenshots")
+    parser.add_argument("--ui-scale", type=float,
+                        help="RuneLite scaling of the screenshots in percent "
+                             "(default: the one set in the profile store)")
+    parser.add_argument("--record", action="store_true",
+                        help="Store complete calibrations in the profile store")
+    args = parser.parse_args()
+
+    rows = run_batch(args.directory, args.output, args.workers, args.scale,
+                     args.ui_scale, args.record)
+    if rows is None:
+        raise SystemExit(1)
+
+# For testing
+if __name__ == "__main__":
+    main()
@@ -2,7 +2,9 @@
 Calibration Configuration Utilities
 
 This module provides functions for managing calibration configurations
-across the OSWS framework.
+across the OSWS framework. Inventory configurations are also recorded per
+display setup, see profiles. Other slot grids (bank, equipment, spellbook)
+are stored by name in grids.json.
 """
 
 import os
@@ -27,6 +29,27 @@ DEFAULT_INVENTORY_CONFIG = {
     'y_spacing': 51
 }
 
+# Named slot grids measured with detect_grid() (see vision/screenshot.py)
+GRIDS_FILE = os.path.join(CONFIG_DIR, 'grids.json')
+
+# Bank grid relative to the client window, used until the bank is calibrated.
+# Only the first rows are visible without scrolling
+DEFAULT_BANK_CONFIG = {
+    'base_x': 520,
+    'base_y': 160,
+    'x_spacing': 69,
+    'y_spacing': 52,
+    'columns': 8,
+    'rows': 8
+}
+
+# Grids with a built-in default
+DEFAULT_GRID_CONFIGS = {
+    'bank': DEFAULT_BANK_CONFIG
+}
+
+GRID_CONFIG_KEYS = ('base_x', 'base_y', 'x_spacing', 'y_spacing', 'columns', 'rows')
+
 def load_config(config_file, default_config=None):
     """
     Load a configuration file, or return defaults if it doesn't exist.
@@ -85,37 +108,178 @@ def save_config(config_data, config_file):
 
 def load_inventory_config():
     """
-    Load inventory configuration.
+    Load the inventory configuration for the current display setup.
+    
+    inventory_config.json is used when it was saved on this setup (or predates
+    profiles), shifted by the move when only the client window moved since.
+    Otherwise the stored profile of this setup is used, or one is derived
+    from the nearest known profile (see profiles).
     
     Returns:
         dict: Inventory configuration
     """
-    return load_config(INVENTORY_CONFIG_FILE, DEFAULT_INVENTORY_CONFIG)
+    config = load_config(INVENTORY_CONFIG_FILE, DEFAULT_INVENTORY_CONFIG)
+    
+    # Imported here, profiles builds on this module
+    from .profiles import (current_profile_key, key_to_string, key_from_string, find_profile,
+                           derive_profile, client_moved, translate_config)
+    key = current_profile_key()
+    if key is None:
+        return config
+    name = key_to_string(key)
+    if os.path.exists(INVENTORY_CONFIG_FILE):
+        if config.get('profile', name) == name:
+            return config
+        saved = key_from_string(config['profile'])
+        move = client_moved(saved, key) if saved is not None else None
+        if move is not None:
+            logger.info(f"Client moved by {move} since the calibration, shifting the inventory config")
+            config = translate_config(config, *move)
+            config['profile'] = name
+            return config
+    
+    logger.info(f"Inventory config was not saved on {name}, loading its profile")
+    profile = find_profile(key) or derive_profile(key)
+    profile['profile'] = name
+    return profile
 
-def save_inventory_config(config_data):
+def save_inventory_config(config_data, key=None):
     """
-    Save inventory configuration.
+    Save inventory configuration and record it as the profile of the current setup.
     
     Args:
         config_data (dict): Inventory configuration to save
+        key (ProfileKey, optional): Setup the configuration was measured on,
+            defaults to the current one
         
     Returns:
         bool: True if successful, False otherwise
     """
-    return save_config(config_data, INVENTORY_CONFIG_FILE)
+    from .profiles import current_profile_key, key_to_string, record_profile
+    config_data = {k: config_data[k] for k in DEFAULT_INVENTORY_CONFIG}
+    key = key or current_profile_key()
+    if key is None:
+        return save_config(config_data, INVENTORY_CONFIG_FILE)
+    
+    config_data['profile'] = key_to_string(key)
+    return save_config(config_data, INVENTORY_CONFIG_FILE) and record_profile(key, config_data)
 
 def reset_inventory_config():
     """
-    Reset inventory configuration to default values.
+    Reset inventory configuration to the default values for the current setup.
+    
+    The stored profile of the setup is dropped, so the defaults are not
+    mistaken for a measured calibration.
+    
+    Returns:
+        bool: True if successful, False otherwise
+    """
+    from .profiles import current_profile_key, key_to_string, default_profile, forget_profile
+    key = current_profile_key()
+    config = default_profile(key)
+    if key is None:
+        return save_config(config, INVENTORY_CONFIG_FILE)
+    
+    config['profile'] = key_to_string(key)
+    return save_config(config, INVENTORY_CONFIG_FILE) and forget_profile(key)
+
+def load_grid_config(name):
+    """
+    Load a named slot grid for the current display setup.
+    
+    A measured grid is used when it was measured on this setup, shifted by
+    the move when only the client window moved since. Otherwise the built-in
+    default of the grid is used, shifted by how far the client moved from
+    where the defaults fit (see profiles.default_origin()).
+    
+    Args:
+        name (str): Grid name, e.g. 'bank'
+        
+    Returns:
+        dict: Grid configuration in screen coordinates, or None for an
+            unknown grid without a default
+    """
+    from .profiles import (current_profile_key, key_to_string, key_from_string,
+                           client_moved, translate_config, default_offset)
+    
+    config = load_config(GRIDS_FILE).get(name)
+    key = current_profile_key()
+    if config is not None and key is not None and config.get('profile') != key_to_string(key):
+        saved = key_from_string(config.get('profile', ''))
+        move = client_moved(saved, key) if saved is not None else None
+        if move is not None:
+            config = translate_config(config, *move)
+        else:
+            logger.warning(f"Grid {name} was measured on another display setup, recalibrate it")
+            config = None
+    if config is not None:
+        return config
+    
+    default = DEFAULT_GRID_CONFIGS.get(name)
+    if default is None:
+        return None
+    return translate_config(default, *default_offset())
+
+def save_grid_config(name, config_data, key=None):
+    """
+    Save a measured slot grid under a name.
     
+    Args:
+        name (str): Grid name, e.g. 'bank', 'equipment', 'spellbook'
+        config_data (dict): Grid with base_x, base_y, x_spacing, y_spacing,
+            columns and rows in screen coordinates
+        key (ProfileKey, optional): Setup the grid was measured on,
+            defaults to the current one
+        
     Returns:
         bool: True if successful, False otherwise
     """
-    return save_inventory_config(DEFAULT_INVENTORY_CONFIG)
+    from .profiles import current_profile_key, key_to_string
+    entry = {k: config_data[k] for k in GRID_CONFIG_KEYS}
+    key = key or current_profile_key()
+    if key is not None:
+        entry['profile'] = key_to_string(key)
+    grids = load_config(GRIDS_FILE)
+    grids[name] = entry
+    return save_config(grids, GRIDS_FILE)
+
+def grid_region(config, columns=None, rows=None):
+    """
+    Get the screen region covered by a slot grid.
+    
+    Args:
+        config (dict): Grid configuration with base_x, base_y, x_spacing, y_spacing
+        columns (int, optional): Columns, defaults to config['columns']
+        rows (int, optional): Rows, defaults to config['rows']
+        
+    Returns:
+        tuple: (left, top, width, height) in whole pixels
+    """
+    columns = columns or config['columns']
+    rows = rows or config['rows']
+    left = config['base_x'] - config['x_spacing'] / 2
+    top = config['base_y'] - config['y_spacing'] / 2
+    return (int(round(left)), int(round(top)),
+            int(round(columns * config['x_spacing'])), int(round(rows * config['y_spacing'])))
+
+def inventory_region(config=None):
+    """
+    Get the screen region covered by the 4x7 inventory grid.
+    
+    Args:
+        config (dict, optional): Inventory configuration, loaded if omitted
+        
+    Returns:
+        tuple: (left, top, width, height) in whole pixels
+    """
+    if config is None:
+        config = load_inventory_config()
+    return grid_region(config, 4, 7)
 
 # For testing
 if __name__ == "__main__":
     print("Calibration Configuration Utilities")
     print("---------------------------------")
     print(f"Default inventory config: {DEFAULT_INVENTORY_CONFIG}")
-    print(f"Current inventory config: {load_inventory_config()}") 
\ No newline at end of file
+    print(f"Current inventory config: {load_inventory_config()}")
+    print(f"Inventory region: {inventory_region()}") 
\ No newline at end of file
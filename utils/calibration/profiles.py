@@ -0,0 +1,490 @@
+"""
+Calibration Profiles
+
+This module keeps one inventory calibration per display setup, so switching
+monitors, moving the client or changing the RuneLite scaling does not require
+a new screenshot calibration every time.
+
+A profile is keyed by the screen resolution, the client geometry on that
+screen (see utils/vision/window.py) and the UI scale (RuneLite scaling in
+percent). Every successful
+calibration is recorded under the key it was measured with. When the bots
+start on a setup that has no profile yet, one is derived from the nearest
+known profile with an affine transform: the inventory is anchored to the
+bottom right corner of the client, so its offset from that corner and its
+slot spacing scale with the UI scale.
+
+Key features:
+- Profile store in config/inventory_profiles.json, next to inventory_config.json
+- Exact lookup by ProfileKey, nearest-profile lookup for unknown keys
+- A setup whose client only moved reuses its calibration shifted by the move
+- The built-in default (1920x1080, full screen client, 45% scaling) always
+  takes part in the nearest-profile search, so a derived config is always
+  available
+- A per-user UI scale setting kept in the store
+- The client origin the built-in default coordinates fit at, recorded the
+  first time a client window is found, so default boxes only shift when the
+  client moves away from it
+
+Performance considerations:
+- The store is a small JSON file read once per load_inventory_config() call
+- Deriving a profile is a 2x3 matrix product, negligible next to a calibration
+"""
+
+import os
+import math
+import logging
+from collections import namedtuple
+
+import numpy as np
+
+from .config import CONFIG_DIR, DEFAULT_INVENTORY_CONFIG, load_config, save_config
+
+# Set up logging
+logging.basicConfig(level=logging.INFO,
+                    format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+PROFILES_FILE = os.path.join(CONFIG_DIR, 'inventory_profiles.json')
+
+# UI scale (RuneLite scaling in percent) the default coordinates were measured with
+DEFAULT_UI_SCALE = 45
+
+# Weight of a UI scale difference relative to a client size difference when
+# looking for the nearest profile. A different scale changes every coordinate,
+# a different client size only moves the anchor.
+SCALE_DISTANCE_WEIGHT = 2.0
+
+GRID_KEYS = ('base_x', 'base_y', 'x_spacing', 'y_spacing')
+
+ProfileKey = namedtuple('ProfileKey', [
+    'screen_width', 'screen_height',
+    'client_left', 'client_top', 'client_width', 'client_height',
+    'ui_scale'
+])
+
+# Setup the built-in default inventory config was measured on
+DEFAULT_PROFILE_KEY = ProfileKey(1920, 1080, 0, 0, 1920, 1080, DEFAULT_UI_SCALE)
+
+# Client origin the default coordinates fit at, see default_origin()
+_default_origin = None
+
+def key_to_string(key):
+    """
+    Convert a profile key to its store name, e.g. "1920x1080/1920x1080+0+0/45".
+
+    Args:
+        key (ProfileKey): Profile key
+
+    Returns:
+        str: Store name of the key
+    """
+    return (f"{key.screen_width}x{key.screen_height}/"
+            f"{key.client_width}x{key.client_height}+{key.client_left}+{key.client_top}/"
+            f"{key.ui_scale:g}")
+
+def key_from_string(name):
+    """
+    Parse a store name back into a profile key.
+
+    Args:
+        name (str): Name produced by key_to_string()
+
+    Returns:
+        ProfileKey: The key, or None if the name is malformed
+    """
+    try:
+        screen, client, scale = name.split('/')
+        screen_width, screen_height = (int(v) for v in screen.split('x'))
+        size, left, top = client.split('+')
+        client_width, client_height = (int(v) for v in size.split('x'))
+        return ProfileKey(screen_width, screen_height, int(left), int(top),
+                          client_width, client_height, float(scale))
+    except ValueError:
+        return None
+
+def load_profiles(path=PROFILES_FILE):
+    """
+    Load the profile store.
+
+    Args:
+        path (str): Store file
+
+    Returns:
+        dict: {'ui_scale': float, 'profiles': {key name: config}}
+    """
+    store = load_config(path)
+    store.setdefault('ui_scale', DEFAULT_UI_SCALE)
+    store.setdefault('profiles', {})
+    return store
+
+def save_profiles(store, path=PROFILES_FILE):
+    """
+    Save the profile store.
+
+    Args:
+        store (dict): Store as returned by load_profiles()
+        path (str): Store file
+
+    Returns:
+        bool: True if successful, False otherwise
+    """
+    return save_config(store, path)
+
+def get_ui_scale(path=PROFILES_FILE):
+    """Get the UI scale used for the current profile key."""
+    return load_profiles(path)['ui_scale']
+
+def set_ui_scale(ui_scale, path=PROFILES_FILE):
+    """
+    Set the UI scale used for the current profile key.
+
+    Call this after changing the RuneLite scaling so the bots pick or derive
+    the matching profile on their next start.
+
+    Args:
+        ui_scale (float): RuneLite scaling in percent
+        path (str): Store file
+
+    Returns:
+        bool: True if successful, False otherwise
+    """
+    if ui_scale <= 0:
+        logger.error(f"Invalid UI scale: {ui_scale}")
+        return False
+    store = load_profiles(path)
+    store['ui_scale'] = ui_scale
+    return save_profiles(store, path)
+
+def default_origin(path=PROFILES_FILE):
+    """
+    Get the client origin the built-in default coordinates fit at.
+
+    The defaults were tuned as screen pixels, so they fit wherever the client
+    sat when they were first used, e.g. a maximized window below a panel.
+    That origin is recorded in the store the first time a client window is
+    found; only moves away from it shift the defaults.
+
+    Args:
+        path (str): Store file
+
+    Returns:
+        tuple: (left, top), None until a client window was found
+    """
+    global _default_origin
+    if _default_origin is None:
+        # Imported here so loading a config does not require python-xlib
+        from ..vision.window import client_geometry
+        store = load_profiles(path)
+        origin = store.get('default_origin')
+        if origin is None:
+            geometry = client_geometry()
+            if geometry is None:
+                return None
+            origin = [int(geometry[0]), int(geometry[1])]
+            store['default_origin'] = origin
+            save_profiles(store, path)
+            logger.info(f"Default coordinates recorded for a client at {tuple(origin)}")
+        _default_origin = tuple(origin)
+    return _default_origin
+
+def set_default_origin(origin, path=PROFILES_FILE):
+    """
+    Set the client origin the built-in default coordinates fit at.
+
+    Args:
+        origin (tuple): (left, top) of the client where the defaults fit
+        path (str): Store file
+
+    Returns:
+        bool: True if successful, False otherwise
+    """
+    global _default_origin
+    store = load_profiles(path)
+    store['default_origin'] = [int(origin[0]), int(origin[1])]
+    _default_origin = tuple(store['default_origin'])
+    return save_profiles(store, path)
+
+def default_offset():
+    """
+    Get how far the client moved from where the default coordinates fit.
+
+    Returns:
+        tuple: (dx, dy) to add to a default coordinate, (0, 0) without a
+            client window
+    """
+    from ..vision.window import client_origin
+    origin = default_origin()
+    if origin is None:
+        return 0, 0
+    left, top = client_origin()
+    return left - origin[0], top - origin[1]
+
+def default_to_screen(x, y):
+    """
+    Translate a built-in default coordinate to the screen.
+
+    Args:
+        x, y: Position in the default layout
+
+    Returns:
+        tuple: (x, y) on the screen, following client moves since default_origin()
+    """
+    dx, dy = default_offset()
+    return x + dx, y + dy
+
+def current_profile_key(client=None, ui_scale=None, path=PROFILES_FILE):
+    """
+    Build the profile key of the current setup.
+
+    Args:
+        client (tuple, optional): Client (left, top, width, height) on the screen.
+            Defaults to the client window found by the window locator, or the
+            full screen without one.
+        ui_scale (float, optional): UI scale, defaults to the stored setting
+        path (str): Store file holding the UI scale setting
+
+    Returns:
+        ProfileKey: Key of the current setup, or None if the screen size is unknown
+    """
+    # Imported here so loading a config does not require a capture backend
+    from ..vision.capture import screen_size
+    from ..vision.window import client_geometry
+
+    try:
+        screen_width, screen_height = screen_size()
+    except Exception as e:
+        logger.warning(f"Cannot read the screen size ({e}). Profiles are unavailable.")
+        return None
+
+    if client is None:
+        client = client_geometry() or (0, 0, screen_width, screen_height)
+    if ui_scale is None:
+        ui_scale = get_ui_scale(path)
+    left, top, width, height = (int(v) for v in client)
+    return ProfileKey(int(screen_width), int(screen_height), left, top, width, height, ui_scale)
+
+def profile_transform(source, target):
+    """
+    Affine transform mapping screen coordinates of one setup to another.
+
+    The inventory keeps its position relative to the bottom right corner of
+    the client, scaled by the ratio of the UI scales.
+
+    Args:
+        source (ProfileKey): Setup the coordinates were measured on
+        target (ProfileKey): Setup to map them to
+
+    Returns:
+        numpy.ndarray: 2x3 matrix, applied as matrix @ (x, y, 1)
+    """
+    scale = target.ui_scale / source.ui_scale
+    source_right = source.client_left + source.client_width
+    source_bottom = source.client_top + source.client_height
+    target_right = target.client_left + target.client_width
+    target_bottom = target.client_top + target.client_height
+    return np.array([
+        [scale, 0.0, target_right - scale * source_right],
+        [0.0, scale, target_bottom - scale * source_bottom]
+    ])
+
+def transform_config(config, matrix):
+    """
+    Apply an affine transform to an inventory config.
+
+    The base point is mapped as a point, the spacings as vectors. Slot centres
+    are mapped too when the config has them.
+
+    Args:
+        config (dict): Inventory config
+        matrix (numpy.ndarray): 2x3 transform from profile_transform()
+
+    Returns:
+        dict: Transformed config with values rounded to 2 decimals
+    """
+    linear = matrix[:, :2]
+    base = linear @ (config['base_x'], config['base_y']) + matrix[:, 2]
+    spacing = np.abs(linear @ (config['x_spacing'], config['y_spacing']))
+    result = {
+        'base_x': round(float(base[0]), 2),
+        'base_y': round(float(base[1]), 2),
+        'x_spacing': round(float(spacing[0]), 2),
+        'y_spacing': round(float(spacing[1]), 2)
+    }
+    if 'slot_centers' in config:
+        centers = np.asarray(config['slot_centers'], dtype=np.float64)
+        result['slot_centers'] = np.round(centers @ linear.T + matrix[:, 2], 2).tolist()
+    return result
+
+def translate_config(config, dx, dy):
+    """
+    Shift a grid config by a whole-client move.
+
+    Unlike transform_config(), every other key of the config is kept.
+
+    Args:
+        config (dict): Grid config with base_x and base_y
+        dx, dy: Screen offset of the move
+
+    Returns:
+        dict: Shifted copy of the config
+    """
+    result = dict(config)
+    result['base_x'] = round(config['base_x'] + dx, 2)
+    result['base_y'] = round(config['base_y'] + dy, 2)
+    if 'slot_centers' in config:
+        centers = np.asarray(config['slot_centers'], dtype=np.float64) + (dx, dy)
+        result['slot_centers'] = np.round(centers, 2).tolist()
+    return result
+
+def client_moved(source, target):
+    """
+    Whether two setups differ only by the position of the client.
+
+    Args:
+        source (ProfileKey): Setup the coordinates were measured on
+        target (ProfileKey): Current setup
+
+    Returns:
+        tuple: (dx, dy) of the move, or None if anything else changed
+    """
+    if source._replace(client_left=target.client_left, client_top=target.client_top) != target:
+        return None
+    return target.client_left - source.client_left, target.client_top - source.client_top
+
+def profile_distance(a, b):
+    """
+    How far apart two setups are for deriving one profile from the other.
+
+    Args:
+        a (ProfileKey): First setup
+        b (ProfileKey): Second setup
+
+    Returns:
+        float: 0.0 for the same scale and client size, larger is further
+    """
+    return (SCALE_DISTANCE_WEIGHT * abs(math.log(a.ui_scale / b.ui_scale))
+            + abs(math.log(a.client_width / b.client_width))
+            + abs(math.log(a.client_height / b.client_height)))
+
+def _known_profiles(store):
+    """All stored profiles plus the built-in default, as (key, config) pairs."""
+    known = []
+    for name, config in store['profiles'].items():
+        key = key_from_string(name)
+        if key is None or not all(k in config for k in GRID_KEYS):
+            logger.warning(f"Ignoring malformed profile {name}")
+            continue
+        known.append((key, config))
+    if not any(key == DEFAULT_PROFILE_KEY for key, _ in known):
+        known.append((DEFAULT_PROFILE_KEY, DEFAULT_INVENTORY_CONFIG))
+    return known
+
+def find_profile(key, path=PROFILES_FILE):
+    """
+    Get the stored profile for a key.
+
+    Args:
+        key (ProfileKey): Setup to look up
+        path (str): Store file
+
+    Returns:
+        dict: Inventory config measured on that setup, or None
+    """
+    config = load_profiles(path)['profiles'].get(key_to_string(key))
+    return dict(config) if config else None
+
+def derive_profile(key, path=PROFILES_FILE):
+    """
+    Derive an inventory config for a setup from the nearest known profile.
+
+    Args:
+        key (ProfileKey): Setup to derive a config for
+        path (str): Store file
+
+    Returns:
+        dict: Derived inventory config (an exact profile is returned unchanged)
+    """
+    known = _known_profiles(load_profiles(path))
+    source, config = min(known, key=lambda item: profile_distance(item[0], key))
+    if source == key:
+        return dict(config)
+
+    derived = transform_config(config, profile_transform(source, key))
+    logger.info(f"Derived inventory profile for {key_to_string(key)} "
+                f"from {key_to_string(source)}")
+    return derived
+
+def default_profile(key):
+    """
+    Get the built-in default inventory config mapped to a setup.
+
+    Args:
+        key (ProfileKey): Setup, None for the unmapped default
+
+    Returns:
+        dict: Default inventory config for that setup
+    """
+    if key is None or key == DEFAULT_PROFILE_KEY:
+        return DEFAULT_INVENTORY_CONFIG.copy()
+    return transform_config(DEFAULT_INVENTORY_CONFIG, profile_transform(DEFAULT_PROFILE_KEY, key))
+
+def record_profile(key, config, path=PROFILES_FILE):
+    """
+    Store a calibration measured on a setup.
+
+    Args:
+        key (ProfileKey): Setup the calibration was measured on
+        config (dict): Inventory config
+        path (str): Store file
+
+    Returns:
+        bool: True if successful, False otherwise
+    """
+    store = load_profiles(path)
+    store['profiles'][key_to_string(key)] = {k: config[k] for k in GRID_KEYS}
+    return save_profiles(store, path)
+
+def forget_profile(key, path=PROFILES_FILE):
+    """
+    Remove the stored profile of a setup.
+
+    Args:
+        key (ProfileKey): Setup to forget
+        path (str): Store file
+
+    Returns:
+        bool: True if the store was saved or had no such profile, False on error
+    """
+    store = load_profiles(path)
+    if store['profiles'].pop(key_to_string(key), None) is None:
+        return True
+    return save_profiles(store, path)
+
+# For testing
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Inventory calibration profiles")
+    parser.add_argument("--ui-scale", type=float, help="Set the RuneLite scaling in percent")
+    parser.add_argument("--default-origin", type=int, nargs=2, metavar=("LEFT", "TOP"),
+                        help="Set the client position the default coordinates fit at")
+    args = parser.parse_args()
+
+    if args.ui_scale is not None:
+        set_ui_scale(args.ui_scale)
+    if args.default_origin is not None:
+        set_default_origin(args.default_origin)
+
+    print("Calibration Profiles")
+    print("--------------------")
+    store = load_profiles()
+    print(f"UI scale: {store['ui_scale']:g}%")
+    print(f"Default coordinates fit a client at: {store.get('default_origin', 'not recorded')}")
+    for name, config in sorted(store['profiles'].items()):
+        print(f"{name}: {config}")
+
+    key = current_profile_key()
+    if key is not None:
+        print(f"Current setup: {key_to_string(key)}")
+        print(f"Config for this setup: {find_profile(key) or derive_profile(key)}")
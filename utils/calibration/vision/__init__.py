@@ -5,13 +5,18 @@ This subpackage contains utilities for calibrating aspects of
 OSWS bots using computer vision techniques.
 """
 
-__all__ = ["screenshot"]
+__all__ = ["screenshot", "debug_writer", "detection", "lattice",
+           "stage_timer", "corpus", "color_lut", "color_tuner"]
 
 # Import important utilities for easier access
 from .screenshot import (
     take_screenshot, 
     detect_inventory_slots, 
+    detect_grid,
     save_calibration,
+    calibrate_grid,
     calibrate_inventory,
     save_debug_image
-) 
\ No newline at end of file
+)
+from .debug_writer import set_debug_level, flush_debug_images
+from .lattice import fit_lattice 
@@ -0,0 +1,293 @@
+"""
+Colour Class Lookup Table
+
+This module replaces the HSV conversion and per-range cv2.inRange() calls of
+slot detection with one table lookup per pixel. Every BGR colour is quantized
+to LUT_BITS bits per channel, and a precomputed table maps each quantized
+colour to a byte whose bit i is set when the colour lies in HSV range i. One
+pass over the image labels every range at once; each range mask is then a
+bit test of the labels.
+
+Key features:
+- Tables built from the HSV ranges themselves, so changing a range builds a
+  new table automatically
+- A quantized cell is in a range when most of the 8-bit colours it covers
+  are, which keeps masks close to the exact HSV masks
+- Tables cached on disk in config/color_lut/, named after a hash of the
+  ranges, and in memory once loaded
+- Up to 8 ranges per table (one bit each)
+
+Detection uses the tables when enabled with the OSWS_COLOR_LUT environment
+variable ('1') or set_color_lut_enabled(). It is off by default.
+
+Performance considerations:
+- With 5 bits the table has 32768 entries and fits in the L1 cache. The index
+  of every pixel is assembled from its channels with four 8-bit cv2.LUT calls
+  into a little-endian uint16, then looked up with np.take
+- Building a table converts all 16.7 million colours once, one blue plane at
+  a time (under a second). Later runs load the cached table from disk
+- The table replaces one HSV conversion plus one cv2.inRange() per range, so
+  it pays off with several ranges on CPUs where OpenCV's colour conversion is
+  not vectorized. With OpenCV's SIMD paths the HSV route is as fast or faster,
+  which is why the table is opt-in; measure with
+  tests/vision/detection_benchmark.py --lut
+- Quantization moves range boundaries by up to half a cell, a fraction of a
+  percent of colours. Slot outlines are far from the boundaries
+"""
+
+import os
+import hashlib
+import logging
+import threading
+import numpy as np
+import cv2
+
+# Set up logging
+logging.basicConfig(level=logging.INFO,
+                    format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Get the project root directory
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '../../..'))
+LUT_DIR = os.path.join(project_root, 'config', 'color_lut')
+
+# Bits kept per channel. At most 5, so the index of a colour fits in 16 bits
+LUT_BITS = 5
+MAX_RANGES = 8
+LUT_VERSION = 1  # Bump when the way tables are built changes
+
+_tables = {}
+_tables_lock = threading.Lock()
+_index_tables = {}
+_lut_enabled = os.environ.get('OSWS_COLOR_LUT', '0') == '1'
+
+def set_color_lut_enabled(enabled):
+    """
+    Enable or disable colour LUT masks for slot detection.
+
+    Args:
+        enabled (bool): True to build masks from colour tables
+    """
+    global _lut_enabled
+    _lut_enabled = bool(enabled)
+
+def color_lut_enabled():
+    """
+    Check whether slot detection builds masks from colour tables.
+
+    Returns:
+        bool: True if enabled
+    """
+    return _lut_enabled
+
+def lut_key(ranges, bits=LUT_BITS):
+    """
+    Name of the table for a list of HSV ranges.
+
+    Args:
+        ranges (list): (low, high) HSV bound pairs
+        bits (int): Bits kept per channel
+
+    Returns:
+        str: Hex digest identifying the table
+    """
+    digest = hashlib.sha1(f"v{LUT_VERSION}/b{bits}/".encode())
+    for low, high in ranges:
+        digest.update(bytes(np.asarray(low, dtype=np.uint8)))
+        digest.update(bytes(np.asarray(high, dtype=np.uint8)))
+    return digest.hexdigest()[:16]
+
+def build_color_lut(ranges, bits=LUT_BITS):
+    """
+    Build the colour class table for HSV ranges.
+
+    Args:
+        ranges (list): (low, high) HSV bound pairs, at most MAX_RANGES
+        bits (int): Bits kept per channel (1 to 5)
+
+    Returns:
+        numpy.ndarray: uint8 table of 2 ** (3 * bits) entries, bit i set for range i
+    """
+    if not 1 <= bits <= 5:
+        raise ValueError(f"Unsupported LUT bits: {bits}. Use 1 to 5.")
+    if len(ranges) > MAX_RANGES:
+        raise ValueError(f"A colour LUT holds at most {MAX_RANGES} ranges, got {len(ranges)}")
+
+    levels = 1 << bits
+    cell = 256 // levels
+    counts = np.zeros((len(ranges), levels, levels, levels), np.uint32)
+
+    # Every (green, red) pair of one blue value, converted and tested in one go
+    green, red = np.meshgrid(np.arange(256, dtype=np.uint8), np.arange(256, dtype=np.uint8),
+                             indexing='ij')
+    plane = np.empty((256, 256, 3), np.uint8)
+    plane[..., 1] = green
+    plane[..., 2] = red
+    for blue in range(256):
+        plane[..., 0] = blue
+        hsv = cv2.cvtColor(plane, cv2.COLOR_BGR2HSV)
+        for i, (low, high) in enumerate(ranges):
+            inside = cv2.inRange(hsv, low, high) // 255
+            counts[i, blue // cell] += inside.reshape(levels, cell, levels, cell).sum(axis=(1, 3),
+                                                                                      dtype=np.uint32)
+
+    # A cell belongs to a range when at least half of its colours do
+    table = np.zeros(levels ** 3, np.uint8)
+    for i in range(len(ranges)):
+        table |= ((counts[i].ravel() * 2 >= cell ** 3).astype(np.uint8) << i)
+    return table
+
+def load_color_lut(ranges, bits=LUT_BITS, directory=LUT_DIR):
+    """
+    Get the colour class table for HSV ranges, building and caching it if needed.
+
+    Args:
+        ranges (list): (low, high) HSV bound pairs, at most MAX_RANGES
+        bits (int): Bits kept per channel (1 to 5)
+        directory (str): Disk cache directory
+
+    Returns:
+        numpy.ndarray: Table from build_color_lut()
+    """
+    key = lut_key(ranges, bits)
+    with _tables_lock:
+        table = _tables.get(key)
+        if table is not None:
+            return table
+
+        path = os.path.join(directory, f"{key}.npy")
+        try:
+            if os.path.exists(path):
+                table = np.load(path)
+                if table.shape != (1 << (3 * bits),):
+                    table = None
+        except (OSError, ValueError) as e:
+            logger.warning(f"Could not read colour LUT {path}: {e}")
+            table = None
+
+        if table is None:
+            logger.info(f"Building colour LUT for {len(ranges)} ranges...")
+            table = build_color_lut(ranges, bits)
+            try:
+                os.makedirs(directory, exist_ok=True)
+                np.save(path, table)
+            except OSError as e:
+                logger.warning(f"Could not cache colour LUT: {e}")
+
+        _tables[key] = table
+        return table
+
+def _index_luts(bits):
+    """
+    Per-channel tables splitting each channel's share of the colour index
+    into the low and the high byte of a uint16. Tables that are all zero are
+    left out.
+
+    Returns:
+        tuple: (low byte tables, high byte tables), each a list of
+            (BGR channel, (256,) uint8 table) pairs
+    """
+    tables = _index_tables.get(bits)
+    if tables is None:
+        level = np.arange(256, dtype=np.uint32) >> (8 - bits)
+        shares = [level << (2 * bits), level << bits, level]  # Blue, green, red
+        low = [(c, (share & 0xFF).astype(np.uint8)) for c, share in enumerate(shares)]
+        high = [(c, (share >> 8).astype(np.uint8)) for c, share in enumerate(shares)]
+        tables = ([(c, t) for c, t in low if t.any()] or low[:1],
+                  [(c, t) for c, t in high if t.any()] or high[:1])
+        _index_tables[bits] = tables
+    return tables
+
+def _index_byte(channels, tables):
+    """OR of the table lookups of one index byte."""
+    channel, table = tables[0]
+    result = cv2.LUT(channels[channel], table)
+    for channel, table in tables[1:]:
+        result = cv2.bitwise_or(result, cv2.LUT(channels[channel], table))
+    return result
+
+def color_index(image, bits=LUT_BITS):
+    """
+    Quantized colour index of every pixel.
+
+    Args:
+        image (numpy.ndarray): BGR or BGRA image
+        bits (int): Bits kept per channel (1 to 5)
+
+    Returns:
+        numpy.ndarray: (height, width) uint16 index into a colour table
+    """
+    low_tables, high_tables = _index_luts(bits)
+    channels = cv2.split(image)
+    low = _index_byte(channels, low_tables)
+    high = _index_byte(channels, high_tables)
+    # Interleaving the bytes yields the little-endian uint16 index
+    return cv2.merge([low, high]).view('<u2')[..., 0]
+
+def label_image(image, table, bits=LUT_BITS):
+    """
+    Colour class labels of every pixel.
+
+    Args:
+        image (numpy.ndarray): BGR or BGRA image
+        table (numpy.ndarray): Table from load_color_lut()
+        bits (int): Bits per channel the table was built with
+
+    Returns:
+        numpy.ndarray: (height, width) uint8 labels, bit i set for range i
+    """
+    return np.take(table, color_index(image, bits))
+
+def range_mask(labels, index):
+    """
+    Mask of one range from colour class labels.
+
+    Args:
+        labels (numpy.ndarray): Labels from label_image()
+        index (int): Range index
+
+    Returns:
+        numpy.ndarray: uint8 mask (0 or 255), like cv2.inRange()
+    """
+    return cv2.compare(cv2.bitwise_and(labels, 1 << index), 0, cv2.CMP_GT)
+
+def lut_range_masks(image, ranges, bits=LUT_BITS):
+    """
+    Build the mask of every colour range with one table lookup.
+
+    Equivalent to build_range_masks() on the HSV image, up to quantization.
+
+    Args:
+        image (numpy.ndarray): BGR or BGRA image
+        ranges (list): (low, high) HSV bound pairs, at most MAX_RANGES
+        bits (int): Bits kept per channel (1 to 5)
+
+    Returns:
+        list: One uint8 mask (0 or 255) per range
+    """
+    labels = label_image(image, load_color_lut(ranges, bits), bits)
+    return [range_mask(labels, i) for i in range(len(ranges))]
+
+# For testing
+if __name__ == "__main__":
+    import sys
+    import time
+    from .screenshot import YELLOW_HSV_LOW, YELLOW_HSV_HIGH, ALT_YELLOW_RANGES
+
+    print("Colour Class Lookup Table")
+    print("-------------------------")
+    ranges = [(YELLOW_HSV_LOW, YELLOW_HSV_HIGH)] + ALT_YELLOW_RANGES
+    start = time.perf_counter()
+    load_color_lut(ranges)
+    print(f"Table {lut_key(ranges)} ready in {(time.perf_counter() - start) * 1000:.0f} ms")
+
+    if len(sys.argv) > 1:
+        image = cv2.imread(sys.argv[1])
+        if image is None:
+            print(f"Cannot read {sys.argv[1]}")
+            sys.exit(1)
+        hsv = cv2.cvtColor(image, cv2.COLOR_BGR2HSV)
+        for i, mask in enumerate(lut_range_masks(image, ranges)):
+            exact = cv2.inRange(hsv, *ranges[i])
+            print(f"Range {i}: {cv2.countNonZero(cv2.bitwise_xor(mask, exact))} pixels differ "
+                  f"from the HSV mask")
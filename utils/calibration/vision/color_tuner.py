@@ -0,0 +1,293 @@
+"""
+Highlight Colour Range Tuner
+
+This module derives the HSV ranges of the slot highlight from labelled
+screenshots instead of relying on the hand-picked YELLOW_HSV_LOW/HIGH and
+ALT_YELLOW_RANGES. With tuned ranges the detector finds the slots with its
+first range and the retry cascade becomes the rare case.
+
+The corpus (see corpus.py) gives the slot grid of every screenshot. Pixels
+are counted in a 3D HSV histogram per slot cell and for the background
+around the inventory. A colour bin belongs to the highlight when it shows up
+in most slot cells (item icons differ from slot to slot, the highlight does
+not) and is much denser inside the cells than in the background. The
+selected bins are grouped into contiguous hue runs and each run becomes the
+tightest HSV box around its bins.
+
+Files (under config/):
+- color_ranges.json: profile name -> tuned ranges and their scores
+
+Key features:
+- tune_ranges(): ranges from a list of corpus cases
+- tuned_ranges(): the ranges of the current display profile (or the
+  'default' entry), empty when none were tuned
+- Command line:
+    python -m utils.calibration.vision.color_tuner tests/vision/corpus
+    python -m utils.calibration.vision.color_tuner corpus --profile default --dry-run
+
+Performance considerations:
+- One HSV conversion and one np.bincount per screenshot fill every cell
+  histogram and the background histogram at once
+- Tuning runs offline; the detector only reads a small JSON file
+"""
+
+import os
+import json
+import logging
+import argparse
+
+import numpy as np
+import cv2
+
+from ..config import CONFIG_DIR, load_config, save_config
+from .corpus import load_corpus, load_case_image, grid_centers
+
+# Set up logging
+logging.basicConfig(level=logging.INFO,
+                    format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+RANGES_FILE = os.path.join(CONFIG_DIR, 'color_ranges.json')
+DEFAULT_PROFILE_NAME = 'default'
+
+# Histogram bins per HSV channel (OpenCV hue runs 0-179)
+HUE_BINS = 30
+SAT_BINS = 16
+VAL_BINS = 16
+HUE_STEP = 180 // HUE_BINS
+SAT_STEP = 256 // SAT_BINS
+VAL_STEP = 256 // VAL_BINS
+
+# Bin selection settings
+MIN_CELL_PIXELS = 4        # Pixels of a bin in a slot cell for the bin to count as present there
+MIN_PRESENCE = 0.5         # Fraction of slot cells a highlight bin must be present in
+MIN_SEPARATION = 4.0       # Minimum ratio of cell density to background density
+MAX_TUNED_RANGES = 3       # Ranges kept, largest highlight share first
+
+def _cell_labels(shape, config, offset):
+    """
+    Label every pixel of an image with its slot cell.
+
+    Args:
+        shape (tuple): Image shape
+        config (dict): Expected grid in screen coordinates
+        offset (tuple): Screen position of the image's top-left pixel
+
+    Returns:
+        numpy.ndarray: int32 labels, 0-27 for slot cells, 28 for background
+    """
+    height, width = shape[:2]
+    centers = grid_centers(config) - offset
+    labels = np.full((height, width), 28, np.int32)
+    half_x, half_y = config['x_spacing'] / 2, config['y_spacing'] / 2
+    for index, (x, y) in enumerate(centers):
+        x0, x1 = int(round(x - half_x)), int(round(x + half_x))
+        y0, y1 = int(round(y - half_y)), int(round(y + half_y))
+        labels[max(0, y0):max(0, y1), max(0, x0):max(0, x1)] = index
+    return labels
+
+def case_histograms(image, config, offset=None):
+    """
+    Count HSV histogram bins per slot cell and in the background.
+
+    Full screenshots are reduced to their bottom right quadrant, where the
+    detector looks for the inventory.
+
+    Args:
+        image (numpy.ndarray): BGR screenshot
+        config (dict): Expected grid in screen coordinates
+        offset (tuple, optional): Screen position of the image, None for a full screenshot
+
+    Returns:
+        numpy.ndarray: (29, HUE_BINS * SAT_BINS * VAL_BINS) counts, rows 0-27
+            for the slot cells and row 28 for the background
+    """
+    if offset is None:
+        height, width = image.shape[:2]
+        offset = (width // 2, height // 2)
+        image = image[height // 2:, width // 2:]
+
+    hsv = cv2.cvtColor(image, cv2.COLOR_BGR2HSV)
+    bins = ((hsv[..., 0].astype(np.int32) // HUE_STEP) * SAT_BINS
+            + hsv[..., 1] // SAT_STEP) * VAL_BINS + hsv[..., 2] // VAL_STEP
+    labels = _cell_labels(image.shape, config, np.asarray(offset, dtype=np.float64))
+
+    size = HUE_BINS * SAT_BINS * VAL_BINS
+    counts = np.bincount((labels * size + bins).ravel(), minlength=29 * size)
+    return counts.reshape(29, size)
+
+def select_bins(histograms):
+    """
+    Pick the highlight bins from the histograms of one or more screenshots.
+
+    Args:
+        histograms (list): Arrays from case_histograms()
+
+    Returns:
+        tuple: ((HUE_BINS, SAT_BINS, VAL_BINS) boolean selection,
+            cell pixel counts per bin, background pixel counts per bin)
+    """
+    presence = sum((h[:28] >= MIN_CELL_PIXELS).sum(axis=0) for h in histograms)
+    cell_counts = sum(h[:28].sum(axis=0) for h in histograms)
+    background_counts = sum(h[28] for h in histograms)
+
+    cell_density = cell_counts / max(cell_counts.sum(), 1)
+    background_density = background_counts / max(background_counts.sum(), 1)
+    selected = ((presence >= MIN_PRESENCE * 28 * len(histograms))
+                & (cell_density > MIN_SEPARATION * background_density))
+    shape = (HUE_BINS, SAT_BINS, VAL_BINS)
+    return selected.reshape(shape), cell_counts.reshape(shape), background_counts.reshape(shape)
+
+def bins_to_ranges(selected, cell_counts):
+    """
+    Turn selected bins into the tightest HSV boxes, one per contiguous hue run.
+
+    Args:
+        selected (numpy.ndarray): Boolean bin selection
+        cell_counts (numpy.ndarray): Cell pixel counts per bin, used to rank the runs
+
+    Returns:
+        list: (low, high) uint8 HSV bound pairs, largest highlight share first
+    """
+    hues = np.flatnonzero(selected.any(axis=(1, 2)))
+    if hues.size == 0:
+        return []
+    runs = np.split(hues, np.flatnonzero(np.diff(hues) > 1) + 1)
+
+    ranked = []
+    for run in runs:
+        block = selected[run[0]:run[-1] + 1]
+        sats = np.flatnonzero(block.any(axis=(0, 2)))
+        vals = np.flatnonzero(block.any(axis=(0, 1)))
+        low = np.array([run[0] * HUE_STEP, sats[0] * SAT_STEP, vals[0] * VAL_STEP])
+        high = np.array([(run[-1] + 1) * HUE_STEP - 1, (sats[-1] + 1) * SAT_STEP - 1,
+                         (vals[-1] + 1) * VAL_STEP - 1])
+        share = cell_counts[run[0]:run[-1] + 1][block].sum()
+        ranked.append((share, np.minimum(low, 255).astype(np.uint8),
+                       np.minimum(high, (179, 255, 255)).astype(np.uint8)))
+
+    ranked.sort(key=lambda item: -item[0])
+    return [(low, high) for _, low, high in ranked[:MAX_TUNED_RANGES]]
+
+def _box_counts(counts, low, high):
+    """Pixels of a per-bin count array inside an HSV box."""
+    h0, s0, v0 = low[0] // HUE_STEP, low[1] // SAT_STEP, low[2] // VAL_STEP
+    h1, s1, v1 = high[0] // HUE_STEP, high[1] // SAT_STEP, high[2] // VAL_STEP
+    return int(counts[h0:h1 + 1, s0:s1 + 1, v0:v1 + 1].sum())
+
+def tune_ranges(cases):
+    """
+    Derive highlight ranges from labelled screenshots.
+
+    Args:
+        cases (list): CorpusCase tuples from load_corpus()
+
+    Returns:
+        dict: 'ranges' as [[low], [high]] lists, 'cases', and per range the
+            share of the highlight pixels it covers ('coverage') and the
+            fraction of background pixels it lets through ('background_rate').
+            None if no case could be read or no highlight bin was found
+    """
+    histograms = []
+    for case in cases:
+        image = load_case_image(case)
+        if image is not None:
+            histograms.append(case_histograms(image, case.expected, case.offset))
+    if not histograms:
+        logger.error("No readable cases to tune on")
+        return None
+
+    selected, cell_counts, background_counts = select_bins(histograms)
+    ranges = bins_to_ranges(selected, cell_counts)
+    if not ranges:
+        logger.error("No colour separates the slots from the background")
+        return None
+
+    highlight_total = max(int(cell_counts[selected].sum()), 1)
+    background_total = max(int(background_counts.sum()), 1)
+    result = {'ranges': [], 'coverage': [], 'background_rate': [], 'cases': len(histograms)}
+    for low, high in ranges:
+        box = np.zeros_like(selected)
+        box[low[0] // HUE_STEP:high[0] // HUE_STEP + 1, low[1] // SAT_STEP:high[1] // SAT_STEP + 1,
+            low[2] // VAL_STEP:high[2] // VAL_STEP + 1] = True
+        result['ranges'].append([low.tolist(), high.tolist()])
+        result['coverage'].append(round(int(cell_counts[selected & box].sum()) / highlight_total, 4))
+        result['background_rate'].append(
+            round(_box_counts(background_counts, low, high) / background_total, 6))
+    return result
+
+def save_tuned_ranges(result, name=DEFAULT_PROFILE_NAME, path=RANGES_FILE):
+    """
+    Store tuned ranges under a profile name.
+
+    Args:
+        result (dict): Result of tune_ranges()
+        name (str): Profile name (see profiles.key_to_string) or 'default'
+        path (str): Store file
+
+    Returns:
+        bool: True if successful, False otherwise
+    """
+    store = load_config(path)
+    store[name] = result
+    return save_config(store, path)
+
+def tuned_ranges(name=None, path=RANGES_FILE):
+    """
+    Get the tuned highlight ranges for a profile.
+
+    Args:
+        name (str, optional): Profile name, defaults to the current display
+            profile and falls back to the 'default' entry
+        path (str): Store file
+
+    Returns:
+        list: (low, high) uint8 HSV bound pairs, empty if none were tuned
+    """
+    store = load_config(path)
+    if not store:
+        return []
+    if name is None:
+        # Imported here, profiles needs a capture backend for the screen size
+        from ..profiles import current_profile_key, key_to_string
+        key = current_profile_key()
+        name = key_to_string(key) if key is not None else DEFAULT_PROFILE_NAME
+    entry = store.get(name) or store.get(DEFAULT_PROFILE_NAME)
+    if not entry:
+        return []
+    return [(np.array(low, dtype=np.uint8), np.array(high, dtype=np.uint8))
+            for low, high in entry['ranges']]
+
+def main():
+    """Tune the highlight ranges on a corpus."""
+    parser = argparse.ArgumentParser(description="Highlight colour range tuner")
+    parser.add_argument("corpus", help="Corpus directory (see corpus.py)")
+    parser.add_argument("--profile", help="Profile name to store the ranges under "
+                                          "(default: the current display profile)")
+    parser.add_argument("--dry-run", action="store_true", help="Print the ranges without saving")
+    args = parser.parse_args()
+
+    cases = load_corpus(args.corpus)
+    result = tune_ranges(cases)
+    if result is None:
+        raise SystemExit(1)
+
+    print(f"Tuned on {result['cases']} screenshots:")
+    for (low, high), coverage, rate in zip(result['ranges'], result['coverage'],
+                                           result['background_rate']):
+        print(f"  HSV {low} - {high}: {coverage:.1%} of highlight pixels, "
+              f"{rate:.4%} of background pixels")
+    if args.dry_run:
+        return
+
+    name = args.profile
+    if name is None:
+        from ..profiles import current_profile_key, key_to_string
+        key = current_profile_key()
+        name = key_to_string(key) if key is not None else DEFAULT_PROFILE_NAME
+    if save_tuned_ranges(result, name):
+        print(f"Saved as profile {name}")
+
+# For testing
+if __name__ == "__main__":
+    main()
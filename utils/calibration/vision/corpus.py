@@ -0,0 +1,139 @@
+"""
+Screenshot Corpus
+
+This module loads saved screenshots together with the inventory grid each one
+is expected to produce, so the vision pipeline can be run and checked without
+a live game client.
+
+A corpus is a directory with one subdirectory per case:
+
+    corpus/
+        fixed_1080p/
+            screenshot.png
+            inventory_config.json
+        resizable_1440p_bank_open/
+            screenshot.png
+            inventory_config.json
+
+inventory_config.json uses the same keys as config/inventory_config.json
+(base_x, base_y, x_spacing, y_spacing) in full screen coordinates. If the
+screenshot only covers part of the screen, such as the quadrant capture saved
+by calibrate_inventory(), add "offset": [left, top] with the position of the
+screenshot's top-left pixel on the screen.
+
+Key features:
+- Case discovery in sorted order, skipping incomplete folders
+- Per-slot pixel error between a detected and an expected grid
+"""
+
+import os
+import json
+import logging
+from collections import namedtuple
+
+import cv2
+import numpy as np
+
+from .lattice import grid_indices, predict_centers
+
+# Set up logging
+logging.basicConfig(level=logging.INFO,
+                    format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# File names inside a case directory
+CORPUS_IMAGE = 'screenshot.png'
+CORPUS_EXPECTED = 'inventory_config.json'
+
+# Keys every expected config must provide
+GRID_KEYS = ('base_x', 'base_y', 'x_spacing', 'y_spacing')
+
+CorpusCase = namedtuple('CorpusCase', ['name', 'image_path', 'expected', 'offset'])
+
+def load_corpus(directory):
+    """
+    Find every complete case in a corpus directory.
+
+    Args:
+        directory (str): Corpus directory
+
+    Returns:
+        list: CorpusCase tuples sorted by name
+    """
+    cases = []
+    if not os.path.isdir(directory):
+        logger.warning(f"Corpus directory not found: {directory}")
+        return cases
+
+    for name in sorted(os.listdir(directory)):
+        case_dir = os.path.join(directory, name)
+        image_path = os.path.join(case_dir, CORPUS_IMAGE)
+        expected_path = os.path.join(case_dir, CORPUS_EXPECTED)
+        if not (os.path.isfile(image_path) and os.path.isfile(expected_path)):
+            continue
+
+        try:
+            with open(expected_path, 'r') as f:
+                expected = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Skipping {name}: cannot read {CORPUS_EXPECTED} ({e})")
+            continue
+
+        missing = [key for key in GRID_KEYS if key not in expected]
+        if missing:
+            logger.warning(f"Skipping {name}: {CORPUS_EXPECTED} is missing {missing}")
+            continue
+
+        offset = tuple(expected.pop('offset')) if 'offset' in expected else None
+        cases.append(CorpusCase(name, image_path, expected, offset))
+
+    return cases
+
+def load_case_image(case):
+    """
+    Read the screenshot of a case.
+
+    Args:
+        case (CorpusCase): Case to load
+
+    Returns:
+        numpy.ndarray: BGR image, or None if it cannot be read
+    """
+    image = cv2.imread(case.image_path, cv2.IMREAD_COLOR)
+    if image is None:
+        logger.error(f"Failed to read {case.image_path}")
+    return image
+
+def grid_centers(config, cols=4, rows=7):
+    """
+    Get the centre of every slot described by a grid config.
+
+    Args:
+        config (dict): base_x, base_y, x_spacing and y_spacing, optionally slot_centers
+        cols (int): Number of columns
+        rows (int): Number of rows
+
+    Returns:
+        numpy.ndarray: (rows * cols, 2) slot centres in slot order
+    """
+    if 'slot_centers' in config:
+        return np.asarray(config['slot_centers'], dtype=np.float64)
+    return predict_centers((config['base_x'], config['base_y']),
+                           (config['x_spacing'], 0.0), (0.0, config['y_spacing']),
+                           grid_indices(cols, rows))
+
+def slot_errors(detected, expected, cols=4, rows=7):
+    """
+    Distance between each detected slot centre and the expected one.
+
+    Args:
+        detected (dict): Result of detect_inventory_slots()
+        expected (dict): Expected grid config
+        cols (int): Number of columns
+        rows (int): Number of rows
+
+    Returns:
+        numpy.ndarray: (rows * cols,) errors in pixels
+    """
+    difference = grid_centers(detected, cols, rows) - grid_centers(expected, cols, rows)
+    return np.hypot(difference[:, 0], difference[:, 1])
@@ -0,0 +1,231 @@
+"""
+Asynchronous Debug Image Writer
+
+This module writes calibration debug images from a background thread so PNG
+encoding and file I/O stay off the detection path.
+
+Key features:
+- Debug levels: off, summary (final results only) and full (every stage)
+- Bounded queue; images are dropped rather than blocking detection
+- Fast PNG compression settings
+- Incremental retention: at most one old file is removed per write
+
+The level defaults to 'summary' and can be set with the OSWS_DEBUG_LEVEL
+environment variable ('off', 'summary' or 'full') or set_debug_level().
+
+Performance considerations:
+- With the level set to 'off', write_debug_image() returns before touching
+  the image or the disk, so detection does no file I/O at all
+- Callers that build images only for debugging (contour overlays, grids)
+  should check debug_enabled() first so the drawing work is skipped too
+"""
+
+import os
+import glob
+import queue
+import atexit
+import logging
+import threading
+from collections import deque
+
+import cv2
+
+# Set up logging
+logging.basicConfig(level=logging.INFO,
+                    format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Get the project root directory
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '../../..'))
+DEBUG_DIR = os.path.join(project_root, 'debug')
+
+# Debug levels
+DEBUG_OFF = 0
+DEBUG_SUMMARY = 1
+DEBUG_FULL = 2
+DEBUG_LEVELS = {'off': DEBUG_OFF, 'summary': DEBUG_SUMMARY, 'full': DEBUG_FULL}
+
+# Writer settings
+DEBUG_QUEUE_SIZE = 32      # Images waiting to be written before new ones are dropped
+DEBUG_KEEP_FILES = 40      # Enough for one full-level detection session
+PNG_COMPRESSION = 1        # 0-9, 1 is several times faster than the default 3
+
+def _parse_level(level):
+    """Convert a level name or number to a debug level constant."""
+    if isinstance(level, str):
+        if level.lower() not in DEBUG_LEVELS:
+            raise ValueError(f"Unknown debug level: {level}. Must be one of {list(DEBUG_LEVELS)}.")
+        return DEBUG_LEVELS[level.lower()]
+    if level not in DEBUG_LEVELS.values():
+        raise ValueError(f"Unknown debug level: {level}. Must be 0, 1 or 2.")
+    return level
+
+_debug_level = _parse_level(os.environ.get('OSWS_DEBUG_LEVEL', 'summary'))
+
+def set_debug_level(level):
+    """
+    Set the global debug level.
+
+    Args:
+        level (int or str): DEBUG_OFF/DEBUG_SUMMARY/DEBUG_FULL or 'off'/'summary'/'full'
+    """
+    global _debug_level
+    _debug_level = _parse_level(level)
+
+def get_debug_level():
+    """
+    Get the global debug level.
+
+    Returns:
+        int: DEBUG_OFF, DEBUG_SUMMARY or DEBUG_FULL
+    """
+    return _debug_level
+
+def debug_enabled(level=DEBUG_SUMMARY):
+    """
+    Check whether images of the given level are currently saved.
+
+    Args:
+        level (int): Level of the image the caller is about to build
+
+    Returns:
+        bool: True if the image would be written
+    """
+    return _debug_level != DEBUG_OFF and level <= _debug_level
+
+class DebugImageWriter:
+    """
+    Background thread that encodes and writes debug images.
+
+    Images are copied on submit, since callers may reuse their buffers
+    (e.g. CaptureSession frames), and written in submission order.
+    """
+
+    def __init__(self, directory=DEBUG_DIR, queue_size=DEBUG_QUEUE_SIZE,
+                 keep_files=DEBUG_KEEP_FILES, compression=PNG_COMPRESSION):
+        """
+        Args:
+            directory (str): Directory the images are written to
+            queue_size (int): Maximum number of pending images
+            keep_files (int): Maximum number of PNG files kept in the directory
+            compression (int): PNG compression level (0-9)
+        """
+        self.directory = directory
+        self.keep_files = keep_files
+        self.params = [cv2.IMWRITE_PNG_COMPRESSION, compression]
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._files = None  # Oldest first, loaded by the worker on first write
+        self._thread = threading.Thread(target=self._run, name="DebugImageWriter")
+        self._thread.daemon = True
+        self._thread.start()
+
+    def submit(self, image, filename):
+        """
+        Queue an image for writing.
+
+        Args:
+            image (numpy.ndarray): Image to save
+            filename (str): File name inside the debug directory
+
+        Returns:
+            bool: True if queued, False if the queue was full and the image dropped
+        """
+        try:
+            self._queue.put_nowait((image.copy(), filename))
+            return True
+        except queue.Full:
+            logger.debug(f"Debug queue full, dropped {filename}")
+            return False
+
+    def flush(self):
+        """Block until every queued image has been written."""
+        self._queue.join()
+
+    def trim(self):
+        """Rescan the debug directory and remove files over the retention limit."""
+        self._queue.put((None, None))
+        self.flush()
+
+    def _load_existing(self):
+        """Scan the directory once so retention covers files from earlier runs."""
+        os.makedirs(self.directory, exist_ok=True)
+        existing = glob.glob(os.path.join(self.directory, "*.png"))
+        existing.sort(key=os.path.getmtime)
+        self._files = deque(existing)
+
+    def _remove_oldest(self):
+        """Delete the oldest tracked file."""
+        old = self._files.popleft()
+        try:
+            os.remove(old)
+            logger.debug(f"Deleted old debug file: {old}")
+        except OSError as e:
+            logger.warning(f"Failed to delete {old}: {e}")
+
+    def _retain(self, path):
+        """Record a written file and remove the oldest one if over the limit."""
+        if path in self._files:
+            self._files.remove(path)
+        self._files.append(path)
+        if len(self._files) > self.keep_files:
+            self._remove_oldest()
+
+    def _run(self):
+        """Worker loop."""
+        while True:
+            image, filename = self._queue.get()
+            try:
+                if self._files is None or image is None:
+                    self._load_existing()
+                if image is None:
+                    while len(self._files) > self.keep_files:
+                        self._remove_oldest()
+                    continue
+                path = os.path.join(self.directory, filename)
+                os.makedirs(self.directory, exist_ok=True)
+                if not cv2.imwrite(path, image, self.params):
+                    raise IOError(f"cv2.imwrite failed for {path}")
+                self._retain(path)
+                logger.debug(f"Saved debug image to {path}")
+            except Exception as e:
+                logger.error(f"Error saving debug image {filename}: {e}")
+            finally:
+                self._queue.task_done()
+
+_writer = None
+_writer_lock = threading.Lock()
+
+def get_debug_writer():
+    """
+    Get the shared debug writer, starting its thread on first use.
+
+    Returns:
+        DebugImageWriter: The shared writer
+    """
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            _writer = DebugImageWriter()
+            atexit.register(_writer.flush)
+        return _writer
+
+def write_debug_image(image, filename, level=DEBUG_SUMMARY):
+    """
+    Queue a debug image if the current level allows it.
+
+    Args:
+        image (numpy.ndarray): Image to save
+        filename (str): File name inside the debug directory
+        level (int): DEBUG_SUMMARY for final results, DEBUG_FULL for intermediate stages
+
+    Returns:
+        bool: True if the image was queued
+    """
+    if not debug_enabled(level):
+        return False
+    return get_debug_writer().submit(image, filename)
+
+def flush_debug_images():
+    """Wait for pending debug images to reach the disk (no-op if none were queued)."""
+    if _writer is not None:
+        _writer.flush()
@@ -0,0 +1,480 @@
+"""
+Inventory Slot Detection Pipeline
+
+This module holds the image processing stages behind detect_inventory_slots():
+colour masks, mask clean-up, blob extraction and square scoring.
+
+Key features:
+- One HSV conversion per image, shared by every colour range
+- Range masks built on first use, so fallback ranges cost nothing when the
+  first range succeeds
+- Morphology and blob extraction run at most once per distinct range
+- Vectorized square scoring from connected-component statistics
+- Scores cached, so retrying at a lower confidence threshold is only a
+  re-filter of the cached scores
+- Optional coarse-to-fine mode: slots are found on a 1/2 or 1/4 downscaled
+  image and measured again at full resolution only around the candidates
+- Optional colour LUT masks (see color_lut): every range labelled by one
+  table lookup on the BGR image, without an HSV conversion
+
+Performance considerations:
+- The old cascade (primary range, three alternative ranges, three lower
+  thresholds) repeated the HSV conversion, morphology and contour search on
+  every attempt. With a DetectionContext the worst case costs one conversion
+  plus one blob search per range, and the threshold retries are nearly free
+- Area, bounding box and fill ratio of every blob come from a single
+  cv2.connectedComponentsWithStats call as NumPy arrays. Only blobs that can
+  still reach the threshold get a contour and polygon approximation, so a
+  noisy mask with thousands of blobs costs a handful of Python-level calls
+- In coarse-to-fine mode every whole-image stage works on 1/4 (scale 2) or
+  1/16 (scale 4) of the pixels. Only the box around the candidate slots is
+  processed at full resolution, so centres keep full resolution accuracy
+- Each stage reports its time through stage_timer when timing is enabled
+"""
+
+import logging
+import numpy as np
+import cv2
+
+from .debug_writer import DEBUG_FULL, debug_enabled, write_debug_image
+from .stage_timer import timed_stage
+from .color_lut import MAX_RANGES, color_lut_enabled, lut_range_masks
+
+# Set up logging
+logging.basicConfig(level=logging.INFO,
+                    format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Slot size limits in pixels (contour area)
+MIN_SLOT_AREA = 100
+MAX_SLOT_AREA = 5000
+
+# Kernel used to clean up colour masks
+MORPH_KERNEL = np.ones((3, 3), np.uint8)
+
+# Downscale factors supported by the coarse-to-fine mode
+PYRAMID_SCALES = (1, 2, 4)
+
+# Full resolution pixels added around the candidate slots when refining their centres
+REFINE_MARGIN = 6
+
+def calculate_square_confidence(contour):
+    """
+    Calculate how "square-like" a contour is, returning a confidence score.
+
+    Args:
+        contour: The contour to evaluate
+
+    Returns:
+        float: Confidence score from 0.0 to 1.0 (1.0 = perfect square)
+    """
+    # Get the bounding rectangle
+    x, y, w, h = cv2.boundingRect(contour)
+    rect_area = w * h
+
+    # Get contour area
+    contour_area = cv2.contourArea(contour)
+
+    # Perfect square would have contour area close to rectangle area
+    area_ratio = contour_area / rect_area if rect_area > 0 else 0
+
+    # A perfect square would have width = height
+    aspect_ratio = min(w, h) / max(w, h) if max(w, h) > 0 else 0
+
+    # Calculate approximation error for shape
+    epsilon = 0.02 * cv2.arcLength(contour, True)
+    approx = cv2.approxPolyDP(contour, epsilon, True)
+
+    # A square should have 4 corners
+    corners_score = 0
+    if len(approx) == 4:
+        corners_score = 1.0
+    else:
+        corners_score = 4.0 / (abs(len(approx) - 4) + 4)
+
+    # Combine scores, with more weight on having 4 corners and good aspect ratio
+    confidence = (0.4 * corners_score) + (0.4 * aspect_ratio) + (0.2 * area_ratio)
+
+    return min(confidence, 1.0)  # Cap at 1.0
+
+def score_contours(contours):
+    """
+    Score every slot-sized contour, independent of any confidence threshold.
+
+    Args:
+        contours: List of contours to score
+
+    Returns:
+        tuple: (contours within the slot size limits, their confidence scores)
+    """
+    result = []
+    confidences = []
+
+    for contour in contours:
+        area = cv2.contourArea(contour)
+        # Basic size filter first
+        if area < MIN_SLOT_AREA or area > MAX_SLOT_AREA:
+            continue
+        result.append(contour)
+        confidences.append(calculate_square_confidence(contour))
+
+    return result, confidences
+
+def filter_contours_by_confidence(contours, min_confidence=0.7):
+    """
+    Filter contours by their square confidence score.
+
+    Args:
+        contours: List of contours to filter
+        min_confidence: Minimum confidence score threshold
+
+    Returns:
+        list: Filtered contours that exceed confidence threshold
+    """
+    scored, confidences = score_contours(contours)
+    keep = [i for i, confidence in enumerate(confidences) if confidence >= min_confidence]
+    return [scored[i] for i in keep], [confidences[i] for i in keep]
+
+def build_range_masks(hsv_image, ranges):
+    """
+    Build the mask of every colour range from one HSV image.
+
+    Args:
+        hsv_image (numpy.ndarray): Image in HSV format
+        ranges (list): (low, high) HSV bound pairs
+
+    Returns:
+        list: One uint8 mask (0 or 255) per range
+    """
+    return [cv2.inRange(hsv_image, low, high) for low, high in ranges]
+
+def enhance_mask(mask, remove_noise=True):
+    """
+    Close small holes, remove noise and connect nearby pixels in a mask.
+
+    Args:
+        mask (numpy.ndarray): Raw colour mask
+        remove_noise (bool): Open the mask to remove specks. Downscaled masks
+            skip this, the opening would also erase slot outlines thinned to
+            a single pixel
+
+    Returns:
+        numpy.ndarray: Cleaned mask
+    """
+    mask = cv2.morphologyEx(mask, cv2.MORPH_CLOSE, MORPH_KERNEL)  # Close small holes
+    if remove_noise:
+        mask = cv2.morphologyEx(mask, cv2.MORPH_OPEN, MORPH_KERNEL)   # Remove small noise
+    return cv2.dilate(mask, MORPH_KERNEL, iterations=1)          # Connect nearby pixels
+
+def fill_holes(mask):
+    """
+    Fill background regions enclosed by a blob.
+
+    Slot highlights are hollow outlines. Filling them makes a blob's pixel
+    count match the area inside its external contour.
+
+    Args:
+        mask (numpy.ndarray): Binary mask (0 or 255)
+
+    Returns:
+        numpy.ndarray: Mask with enclosed holes set to 255
+    """
+    # Flood the outside background from a padded corner, what stays unflooded is a hole
+    flooded = cv2.copyMakeBorder(mask, 1, 1, 1, 1, cv2.BORDER_CONSTANT, value=0)
+    cv2.floodFill(flooded, None, (0, 0), 255)
+    return cv2.bitwise_or(mask, cv2.bitwise_not(flooded[1:-1, 1:-1]))
+
+class BlobScores:
+    """
+    Square confidence of every blob in a mask, scored in vectorized form.
+
+    The score matches calculate_square_confidence(): 0.4 * corners score +
+    0.4 * aspect ratio + 0.2 * fill ratio. Aspect and fill ratio are computed
+    for all blobs at once. The corners score needs a polygon approximation, so
+    it is only computed for blobs whose score could still reach the requested
+    threshold with a perfect corners score, and cached for later thresholds.
+    """
+
+    def __init__(self, mask, min_area=MIN_SLOT_AREA, max_area=MAX_SLOT_AREA):
+        """
+        Args:
+            mask (numpy.ndarray): Cleaned binary mask (0 or 255)
+            min_area (float): Smallest slot area in mask pixels
+            max_area (float): Largest slot area in mask pixels
+        """
+        # Label only the bounding box of the set pixels, usually a small part of the image
+        x0, y0, w0, h0 = cv2.boundingRect(mask)
+        self.origin = (int(x0), int(y0))
+        if w0 == 0 or h0 == 0:
+            mask = np.zeros((1, 1), np.uint8)
+        else:
+            mask = mask[y0:y0+h0, x0:x0+w0]
+
+        # Grana's block-based labelling is the fastest 8-connected algorithm in OpenCV
+        with timed_stage('contours'):
+            _, self.labels, stats, _ = cv2.connectedComponentsWithStatsWithAlgorithm(
+                fill_holes(mask), 8, cv2.CV_32S, cv2.CCL_GRANA
+            )
+        stats = stats[1:]  # Label 0 is the background
+        self.boxes = stats[:, :4]
+
+        with timed_stage('scoring'):
+            area = stats[:, cv2.CC_STAT_AREA].astype(np.float64)
+            width = stats[:, cv2.CC_STAT_WIDTH].astype(np.float64)
+            height = stats[:, cv2.CC_STAT_HEIGHT].astype(np.float64)
+            area_ratio = area / (width * height)
+            aspect_ratio = np.minimum(width, height) / np.maximum(width, height)
+
+            self.size_ok = (area >= min_area) & (area <= max_area)
+            self.shape_score = 0.4 * aspect_ratio + 0.2 * area_ratio
+        self.confidence = np.full(len(stats), np.nan)  # Exact scores, filled on demand
+        self.contours = {}
+
+    def _refine(self, indices):
+        """Extract the contours of some blobs and complete their scores with the corners term."""
+        # One contour search over just these blobs; 8-connected blobs never touch,
+        # so every external contour belongs to exactly one of them
+        with timed_stage('contours'):
+            selected = np.zeros(len(self.confidence) + 1, np.uint8)
+            selected[indices + 1] = 1
+            blobs = np.take(selected, self.labels)
+            contours, _ = cv2.findContours(blobs, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE,
+                                           offset=self.origin)
+
+        with timed_stage('scoring'):
+            for contour in contours:
+                x, y = contour[0, 0]
+                index = self.labels[y - self.origin[1], x - self.origin[0]] - 1
+
+                epsilon = 0.02 * cv2.arcLength(contour, True)
+                corners = len(cv2.approxPolyDP(contour, epsilon, True))
+                corners_score = 1.0 if corners == 4 else 4.0 / (abs(corners - 4) + 4)
+
+                self.confidence[index] = min(0.4 * corners_score + self.shape_score[index], 1.0)
+                self.contours[index] = contour
+
+    def select(self, min_confidence=0.7):
+        """
+        Get the blobs that reach a confidence threshold.
+
+        Args:
+            min_confidence (float): Minimum confidence score
+
+        Returns:
+            tuple: (contours, confidence scores) of the selected blobs
+        """
+        # 0.4 is the best possible corners term, anything below this bound can be skipped
+        candidates = np.flatnonzero(self.size_ok & (self.shape_score + 0.4 >= min_confidence))
+        pending = candidates[np.isnan(self.confidence[candidates])]
+        if len(pending):
+            self._refine(pending)
+
+        keep = candidates[self.confidence[candidates] >= min_confidence]
+        return [self.contours[i] for i in keep], self.confidence[keep].tolist()
+
+def _range_key(low, high):
+    """Hashable key identifying a colour range."""
+    return bytes(np.asarray(low, dtype=np.uint8)) + bytes(np.asarray(high, dtype=np.uint8))
+
+class DetectionContext:
+    """
+    Shared intermediates for detecting slots in one image.
+
+    The image is converted to HSV once when the context is created. Range
+    masks, blobs and their scores are computed the first time a range is used
+    and cached for every later threshold, so fallback ranges cost nothing
+    when the first range finds the slots. With a colour LUT every mask is
+    built up front from one lookup pass instead.
+
+    With scale 2 or 4 the whole cascade runs on a downscaled copy of the image
+    and detect() returns contours in downscaled coordinates. centers() maps
+    them back to full resolution centres.
+
+    Example:
+        context = DetectionContext(cropped, [(low, high), *ALT_YELLOW_RANGES])
+        contours, confidences = context.detect(0)                      # primary
+        contours, confidences = context.detect(0, min_confidence=0.5)  # re-filter only
+        centers = context.centers(0, contours)                         # (k, 2) in cropped pixels
+    """
+
+    def __init__(self, image, ranges, scale=1, use_lut=None):
+        """
+        Args:
+            image (numpy.ndarray): Image in BGR format (already cropped)
+            ranges (list): (low, high) HSV bound pairs, indexed by detect()
+            scale (int): Downscale factor for the coarse pass, one of PYRAMID_SCALES
+            use_lut (bool, optional): Build the masks from a colour LUT instead
+                of an HSV conversion. Defaults to color_lut_enabled()
+        """
+        if scale not in PYRAMID_SCALES:
+            raise ValueError(f"Unsupported detection scale: {scale}. Use one of {PYRAMID_SCALES}.")
+        self.full_image = image
+        self.scale = scale
+        if scale > 1:
+            # Area averaging keeps thin slot outlines visible as blended pixels.
+            # Repeated halving gives the same averages as one 1/4 resize, faster
+            with timed_stage('downscale'):
+                for _ in range(scale.bit_length() - 1):
+                    image = cv2.resize(image, (image.shape[1] // 2, image.shape[0] // 2),
+                                       interpolation=cv2.INTER_AREA)
+        self.image = image
+        self.ranges = list(ranges)
+
+        # Identical ranges share one mask and one contour search
+        self._keys = [_range_key(low, high) for low, high in self.ranges]
+        distinct = {}
+        for key, (low, high) in zip(self._keys, self.ranges):
+            distinct.setdefault(key, (low, high))
+
+        if use_lut is None:
+            use_lut = color_lut_enabled()
+        self.use_lut = use_lut and len(distinct) <= MAX_RANGES
+        if self.use_lut:
+            self.hsv = None
+            with timed_stage('mask'):
+                masks = lut_range_masks(image, list(distinct.values()))
+            self._masks = dict(zip(distinct.keys(), masks))
+        else:
+            with timed_stage('hsv'):
+                self.hsv = cv2.cvtColor(image, cv2.COLOR_BGR2HSV)
+            self._masks = {}
+        self._scored = {}
+
+    def mask(self, index):
+        """Raw colour mask of a range, built on first use."""
+        key = self._keys[index]
+        if key not in self._masks:
+            with timed_stage('mask'):
+                self._masks[key] = build_range_masks(self.hsv, [self.ranges[index]])[0]
+        return self._masks[key]
+
+    def blob_scores(self, index, prefix=""):
+        """
+        Blob scores of a range, computed on first use.
+
+        Args:
+            index (int): Range index
+            prefix (str): Prefix for debug image filenames
+
+        Returns:
+            BlobScores: Scores of every blob in the cleaned mask
+        """
+        key = self._keys[index]
+        if key not in self._scored:
+            mask = self.mask(index)
+            write_debug_image(mask, f"{prefix}mask.png", DEBUG_FULL)
+
+            with timed_stage('morphology'):
+                mask = enhance_mask(mask, remove_noise=self.scale == 1)
+            write_debug_image(mask, f"{prefix}enhanced_mask.png", DEBUG_FULL)
+
+            area_scale = self.scale * self.scale
+            self._scored[key] = BlobScores(mask, MIN_SLOT_AREA / area_scale, MAX_SLOT_AREA / area_scale)
+        return self._scored[key]
+
+    def detect(self, index, min_confidence=0.7, prefix=""):
+        """
+        Detect slot contours for a range at a confidence threshold.
+
+        Args:
+            index (int): Range index
+            min_confidence (float): Minimum confidence for square detection
+            prefix (str): Prefix for debug image filenames
+
+        Returns:
+            tuple: (filtered contours, their confidence scores)
+        """
+        inventory_contours, confidences = self.blob_scores(index, prefix).select(min_confidence)
+
+        if debug_enabled(DEBUG_FULL):
+            save_contour_overlays(self.image, inventory_contours, confidences, prefix)
+
+        logger.info(f"Found {len(inventory_contours)} possible inventory slots with {prefix}color range")
+
+        return inventory_contours, confidences
+
+    def centers(self, index, contours, min_confidence=0.7):
+        """
+        Full resolution centres of detected slot contours.
+
+        At full scale these are the contour centroids. In coarse-to-fine mode
+        the slots are detected again at full resolution, but only inside the
+        box around the candidate contours, with the same colour range and
+        threshold. Rows the coarse pass merged are separated again there.
+
+        Args:
+            index (int): Range the contours were detected with
+            contours: Contours returned by detect()
+            min_confidence (float): Threshold the contours were detected with
+
+        Returns:
+            numpy.ndarray: (k, 2) sub-pixel centres in cropped image coordinates
+        """
+        if self.scale == 1 or not len(contours):
+            return contour_centers(contours)
+
+        # The full resolution pass reports its time under the usual stages
+        x0, y0, w, h = cv2.boundingRect(np.concatenate(contours))
+        height, width = self.full_image.shape[:2]
+        left = max(0, x0 * self.scale - REFINE_MARGIN)
+        top = max(0, y0 * self.scale - REFINE_MARGIN)
+        right = min(width, (x0 + w) * self.scale + REFINE_MARGIN)
+        bottom = min(height, (y0 + h) * self.scale + REFINE_MARGIN)
+
+        window = DetectionContext(self.full_image[top:bottom, left:right], [self.ranges[index]],
+                                  use_lut=self.use_lut)
+        refined, _ = window.blob_scores(0, prefix="refine_").select(min_confidence)
+        return contour_centers(refined) + (left, top)
+
+def contour_centers(contours):
+    """
+    Sub-pixel centroids of contours.
+
+    Args:
+        contours: Contours to measure
+
+    Returns:
+        numpy.ndarray: (k, 2) centroids, contours with no area are dropped
+    """
+    centers = []
+    for contour in contours:
+        M = cv2.moments(contour)
+        if M["m00"] != 0:
+            centers.append((M["m10"] / M["m00"], M["m01"] / M["m00"]))
+    return np.array(centers, dtype=np.float64).reshape(-1, 2)
+
+def save_contour_overlays(image, contours, confidences, prefix=""):
+    """
+    Save contour debug images: contours on black, and on the original image.
+
+    Args:
+        image (numpy.ndarray): Image the contours were found in
+        contours: Detected contours
+        confidences: Confidence score of each contour
+        prefix (str): Prefix for debug image filenames
+    """
+    # Draw contours on a blank image for debugging
+    debug_image = np.zeros_like(image)
+    for i, contour in enumerate(contours):
+        # Color intensity based on confidence
+        color_intensity = int(255 * confidences[i]) if i < len(confidences) else 255
+        cv2.drawContours(debug_image, [contour], -1, (0, color_intensity, 0), 2)
+    write_debug_image(debug_image, f"{prefix}contours.png", DEBUG_FULL)
+
+    # Also draw contours on the original image for better visualization
+    original_with_contours = image.copy()
+    for i, contour in enumerate(contours):
+        # Color intensity based on confidence
+        color_intensity = int(255 * confidences[i]) if i < len(confidences) else 255
+        cv2.drawContours(original_with_contours, [contour], -1, (0, color_intensity, 0), 2)
+
+        # Add confidence text
+        if i < len(confidences):
+            M = cv2.moments(contour)
+            if M["m00"] != 0:
+                cx = int(M["m10"] / M["m00"])
+                cy = int(M["m01"] / M["m00"])
+                cv2.putText(original_with_contours, f"{confidences[i]:.2f}",
+                           (cx-20, cy), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 0, 255), 1)
+
+    write_debug_image(original_with_contours, f"{prefix}original_with_contours.png", DEBUG_FULL)
@@ -0,0 +1,274 @@
+"""
+Inventory Lattice Fitting
+
+This module fits a regular slot lattice to detected slot centres. The model is
+
+    centre(col, row) = base + col * u + row * v
+
+where base is the centre of the top-left slot and u, v are the column and row
+step vectors. Their lengths are the x and y spacings and the angle of u is the
+(normally zero) rotation of the grid.
+
+Key features:
+- RANSAC over (anchor, column step, row step) hypotheses rejects stray blobs
+- Least-squares refinement over all inliers keeps sub-pixel precision
+- Works when any slot is missing, including the top-left one, as long as
+  the remaining slots still span the full grid
+- Returns the RMS fit residual and the predicted centre of every slot
+
+Performance considerations:
+- All hypotheses are scored against all centres in a single NumPy broadcast,
+  so the cost grows with hypotheses x centres instead of nested Python loops
+- Inventory detections have a few dozen centres, so a full fit takes
+  around a millisecond regardless of which slots are missing
+"""
+
+import logging
+import numpy as np
+
+# Set up logging
+logging.basicConfig(level=logging.INFO,
+                    format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Inventory layout
+INVENTORY_COLUMNS = 4
+INVENTORY_ROWS = 7
+
+# Fitting settings
+SPACING_RANGE = (30, 100)  # Plausible slot spacing in pixels
+MAX_SKEW = 0.25            # Maximum off-axis component of a step, relative to its length
+INLIER_TOLERANCE = 6.0     # Maximum distance in pixels between a centre and its lattice point
+RANSAC_HYPOTHESES = 256    # Number of random hypotheses scored per fit
+
+def grid_indices(cols=INVENTORY_COLUMNS, rows=INVENTORY_ROWS):
+    """
+    Get the (col, row) index of every slot in slot order (left to right, top to bottom).
+
+    Args:
+        cols (int): Number of columns
+        rows (int): Number of rows
+
+    Returns:
+        numpy.ndarray: Array of shape (rows * cols, 2)
+    """
+    rows_idx, cols_idx = np.divmod(np.arange(rows * cols), cols)
+    return np.stack([cols_idx, rows_idx], axis=1)
+
+def predict_centers(base, u, v, indices):
+    """
+    Compute lattice points for a set of (col, row) indices.
+
+    Args:
+        base (array-like): (x, y) of the slot at index (0, 0)
+        u (array-like): Column step vector
+        v (array-like): Row step vector
+        indices (numpy.ndarray): (n, 2) array of (col, row) indices
+
+    Returns:
+        numpy.ndarray: (n, 2) array of predicted (x, y) centres
+    """
+    indices = np.asarray(indices, dtype=np.float64)
+    return (np.asarray(base, dtype=np.float64)
+            + indices[:, :1] * np.asarray(u, dtype=np.float64)
+            + indices[:, 1:] * np.asarray(v, dtype=np.float64))
+
+def _step_candidates(centers, axis, spacing_range):
+    """
+    Collect pairwise differences that look like a single step along one axis.
+
+    Args:
+        centers (numpy.ndarray): (n, 2) array of centres
+        axis (int): 0 for column steps (x), 1 for row steps (y)
+        spacing_range (tuple): (min, max) plausible spacing
+
+    Returns:
+        numpy.ndarray: (m, 2) array of step vectors
+    """
+    diffs = (centers[None, :, :] - centers[:, None, :]).reshape(-1, 2)
+    along = diffs[:, axis]
+    across = np.abs(diffs[:, 1 - axis])
+    keep = ((along >= spacing_range[0]) & (along <= spacing_range[1])
+            & (across <= MAX_SKEW * along))
+    return diffs[keep]
+
+def _assign(centers, base, u, v):
+    """
+    Assign each centre to its nearest lattice index.
+
+    Args:
+        centers (numpy.ndarray): (n, 2) array of centres
+        base, u, v (numpy.ndarray): Lattice parameters, each (..., 2)
+
+    Returns:
+        tuple: (indices, errors) with indices (..., n, 2) ints and errors (..., n) pixel distances
+    """
+    # Solve [u v] @ k = p - base with Cramer's rule for every hypothesis and centre at once
+    u = u[..., None, :]
+    v = v[..., None, :]
+    offsets = centers - base[..., None, :]                 # (..., n, 2)
+    det = u[..., 0] * v[..., 1] - u[..., 1] * v[..., 0]
+    col = np.rint((offsets[..., 0] * v[..., 1] - offsets[..., 1] * v[..., 0]) / det)
+    row = np.rint((u[..., 0] * offsets[..., 1] - u[..., 1] * offsets[..., 0]) / det)
+    dx = offsets[..., 0] - col * u[..., 0] - row * v[..., 0]
+    dy = offsets[..., 1] - col * u[..., 1] - row * v[..., 1]
+    errors = np.hypot(dx, dy)
+    indices = np.stack([col, row], axis=-1)
+    return indices.astype(np.int64), errors
+
+def _least_squares(centers, indices):
+    """
+    Fit base, u and v to centres with known lattice indices.
+
+    Args:
+        centers (numpy.ndarray): (n, 2) array of centres
+        indices (numpy.ndarray): (n, 2) array of (col, row) indices
+
+    Returns:
+        tuple: (base, u, v) as float arrays of shape (2,), or None if degenerate
+    """
+    design = np.column_stack([np.ones(len(centers)), indices.astype(np.float64)])
+    if np.linalg.matrix_rank(design) < 3:
+        return None
+    solution = np.linalg.lstsq(design, centers, rcond=None)[0]
+    return solution[0], solution[1], solution[2]
+
+def _best_window(indices, errors, inliers, cols, rows):
+    """
+    Find the cols x rows window of lattice indices that holds the most inliers.
+
+    A stray blob that lines up with the lattice outside the real grid widens
+    the span of the assigned indices, so the window cannot simply start at the
+    smallest index. Every window start within the span is scored instead, ties
+    broken by the smaller total error.
+
+    Returns:
+        numpy.ndarray: (col, row) index of the window's top-left slot
+    """
+    low = indices[inliers].min(axis=0)
+    high = np.maximum(low, indices[inliers].max(axis=0) - (cols - 1, rows - 1))
+    starts = np.stack(np.meshgrid(np.arange(low[0], high[0] + 1),
+                                  np.arange(low[1], high[1] + 1)), axis=-1).reshape(-1, 2)
+    inside = (inliers
+              & (indices[None, :, 0] >= starts[:, None, 0])
+              & (indices[None, :, 0] < starts[:, None, 0] + cols)
+              & (indices[None, :, 1] >= starts[:, None, 1])
+              & (indices[None, :, 1] < starts[:, None, 1] + rows))
+    counts = inside.sum(axis=1)
+    total_error = np.where(inside, errors, 0).sum(axis=1)
+    return starts[np.lexsort((total_error, -counts))[0]]
+
+def _refine(centers, params, cols, rows, tolerance):
+    """
+    Assign centres to a lattice and solve it again by least squares over the inliers.
+
+    Indices are shifted so the cols x rows window holding the most inliers
+    starts at column and row 0, and centres outside that window are dropped.
+
+    Returns:
+        tuple: ((base, u, v), indices, inliers), or None if the inliers are degenerate
+    """
+    indices, errors = _assign(centers, *params)
+    inliers = errors <= tolerance
+    if inliers.sum() < 3:
+        return None
+    indices = indices - _best_window(indices, errors, inliers, cols, rows)
+    inliers &= ((indices >= 0) & (indices < (cols, rows))).all(axis=1)
+    if inliers.sum() < 3:
+        return None
+    params = _least_squares(centers[inliers], indices[inliers])
+    if params is None:
+        return None
+    return params, indices, inliers
+
+def fit_lattice(centers, cols=INVENTORY_COLUMNS, rows=INVENTORY_ROWS,
+                spacing_range=SPACING_RANGE, tolerance=INLIER_TOLERANCE,
+                hypotheses=RANSAC_HYPOTHESES, seed=None):
+    """
+    Fit a cols x rows slot lattice to detected centres.
+
+    Hypotheses are built from a random anchor centre plus a random column step
+    and row step taken from the pairwise differences between centres. The
+    hypothesis with the most inliers (ties broken by total error) gives the
+    lattice index of each inlier, and base, u and v are then solved by least
+    squares over all inliers. Assignment and refinement are repeated once so
+    centres that only line up with the refined lattice are included.
+
+    Args:
+        centers (array-like): (n, 2) detected (x, y) centres, floats allowed
+        cols (int): Number of grid columns
+        rows (int): Number of grid rows
+        spacing_range (tuple): (min, max) plausible spacing in pixels
+        tolerance (float): Inlier distance in pixels
+        hypotheses (int): Number of RANSAC hypotheses
+        seed (int, optional): Random seed for repeatable fits
+
+    Returns:
+        dict: Fit with keys 'base_x', 'base_y', 'x_spacing', 'y_spacing',
+              'rotation' (degrees), 'residual' (RMS pixels over inliers),
+              'num_inliers', 'inliers' (bool mask over centres),
+              'indices' ((n, 2) col/row of each centre, -1 for outliers)
+              and 'slot_centers' ((rows * cols, 2) predicted centres),
+              or None if no lattice could be fitted
+    """
+    centers = np.asarray(centers, dtype=np.float64).reshape(-1, 2)
+    if len(centers) < 3:
+        logger.warning(f"Need at least 3 centres to fit a lattice, got {len(centers)}")
+        return None
+
+    col_steps = _step_candidates(centers, 0, spacing_range)
+    row_steps = _step_candidates(centers, 1, spacing_range)
+    if len(col_steps) == 0 or len(row_steps) == 0:
+        logger.warning("No plausible column or row spacing between detected centres")
+        return None
+
+    # Score every hypothesis against every centre at once
+    rng = np.random.default_rng(seed)
+    base = centers[rng.integers(len(centers), size=hypotheses)]
+    u = col_steps[rng.integers(len(col_steps), size=hypotheses)]
+    v = row_steps[rng.integers(len(row_steps), size=hypotheses)]
+    _, errors = _assign(centers, base, u, v)
+    inlier_mask = errors <= tolerance
+    counts = inlier_mask.sum(axis=1)
+    total_error = np.where(inlier_mask, errors, 0).sum(axis=1)
+    order = np.lexsort((total_error, -counts))
+    best = order[0]
+    params = base[best], u[best], v[best]
+
+    # Assign indices with the current parameters and refit over the inliers;
+    # the second pass picks up centres that only line up with the refined lattice
+    for _ in range(2):
+        refined = _refine(centers, params, cols, rows, tolerance)
+        if refined is None:
+            logger.warning("Lattice inliers do not span both grid directions")
+            return None
+        params, indices, inliers = refined
+
+    base, u, v = params
+    residuals = np.linalg.norm(centers[inliers] - predict_centers(base, u, v, indices[inliers]), axis=1)
+    indices[~inliers] = -1
+
+    return {
+        'base_x': float(base[0]),
+        'base_y': float(base[1]),
+        'x_spacing': float(np.hypot(*u)),
+        'y_spacing': float(np.hypot(*v)),
+        'rotation': float(np.degrees(np.arctan2(u[1], u[0]))),
+        'residual': float(np.sqrt(np.mean(residuals ** 2))),
+        'num_inliers': int(inliers.sum()),
+        'inliers': inliers,
+        'indices': indices,
+        'slot_centers': predict_centers(base, u, v, grid_indices(cols, rows)),
+    }
+
+# For testing
+if __name__ == "__main__":
+    print("Inventory Lattice Fitting")
+    print("-------------------------")
+    truth = predict_centers((1625.4, 638.2), (61.3, 0.0), (0.0, 51.1), grid_indices())
+    noisy = truth[1:] + np.random.default_rng(0).normal(0, 0.5, (len(truth) - 1, 2))
+    noisy = np.vstack([noisy, [[1500, 700], [1800, 600]]])  # Stray blobs
+    fit = fit_lattice(noisy, seed=0)
+    print(f"Base: ({fit['base_x']:.2f}, {fit['base_y']:.2f})  (top-left slot missing)")
+    print(f"Spacing: {fit['x_spacing']:.2f} x {fit['y_spacing']:.2f}  rotation {fit['rotation']:.3f} deg")
+    print(f"Residual: {fit['residual']:.3f}px  inliers {fit['num_inliers']}/{len(noisy)}")
@@ -5,25 +5,40 @@ This module provides functions to calibrate inventory slots based on screenshots
 of the game client with highlighted inventory slot boundaries.
 
 Key features:
-- Screenshot capture with pyautogui
+- Region-of-interest screenshot capture (mss with pyautogui fallback)
 - Detection of yellow square inventory slots in the bottom right quadrant
 - Square detection with confidence scoring
-- Automatic calculation of inventory grid parameters
+- Robust least-squares fit of the inventory grid (see lattice)
+- detect_grid(): the same detection for any slot grid (bank, equipment,
+  spellbook), saved by name with calibrate_grid():
+    python -m utils.calibration.vision.screenshot bank --roi 480 120 600 480 --rows 8 --cols 8
 - Storage of calibration data
+- Level-gated debug images written from a background thread (see debug_writer)
 """
 
 import os
-import json
 import numpy as np
 import cv2
-from PIL import Image, ImageGrab
-import pyautogui
 import time
 import sys
 import logging
-import glob
 from pathlib import Path
 
+from ...vision.capture import grab_region, bgr_view
+from ...vision.window import client_quadrant
+from ...vision.drift import save_drift_reference
+from ..config import DEFAULT_INVENTORY_CONFIG, save_inventory_config, save_grid_config
+from .debug_writer import (
+    DEBUG_DIR, DEBUG_SUMMARY, DEBUG_FULL,
+    debug_enabled, write_debug_image, get_debug_writer
+)
+from .lattice import fit_lattice
+from .stage_timer import timed_stage
+from .detection import (
+    DetectionContext, calculate_square_confidence, filter_contours_by_confidence
+)
+from .color_tuner import RANGES_FILE, tuned_ranges
+
 # Set up logging
 logging.basicConfig(level=logging.INFO, 
                     format='%(asctime)s - %(levelname)s - %(message)s')
@@ -32,8 +47,6 @@ logger = logging.getLogger(__name__)
 # Get the project root directory
 project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '../../..'))
 CONFIG_DIR = os.path.join(project_root, 'config')
-CONFIG_FILE = os.path.join(CONFIG_DIR, 'inventory_config.json')
-DEBUG_DIR = os.path.join(project_root, 'debug')
 
 # Yellow color constants - specifically targeting bright yellow
 # Using HSV color space which is better for color detection
@@ -53,68 +66,87 @@ ALT_YELLOW_RANGES = [
     (np.array([10, 50, 150], dtype=np.uint8), np.array([50, 255, 255], dtype=np.uint8))
 ]
 
-# Default inventory configuration - used as fallback
-DEFAULT_CONFIG = {
-    'base_x': 1625,
-    'base_y': 638,
-    'x_spacing': 61,
-    'y_spacing': 51
-}
+# Inventory layout and the fewest slots a grid detection accepts
+INVENTORY_COLUMNS = 4
+INVENTORY_ROWS = 7
+MIN_GRID_SLOTS = 8
+
+# Confidence thresholds of the last fallback step, on the primary range
+LOW_CONFIDENCE_STEPS = (0.6, 0.5, 0.4)
+
+# Ranges per profile name (None for the current display) and the tuned ranges
+# file's modification time they were built from
+_ranges_cache = {}
+
+def _ranges_mtime():
+    """Modification time of the tuned ranges file, None if there is none."""
+    try:
+        return os.path.getmtime(RANGES_FILE)
+    except OSError:
+        return None
+
+def detection_ranges(profile=None):
+    """
+    Get the colour ranges detection tries, in order.
+    
+    Ranges tuned for the display profile (see color_tuner) come first,
+    followed by the hand-picked yellow ranges. The result is cached until the
+    tuned ranges file changes, so a detection does not read it or look up
+    the display profile again.
+    
+    Args:
+        profile (str, optional): Profile name (see profiles.key_to_string),
+            defaults to the current display profile
+    
+    Returns:
+        list: (low, high) HSV bound pairs
+    """
+    mtime = _ranges_mtime()
+    cached = _ranges_cache.get(profile)
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+    try:
+        tuned = tuned_ranges(profile)
+    except Exception as e:
+        logger.warning(f"Tuned colour ranges unavailable: {e}")
+        tuned = []
+    ranges = tuned + [(YELLOW_HSV_LOW, YELLOW_HSV_HIGH)] + ALT_YELLOW_RANGES
+    _ranges_cache[profile] = (mtime, ranges)
+    return ranges
 
 def clean_debug_directory():
     """
     Clean up old debug images to prevent accumulation.
-    Keeps the most recent debug session (up to 20 images).
+    
+    Retention normally runs incrementally in the debug writer thread, one file
+    per write. This forces a full pass over the debug directory.
     """
     try:
-        if not os.path.exists(DEBUG_DIR):
-            os.makedirs(DEBUG_DIR, exist_ok=True)
-            return
-            
-        # Get all PNG files in debug directory
-        debug_files = glob.glob(os.path.join(DEBUG_DIR, "*.png"))
-        
-        # If fewer than 20 files, don't clean up yet
-        if len(debug_files) < 20:
-            return
-            
-        # Sort by modification time (newest first)
-        debug_files.sort(key=os.path.getmtime, reverse=True)
-        
-        # Keep the 10 most recent files, delete the rest
-        files_to_delete = debug_files[10:]
-        
-        for file_path in files_to_delete:
-            try:
-                os.remove(file_path)
-                logger.debug(f"Deleted old debug file: {file_path}")
-            except Exception as e:
-                logger.warning(f"Failed to delete {file_path}: {e}")
-                
-        logger.info(f"Cleaned up {len(files_to_delete)} old debug images")
-    
+        get_debug_writer().trim()
     except Exception as e:
         logger.warning(f"Error cleaning debug directory: {e}")
 
-def take_screenshot():
+def take_screenshot(region=None, session=None):
     """
-    Take a screenshot of the entire screen.
+    Take a screenshot of the entire screen or of a region of it.
+    
+    Args:
+        region (tuple, optional): (left, top, width, height) to capture.
+            Captures the entire screen when omitted.
+        session (CaptureSession, optional): Session whose preallocated buffer is
+            filled in place. The result is then a non-contiguous BGR view of
+            that buffer, which the next grab of the same region overwrites;
+            copy it with np.ascontiguousarray() before drawing on it.
     
     Returns:
         numpy.ndarray: Screenshot as a NumPy array in BGR format
     """
     try:
-        # Clean up old debug images first
-        clean_debug_directory()
-        
-        # Take screenshot using pyautogui
-        screenshot = pyautogui.screenshot()
-        
-        # Convert to numpy array for OpenCV
-        screenshot_np = np.array(screenshot)
-        
-        # Convert RGB to BGR (OpenCV format)
-        screenshot_bgr = cv2.cvtColor(screenshot_np, cv2.COLOR_RGB2BGR)
+        # Only the requested region is read from the display
+        if session is not None:
+            screenshot_bgr = session.grab_bgr(region)
+        else:
+            screenshot_bgr = grab_region(region)
         
         logger.info(f"Screenshot captured. Shape: {screenshot_bgr.shape}")
         return screenshot_bgr
@@ -123,13 +155,20 @@ def take_screenshot():
         logger.error(f"Error taking screenshot: {e}")
         return None
 
-def save_debug_image(image, filename):
-    """Save an image for debugging purposes."""
+def save_debug_image(image, filename, level=DEBUG_SUMMARY):
+    """
+    Save an image for debugging purposes.
+    
+    The image is copied and written by a background thread. Nothing is done
+    when the debug level (see debug_writer.set_debug_level) is below level.
+    
+    Args:
+        image (numpy.ndarray): Image to save
+        filename (str): File name inside the debug directory
+        level (int): DEBUG_SUMMARY for results, DEBUG_FULL for intermediate stages
+    """
     try:
-        os.makedirs(DEBUG_DIR, exist_ok=True)
-        path = os.path.join(DEBUG_DIR, filename)
-        cv2.imwrite(path, image)
-        logger.info(f"Saved debug image to {path}")
+        write_debug_image(image, filename, level)
     except Exception as e:
         logger.error(f"Error saving debug image: {e}")
 
@@ -148,72 +187,6 @@ def crop_bottom_right_quadrant(image):
     cropped = image[height//2:, width//2:]
     return cropped
 
-def calculate_square_confidence(contour):
-    """
-    Calculate how "square-like" a contour is, returning a confidence score.
-    
-    Args:
-        contour: The contour to evaluate
-        
-    Returns:
-        float: Confidence score from 0.0 to 1.0 (1.0 = perfect square)
-    """
-    # Get the bounding rectangle
-    x, y, w, h = cv2.boundingRect(contour)
-    rect_area = w * h
-    
-    # Get contour area
-    contour_area = cv2.contourArea(contour)
-    
-    # Perfect square would have contour area close to rectangle area
-    area_ratio = contour_area / rect_area if rect_area > 0 else 0
-    
-    # A perfect square would have width = height
-    aspect_ratio = min(w, h) / max(w, h) if max(w, h) > 0 else 0
-    
-    # Calculate approximation error for shape
-    epsilon = 0.02 * cv2.arcLength(contour, True)
-    approx = cv2.approxPolyDP(contour, epsilon, True)
-    
-    # A square should have 4 corners
-    corners_score = 0
-    if len(approx) == 4:
-        corners_score = 1.0
-    else:
-        corners_score = 4.0 / (abs(len(approx) - 4) + 4)
-    
-    # Combine scores, with more weight on having 4 corners and good aspect ratio
-    confidence = (0.4 * corners_score) + (0.4 * aspect_ratio) + (0.2 * area_ratio)
-    
-    return min(confidence, 1.0)  # Cap at 1.0
-
-def filter_contours_by_confidence(contours, min_confidence=0.7):
-    """
-    Filter contours by their square confidence score.
-    
-    Args:
-        contours: List of contours to filter
-        min_confidence: Minimum confidence score threshold
-        
-    Returns:
-        list: Filtered contours that exceed confidence threshold
-    """
-    result = []
-    confidences = []
-    
-    for contour in contours:
-        area = cv2.contourArea(contour)
-        # Basic size filter first
-        if area < 100 or area > 5000:
-            continue
-            
-        confidence = calculate_square_confidence(contour)
-        if confidence >= min_confidence:
-            result.append(contour)
-            confidences.append(confidence)
-    
-    return result, confidences
-
 def try_detect_with_color_range(image, low, high, prefix="", min_confidence=0.7):
     """
     Try to detect inventory slots with a specific color range.
@@ -228,286 +201,186 @@ def try_detect_with_color_range(image, low, high, prefix="", min_confidence=0.7)
     Returns:
         list: Filtered contours
     """
-    # Convert image to HSV for better color detection
-    hsv_image = cv2.cvtColor(image, cv2.COLOR_BGR2HSV)
-    
-    # Create a mask for yellow color
-    mask = cv2.inRange(hsv_image, low, high)
-    
-    # Save mask for debugging
-    save_debug_image(mask, f"{prefix}mask.png")
-    
-    # Try to enhance the mask with morphological operations
-    kernel = np.ones((3,3), np.uint8)
-    mask = cv2.morphologyEx(mask, cv2.MORPH_CLOSE, kernel)  # Close small holes
-    mask = cv2.morphologyEx(mask, cv2.MORPH_OPEN, kernel)   # Remove small noise
-    
-    # Additional dilation to connect nearby pixels
-    mask = cv2.dilate(mask, kernel, iterations=1)
-    
-    # Save enhanced mask
-    save_debug_image(mask, f"{prefix}enhanced_mask.png")
-    
-    # Find contours in the mask
-    contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-    
-    # Filter contours by confidence
-    inventory_contours, confidences = filter_contours_by_confidence(contours, min_confidence)
-    
-    # Draw contours on a blank image for debugging
-    debug_image = np.zeros_like(image)
-    for i, contour in enumerate(inventory_contours):
-        # Color intensity based on confidence
-        color_intensity = int(255 * confidences[i]) if i < len(confidences) else 255
-        cv2.drawContours(debug_image, [contour], -1, (0, color_intensity, 0), 2)
-    save_debug_image(debug_image, f"{prefix}contours.png")
-    
-    # Also draw contours on the original image for better visualization
-    original_with_contours = image.copy()
-    for i, contour in enumerate(inventory_contours):
-        # Color intensity based on confidence
-        color_intensity = int(255 * confidences[i]) if i < len(confidences) else 255
-        cv2.drawContours(original_with_contours, [contour], -1, (0, color_intensity, 0), 2)
-        
-        # Add confidence text
-        if i < len(confidences):
-            M = cv2.moments(contour)
-            if M["m00"] != 0:
-                cx = int(M["m10"] / M["m00"])
-                cy = int(M["m01"] / M["m00"])
-                cv2.putText(original_with_contours, f"{confidences[i]:.2f}", 
-                           (cx-20, cy), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 0, 255), 1)
-    
-    save_debug_image(original_with_contours, f"{prefix}original_with_contours.png")
-    
-    logger.info(f"Found {len(inventory_contours)} possible inventory slots with {prefix}color range")
-    
-    return inventory_contours, confidences
+    # A single-range context runs the same stages as the full pipeline
+    context = DetectionContext(image, [(low, high)])
+    return context.detect(0, min_confidence, prefix)
 
-def detect_inventory_slots(image):
+def detect_grid(image, rows, cols, highlight=None, offset=(0, 0), scale=1, default=None,
+                progress=None):
     """
-    Detect inventory slots in a screenshot.
+    Detect a slot grid (inventory, bank, equipment, spellbook) in one capture.
+    
+    The highlighted slots are found with the first colour range that finds
+    enough of them, then a cols x rows lattice is fitted to their centres.
     
     Args:
-        image (numpy.ndarray): Screenshot as a NumPy array in BGR format
+        image (numpy.ndarray): BGR (or BGRA) capture of the region holding the grid
+        rows (int): Grid rows
+        cols (int): Grid columns
+        highlight (list, optional): (low, high) HSV ranges of the slot highlight,
+            tried in order. Defaults to detection_ranges()
+        offset (tuple): (left, top) screen position of the capture
+        scale (int): Detection scale, see detect_inventory_slots()
+        default (dict, optional): Grid returned (with 'using_defaults') when
+            detection fails
+        progress (callable, optional): Called as progress(stage, fraction, found)
+            after each step of the cascade, from the detecting thread, so a GUI
+            can follow a long fallback cascade
         
     Returns:
-        dict: Inventory slot information if successful, None otherwise
+        dict: Grid with base_x, base_y, x_spacing, y_spacing, columns, rows,
+            slot_centers and fit statistics in screen coordinates
     """
+    fallback = {**(default or {}), 'num_detected_slots': 0, 'using_defaults': True}
+    min_slots = min(MIN_GRID_SLOTS, max(3, rows * cols // 2))
     try:
-        # Save a copy of the original full image for comparison
-        save_debug_image(image, "original_full.png")
+        image = bgr_view(image)
         
-        # Crop to bottom right quadrant where inventory is located
-        cropped_image = crop_bottom_right_quadrant(image)
-        save_debug_image(cropped_image, "original_cropped.png")
+        # Convert to HSV and build every range mask once for the whole cascade
+        ranges = highlight if highlight is not None else detection_ranges()
+        context = DetectionContext(image, ranges, scale)
+        steps = len(ranges) + len(LOW_CONFIDENCE_STEPS) + 1
+        report = progress or (lambda stage, fraction, found: None)
         
-        # Try main yellow color range first
-        inventory_contours, confidences = try_detect_with_color_range(
-            cropped_image, YELLOW_HSV_LOW, YELLOW_HSV_HIGH
-        )
+        # Try the primary range first (the tuned one when available)
+        inventory_contours, confidences = context.detect(0)
+        range_index, min_confidence = 0, 0.7
+        report(f"colour range 1/{len(ranges)}", 1 / steps, len(inventory_contours))
         
         # If not enough contours found, try alternative color ranges
-        if len(inventory_contours) < 8:  # We expect to find at least 8 slots
-            logger.warning(f"Found only {len(inventory_contours)} possible inventory slots. "
-                           f"Expected at least 8. Trying alternative color ranges...")
+        if len(inventory_contours) < min_slots:
+            logger.warning(f"Found only {len(inventory_contours)} possible slots. "
+                           f"Expected at least {min_slots}. Trying alternative color ranges...")
             
-            for i, (low, high) in enumerate(ALT_YELLOW_RANGES):
-                alt_contours, alt_conf = try_detect_with_color_range(
-                    cropped_image, low, high, f"alt{i+1}_"
-                )
+            for i in range(1, len(ranges)):
+                alt_contours, alt_conf = context.detect(i, prefix=f"alt{i}_")
+                report(f"colour range {i + 1}/{len(ranges)}", (i + 1) / steps, len(alt_contours))
                 
                 # If this range found more contours, use it instead
                 if len(alt_contours) > len(inventory_contours):
                     inventory_contours = alt_contours
                     confidences = alt_conf
+                    range_index = i
                 
                 # If we found enough contours, stop trying
-                if len(inventory_contours) >= 8:
+                if len(inventory_contours) >= min_slots:
                     break
         
-        # If still not enough contours, we'll try with decreasing confidence threshold
-        if len(inventory_contours) < 8:
+        # If still not enough contours, retry every range with decreasing confidence
+        # threshold, so both the tuned ranges and the hand-picked yellow primary get
+        # their retries (scores are cached per range, so this only re-filters them)
+        if len(inventory_contours) < min_slots:
             logger.warning("Trying with lower confidence threshold...")
-            for confidence_threshold in [0.6, 0.5, 0.4]:
-                inventory_contours, confidences = try_detect_with_color_range(
-                    cropped_image, YELLOW_HSV_LOW, YELLOW_HSV_HIGH, 
-                    f"low_conf{confidence_threshold}_", min_confidence=confidence_threshold
-                )
-                if len(inventory_contours) >= 8:
+            for i, confidence_threshold in enumerate(LOW_CONFIDENCE_STEPS):
+                for j in range(len(ranges)):
+                    low_contours, low_conf = context.detect(
+                        j, min_confidence=confidence_threshold,
+                        prefix=f"low_conf{confidence_threshold}_" + (f"alt{j}_" if j else "")
+                    )
+                    # Keep the range and threshold that found the most slots
+                    if len(low_contours) > len(inventory_contours):
+                        inventory_contours = low_contours
+                        confidences = low_conf
+                        range_index, min_confidence = j, confidence_threshold
+                    if len(inventory_contours) >= min_slots:
+                        break
+                report(f"confidence {confidence_threshold}", (len(ranges) + i + 1) / steps,
+                       len(inventory_contours))
+                if len(inventory_contours) >= min_slots:
                     break
         
         # If still not enough contours, use default values
-        if len(inventory_contours) < 8:
-            logger.warning("Unable to detect sufficient inventory slots. Using default values.")
-            
-            # Return default values
-            return {
-                'base_x': DEFAULT_CONFIG['base_x'],
-                'base_y': DEFAULT_CONFIG['base_y'],
-                'x_spacing': DEFAULT_CONFIG['x_spacing'],
-                'y_spacing': DEFAULT_CONFIG['y_spacing'],
-                'num_detected_slots': 0,
-                'using_defaults': True
-            }
+        if len(inventory_contours) < min_slots:
+            logger.warning("Unable to detect sufficient slots. Using default values.")
+            return fallback
             
-        # Calculate center points of each contour
-        centers = []
-        for contour in inventory_contours:
-            M = cv2.moments(contour)
-            if M["m00"] != 0:
-                cx = int(M["m10"] / M["m00"])
-                cy = int(M["m01"] / M["m00"])
-                # Adjust coordinates relative to full image
-                centers.append((cx + image.shape[1]//2, cy + image.shape[0]//2))
-        
-        # We need to sort the centers to organize them into a grid
-        # First, sort roughly by y-coordinate (with some tolerance for slight misalignments)
-        y_tolerance = 25  # Pixels - Points within this distance are considered same row
-        
-        # Group points by rows
-        rows = []
-        centers_copy = centers.copy()
-        
-        while centers_copy:
-            # Take the first point as reference
-            ref_point = centers_copy[0]
-            row_points = [ref_point]
-            centers_copy.remove(ref_point)
-            
-            # Find all points in the same row
-            i = 0
-            while i < len(centers_copy):
-                if abs(centers_copy[i][1] - ref_point[1]) < y_tolerance:
-                    row_points.append(centers_copy[i])
-                    centers_copy.pop(i)
-                else:
-                    i += 1
-            
-            # Sort the row points by x-coordinate
-            row_points.sort(key=lambda p: p[0])
-            rows.append(row_points)
-        
-        # Sort rows by average y-coordinate
-        rows.sort(key=lambda row: sum(p[1] for p in row) / len(row))
-        
-        # Calculate spacings
-        x_spacings = []
-        y_spacings = []
-        
-        # Horizontal spacing within rows
-        for row in rows:
-            if len(row) >= 2:
-                for i in range(1, len(row)):
-                    x_spacings.append(row[i][0] - row[i-1][0])
-        
-        # Vertical spacing between rows
-        if len(rows) >= 2:
-            for i in range(1, len(rows)):
-                if len(rows[i]) > 0 and len(rows[i-1]) > 0:
-                    # Calculate based on leftmost point in each row
-                    leftmost_curr = min(rows[i], key=lambda p: p[0])
-                    leftmost_prev = min(rows[i-1], key=lambda p: p[0])
-                    y_spacings.append(leftmost_curr[1] - leftmost_prev[1])
-        
-        # Ensure we have valid spacings
-        if not x_spacings or not y_spacings:
-            logger.warning("Could not calculate valid spacings between inventory slots. Using defaults.")
-            return {
-                'base_x': DEFAULT_CONFIG['base_x'],
-                'base_y': DEFAULT_CONFIG['base_y'],
-                'x_spacing': DEFAULT_CONFIG['x_spacing'],
-                'y_spacing': DEFAULT_CONFIG['y_spacing'],
-                'num_detected_slots': len(inventory_contours),
-                'using_defaults': True
-            }
-        
-        # Filter out extreme outliers in spacings (values more than 2x the median)
-        x_spacings.sort()
-        y_spacings.sort()
-        
-        # Get median values for x and y spacings
-        median_x = x_spacings[len(x_spacings) // 2]
-        median_y = y_spacings[len(y_spacings) // 2]
-        
-        # Filter spacings that are reasonably close to the median
-        filtered_x_spacings = [x for x in x_spacings if 0.5 * median_x <= x <= 2.0 * median_x]
-        filtered_y_spacings = [y for y in y_spacings if 0.5 * median_y <= y <= 2.0 * median_y]
-        
-        # Calculate average spacings from filtered values
-        if filtered_x_spacings and filtered_y_spacings:
-            avg_x_spacing = sum(filtered_x_spacings) // len(filtered_x_spacings)
-            avg_y_spacing = sum(filtered_y_spacings) // len(filtered_y_spacings)
-        else:
-            # Use unfiltered if filtering removed all values
-            avg_x_spacing = sum(x_spacings) // len(x_spacings)
-            avg_y_spacing = sum(y_spacings) // len(y_spacings)
-        
-        # Validate spacings with typical ranges for inventory slots
-        if avg_x_spacing < 30 or avg_x_spacing > 100 or avg_y_spacing < 30 or avg_y_spacing > 100:
-            logger.warning(f"Calculated spacings are suspicious: x={avg_x_spacing}, y={avg_y_spacing}. Using defaults.")
-            return {
-                'base_x': DEFAULT_CONFIG['base_x'],
-                'base_y': DEFAULT_CONFIG['base_y'],
-                'x_spacing': DEFAULT_CONFIG['x_spacing'],
-                'y_spacing': DEFAULT_CONFIG['y_spacing'],
-                'num_detected_slots': len(inventory_contours),
-                'using_defaults': True
-            }
-        
-        # Find the top-left slot as base point (should be the first element of the first row)
-        if rows and rows[0]:
-            base_x, base_y = rows[0][0]
-            
-            # Visualize results
+        # Center point of each contour (sub-pixel, refined at full resolution when downscaled)
+        centers = context.centers(range_index, inventory_contours, min_confidence) + offset
+        
+        with timed_stage('grid_fit'):
+            # Fit the slot lattice to all centres at once, rejecting stray blobs
+            fit = fit_lattice(centers, cols=cols, rows=rows)
+        report("grid fit", 1.0, 0 if fit is None else fit['num_inliers'])
+        if fit is None or fit['num_inliers'] < min_slots:
+            logger.warning("Could not fit the grid to the detected slots. Using defaults.")
+            return {**fallback, 'num_detected_slots': len(centers)}
+        
+        logger.info(f"Grid fit: {fit['num_inliers']}/{len(centers)} slots, "
+                    f"residual {fit['residual']:.2f}px, rotation {fit['rotation']:.2f} deg")
+        
+        if debug_enabled(DEBUG_SUMMARY):
+            # Visualize results (grid drawn in capture coordinates)
             result_image = image.copy()
-            # Draw grid lines for the inventory
-            for i in range(7):  # 7 rows
-                for j in range(4):  # 4 columns
-                    x = base_x + j * avg_x_spacing
-                    y = base_y + i * avg_y_spacing
-                    cv2.circle(result_image, (x, y), 5, (0, 255, 0), -1)  # Green dot at slot center
-                    # Draw rectangle around slot
-                    rect_x = x - avg_x_spacing // 2
-                    rect_y = y - avg_y_spacing // 2
-                    cv2.rectangle(result_image, (rect_x, rect_y), 
-                                  (rect_x + avg_x_spacing, rect_y + avg_y_spacing), 
-                                  (0, 0, 255), 2)
+            half_w = int(round(fit['x_spacing'] / 2))
+            half_h = int(round(fit['y_spacing'] / 2))
+            for x, y in np.rint(fit['slot_centers'] - offset).astype(int):
+                cv2.circle(result_image, (x, y), 5, (0, 255, 0), -1)  # Green dot at slot center
+                # Draw rectangle around slot
+                cv2.rectangle(result_image, (x - half_w, y - half_h),
+                              (x + half_w, y + half_h), (0, 0, 255), 2)
             
             save_debug_image(result_image, "detected_grid.png")
-            
-            # Return the calculated calibration data
-            return {
-                'base_x': base_x,
-                'base_y': base_y,
-                'x_spacing': avg_x_spacing,
-                'y_spacing': avg_y_spacing,
-                'num_detected_slots': len(inventory_contours)
-            }
-        else:
-            logger.warning("Could not identify a valid top-left inventory slot. Using defaults.")
-            return {
-                'base_x': DEFAULT_CONFIG['base_x'],
-                'base_y': DEFAULT_CONFIG['base_y'],
-                'x_spacing': DEFAULT_CONFIG['x_spacing'],
-                'y_spacing': DEFAULT_CONFIG['y_spacing'],
-                'num_detected_slots': len(inventory_contours),
-                'using_defaults': True
-            }
+        
+        # Return the calculated calibration data (sub-pixel, rounded at click time)
+        return {
+            'base_x': round(fit['base_x'], 2),
+            'base_y': round(fit['base_y'], 2),
+            'x_spacing': round(fit['x_spacing'], 2),
+            'y_spacing': round(fit['y_spacing'], 2),
+            'columns': cols,
+            'rows': rows,
+            'num_detected_slots': len(centers),
+            'num_fitted_slots': fit['num_inliers'],
+            'fit_residual': round(fit['residual'], 3),
+            'rotation': round(fit['rotation'], 3) + 0.0,  # Avoid -0.0
+            'slot_centers': np.round(fit['slot_centers'], 2).tolist()
+        }
             
     except Exception as e:
-        logger.error(f"Error detecting inventory slots: {e}")
+        logger.error(f"Error detecting slot grid: {e}")
         import traceback
         traceback.print_exc()
-        return {
-            'base_x': DEFAULT_CONFIG['base_x'],
-            'base_y': DEFAULT_CONFIG['base_y'],
-            'x_spacing': DEFAULT_CONFIG['x_spacing'],
-            'y_spacing': DEFAULT_CONFIG['y_spacing'],
-            'num_detected_slots': 0,
-            'using_defaults': True,
-            'error': str(e)
-        }
+        return {**fallback, 'error': str(e)}
+
+def detect_inventory_slots(image, offset=None, scale=1, highlight=None, progress=None):
+    """
+    Detect inventory slots in a screenshot.
+    
+    Args:
+        image (numpy.ndarray): Screenshot as a NumPy array in BGR format. BGRA
+            frames from a CaptureSession are read through a BGR view, uncopied.
+        offset (tuple, optional): (left, top) screen position of the image when it
+            is already a region capture. When omitted the image is treated as a full
+            screenshot and cropped to its bottom right quadrant.
+        scale (int): 1 for full resolution detection. 2 or 4 finds the slots on a
+            downscaled image and refines each centre at full resolution, which is
+            faster on large screens (see detection.DetectionContext).
+        highlight (list, optional): (low, high) HSV ranges of the slot highlight,
+            tried in order. Defaults to detection_ranges() of the current display
+        progress (callable, optional): Cascade progress callback, see detect_grid()
+        
+    Returns:
+        dict: Inventory slot information if successful, None otherwise
+    """
+    image = bgr_view(image)
+    if offset is None:
+        # Save a copy of the original full image for comparison
+        save_debug_image(image, "original_full.png", DEBUG_FULL)
+        
+        # Crop to bottom right quadrant where inventory is located
+        cropped_image = crop_bottom_right_quadrant(image)
+        offset = (image.shape[1]//2, image.shape[0]//2)
+    else:
+        cropped_image = image
+    save_debug_image(cropped_image, "original_cropped.png")
+    
+    result = detect_grid(cropped_image, INVENTORY_ROWS, INVENTORY_COLUMNS, offset=offset,
+                         scale=scale, default=DEFAULT_INVENTORY_CONFIG, highlight=highlight,
+                         progress=progress)
+    # The inventory config has no grid size, it is always 4x7
+    result.pop('columns', None)
+    result.pop('rows', None)
+    return result
 
 def save_calibration(calibration_data):
     """
@@ -519,33 +392,15 @@ def save_calibration(calibration_data):
     Returns:
         bool: True if successful, False otherwise
     """
-    try:
-        # Extract just the calibration parameters (not metadata like 'using_defaults')
-        config_to_save = {
-            'base_x': calibration_data['base_x'],
-            'base_y': calibration_data['base_y'],
-            'x_spacing': calibration_data['x_spacing'],
-            'y_spacing': calibration_data['y_spacing']
-        }
-        
-        os.makedirs(os.path.dirname(CONFIG_FILE), exist_ok=True)
-        
-        with open(CONFIG_FILE, 'w') as f:
-            json.dump(config_to_save, f, indent=4)
-            
-        logger.info(f"Calibration data saved to {CONFIG_FILE}")
-        return True
-        
-    except Exception as e:
-        logger.error(f"Error saving calibration data: {e}")
-        return False
+    # Only the grid parameters are kept, not metadata like 'using_defaults'
+    return save_inventory_config(calibration_data)
 
 def calibrate_inventory():
     """
     Perform inventory calibration using a screenshot.
     
     This function:
-    1. Takes a screenshot
+    1. Takes a screenshot of the bottom right quadrant of the client only
     2. Detects inventory slots
     3. Calculates calibration data
     4. Saves the data to config file
@@ -558,7 +413,8 @@ def calibrate_inventory():
     # Take screenshot
     logger.info("Taking screenshot in 3 seconds. Make sure inventory is visible with yellow slots...")
     time.sleep(3)
-    screenshot = take_screenshot()
+    region = client_quadrant()
+    screenshot = take_screenshot(region)
     
     if screenshot is None:
         logger.error("Failed to take screenshot.")
@@ -568,7 +424,7 @@ def calibrate_inventory():
     save_debug_image(screenshot, "screenshot.png")
     
     # Detect inventory slots
-    calibration_data = detect_inventory_slots(screenshot)
+    calibration_data = detect_inventory_slots(screenshot, offset=region[:2])
     
     if calibration_data is None:
         logger.error("Failed to detect inventory slots.")
@@ -579,6 +435,10 @@ def calibrate_inventory():
         logger.error("Failed to save calibration data.")
         return None
     
+    # Keep reference patches so bots can tell when the grid stops matching
+    if not calibration_data.get('using_defaults', False):
+        save_drift_reference(calibration_data, screenshot, region[:2])
+    
     # Display appropriate message based on detection results
     if calibration_data.get('using_defaults', False):
         logger.info("Unable to auto-detect inventory slots. Using default values:")
@@ -588,4 +448,58 @@ def calibrate_inventory():
     logger.info(f"Base coordinates: ({calibration_data['base_x']}, {calibration_data['base_y']})")
     logger.info(f"Spacing: {calibration_data['x_spacing']}px horizontal, {calibration_data['y_spacing']}px vertical")
     
-    return calibration_data 
\ No newline at end of file
+    return calibration_data
+
+def calibrate_grid(name, roi, rows, cols, highlight=None):
+    """
+    Calibrate a named slot grid from one capture and save it.
+    
+    Args:
+        name (str): Grid name, e.g. 'bank', 'equipment', 'spellbook'
+        roi (tuple): (left, top, width, height) screen region holding the grid
+        rows (int): Grid rows
+        cols (int): Grid columns
+        highlight (list, optional): (low, high) HSV ranges of the slot highlight
+        
+    Returns:
+        dict: Measured grid if successful, None otherwise
+    """
+    screenshot = take_screenshot(roi)
+    if screenshot is None:
+        logger.error("Failed to take screenshot.")
+        return None
+    
+    grid = detect_grid(screenshot, rows, cols, highlight, offset=roi[:2])
+    if grid.get('using_defaults', False):
+        logger.error(f"Unable to detect the {name} grid ({grid['num_detected_slots']} slots found).")
+        return None
+    if not save_grid_config(name, grid):
+        return None
+    
+    logger.info(f"Calibrated {name}: base ({grid['base_x']}, {grid['base_y']}), "
+                f"spacing {grid['x_spacing']}x{grid['y_spacing']}, {cols}x{rows} slots")
+    return grid
+
+def main():
+    """Calibrate a named slot grid from the command line."""
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Slot grid calibration")
+    parser.add_argument("name", help="Grid name, e.g. bank, equipment, spellbook")
+    parser.add_argument("--roi", type=int, nargs=4, required=True,
+                        metavar=("LEFT", "TOP", "WIDTH", "HEIGHT"),
+                        help="Screen region holding the grid")
+    parser.add_argument("--rows", type=int, required=True)
+    parser.add_argument("--cols", type=int, required=True)
+    parser.add_argument("--delay", type=float, default=3, help="Seconds before the capture")
+    args = parser.parse_args()
+    
+    logger.info(f"Taking screenshot in {args.delay:g} seconds. Make sure the {args.name} "
+                f"slots are highlighted...")
+    time.sleep(args.delay)
+    if calibrate_grid(args.name, tuple(args.roi), args.rows, args.cols) is None:
+        raise SystemExit(1)
+
+# For testing
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Detection Stage Timer
+
+This module records how long each stage of the slot detection pipeline takes,
+so benchmarks can see where the time goes instead of only the total.
+
+Key features:
+- Named stages (downscale, hsv, mask, morphology, contours, scoring, grid_fit)
+- Times accumulate per stage until reset, so a stage that runs once per
+  colour range reports its total for the whole detection
+- Disabled by default; the pipeline always calls timed_stage() and pays
+  nothing beyond returning a shared no-op context manager
+
+Performance considerations:
+- Timing uses time.perf_counter() and a dict update per stage, which is
+  negligible next to the OpenCV calls being measured
+- Timings are module-global and not thread-safe. Benchmark one detection
+  at a time
+"""
+
+import time
+from contextlib import nullcontext
+
+# Stages in pipeline order
+STAGES = ('downscale', 'hsv', 'mask', 'morphology', 'contours', 'scoring', 'grid_fit')
+
+_enabled = False
+_timings = {}
+_no_timing = nullcontext()
+
+class _TimedStage:
+    """Context manager adding its elapsed time to one stage."""
+
+    __slots__ = ('name', 'start')
+
+    def __init__(self, name):
+        self.name = name
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        _timings[self.name] = _timings.get(self.name, 0.0) + time.perf_counter() - self.start
+        return False
+
+def enable_stage_timing(enabled=True):
+    """
+    Turn stage timing on or off. Turning it on also clears earlier timings.
+
+    Args:
+        enabled (bool): Whether timed_stage() records anything
+    """
+    global _enabled
+    _enabled = enabled
+    if enabled:
+        reset_stage_timings()
+
+def reset_stage_timings():
+    """Clear all recorded timings."""
+    _timings.clear()
+
+def get_stage_timings():
+    """
+    Get the time spent in each stage since the last reset.
+
+    Returns:
+        dict: Stage name -> seconds, stages that did not run are omitted
+    """
+    return dict(_timings)
+
+def timed_stage(name):
+    """
+    Time a block of code as part of a stage.
+
+    Args:
+        name (str): Stage name, normally one of STAGES
+
+    Returns:
+        Context manager for a with statement
+
+    Example:
+        with timed_stage('hsv'):
+            hsv = cv2.cvtColor(image, cv2.COLOR_BGR2HSV)
+    """
+    return _TimedStage(name) if _enabled else _no_timing
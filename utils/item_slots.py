@@ -45,31 +45,136 @@ from .movements import bezierMove, bezier_between, bezier_relative, simple_move
 from .clicker import click, right_click
 
 # Calibration utilities
-from .calibration.config import load_inventory_config
+from .calibration.config import DEFAULT_BANK_CONFIG, load_inventory_config, inventory_region
+from .calibration.profiles import translate_config, default_to_screen
+
+# Client window position, (0, 0) without X11 or a client window
+from .vision.window import client_origin
+
+# Drift monitoring and UI templates need OpenCV and a capture backend,
+# slots and buttons still work without them using the default coordinates
+try:
+    from .vision.drift import DriftMonitor
+    from .vision.templates import locate_box
+    from .vision.occupancy import inventory_occupancy
+    from .vision.icons import find_item
+except ImportError:
+    DriftMonitor = None
+    locate_box = None
+    inventory_occupancy = None
+    find_item = None
+
+# Named slot grids and right-click menu entries
+from .ui_lookup import load_grid_config_cached, menu_entry, MENU_X_ENTRY, MENU_ALL_ENTRY
 
 # Keyboard controller for modifier keys
 keyboard = Controller()
 
 # Cache for configuration to avoid repeated file reads
 _inventory_config = None
+_config_origin = None
+
+# Opt-in check every few slot lookups that the cached grid still matches the screen
+_drift_monitor = None
+DRIFT_MONITORING = os.environ.get('OSWS_DRIFT_MONITORING', '0') == '1'
 
 def load_inventory_config_cached():
     """
     Load inventory configuration with caching.
     
+    The cached grid follows moves of the client window (see
+    utils/vision/window.py), so a moved window is a shift, not a recalibration.
+    When drift monitoring is turned on and a drift reference was saved, every
+    call counts as a cycle and the cached grid is compared with the screen
+    every few cycles. If it no longer matches, the grid is recalibrated and
+    the new one is returned.
+    
     Returns:
         dict: Configuration with base_x, base_y, x_spacing, y_spacing
     """
-    global _inventory_config
+    global _inventory_config, _drift_monitor, _config_origin
     
     # Return cached config if available
     if _inventory_config is not None:
+        origin = client_origin()
+        if origin != _config_origin:
+            dx, dy = origin[0] - _config_origin[0], origin[1] - _config_origin[1]
+            _config_origin = origin
+            if _drift_monitor is not None:
+                _drift_monitor.translate(dx, dy)
+            else:
+                _inventory_config = translate_config(_inventory_config, dx, dy)
+        if _drift_monitor is not None:
+            _inventory_config = _drift_monitor.tick()
         return _inventory_config
     
     # Load from utility function and cache it
     _inventory_config = load_inventory_config()
+    _config_origin = client_origin()
+    if DRIFT_MONITORING and DriftMonitor is not None:
+        _drift_monitor = DriftMonitor(_inventory_config)
     return _inventory_config
 
+def inv_region():
+    """
+    Get the screen region of the inventory from the calibrated grid.
+    
+    Returns:
+        tuple: (left, top, width, height), e.g. for wait_for_change()
+    """
+    return inventory_region(load_inventory_config_cached())
+
+def inv_occupancy():
+    """
+    Check which inventory slots hold an item.
+    
+    Returns:
+        numpy.ndarray: (28,) booleans in slot order, True for occupied slots,
+                       or None when screen capture is unavailable
+    """
+    if inventory_occupancy is None:
+        return None
+    try:
+        return inventory_occupancy(load_inventory_config_cached())
+    except Exception as e:
+        print(f"Inventory occupancy unavailable: {e}")
+        return None
+
+def inv_count():
+    """
+    Count the occupied inventory slots.
+    
+    Returns:
+        int: Number of occupied slots (0-28), or None when screen capture is unavailable
+    """
+    occupied = inv_occupancy()
+    return None if occupied is None else int(occupied.sum())
+
+def item_slot(name, grid='inventory', default=None):
+    """
+    Find the first slot holding a learned item icon.
+    
+    Items are learned with python -m utils.vision.icons learn. Unlearned items
+    return the default without capturing the screen, so scripts can keep
+    their fixed slot as the default.
+    
+    Args:
+        name: Icon name, e.g. 'logs'
+        grid: 'inventory' or 'bank'
+        default: Slot returned when the item is not found
+        
+    Returns:
+        int: 1-based slot number, or default
+    """
+    if find_item is None:
+        return default
+    try:
+        slots = find_item(name, grid)
+    except Exception as e:
+        print(f"Item lookup unavailable: {e}")
+        return default
+    return slots[0] if slots else default
+
 def inv_slot(slot = 1, time_multiplier = 1, z=10):
     """
     Calculate and move to an inventory slot position using calibrated coordinates.
@@ -101,8 +206,9 @@ def inv_slot(slot = 1, time_multiplier = 1, z=10):
     row = slot // 4  # Calculate row (0-6)
     column = slot % 4  # Calculate column (0-3)
     
-    x = base_x + (x_spacing * column)  # Apply horizontal spacing
-    y = base_y + (y_spacing * row)     # Apply vertical spacing
+    # Calibrated values may be sub-pixel, round once the slot centre is known
+    x = round(base_x + (x_spacing * column))  # Apply horizontal spacing
+    y = round(base_y + (y_spacing * row))     # Apply vertical spacing
     
     # Add random variance within item bounds
     x = rnd.randint(x - z, x + z)
@@ -112,10 +218,14 @@ def inv_slot(slot = 1, time_multiplier = 1, z=10):
     bezierMove(x, y, time_multiplier)
 
 # Dropping items, create a drop_inventory function that holds shift and clicks the inventory slots
-def drop_inventory(slots = 28, time_multiplier = 1, z=8):
+def drop_inventory(slots = 28, time_multiplier = 1, z=8, skip_empty=True):
     """
     Drop items from inventory using various patterns.
     
+    Slots 1 to slots are dropped. With skip_empty, the inventory is checked
+    once before dropping and empty slots are not clicked; without screen
+    capture every slot is clicked as before.
+    
     Patterns and Probabilities:
     1. Column-based (20%): 
        - Methodical dropping by columns
@@ -132,6 +242,12 @@ def drop_inventory(slots = 28, time_multiplier = 1, z=8):
        - Minimal delays
        - Simulates rushed inventory clearing
     """
+    occupied = inv_occupancy() if skip_empty else None
+    
+    def drop(slot):
+        """Whether a slot should be clicked."""
+        return occupied is None or occupied[slot - 1]
+    
     keyboard.press(Key.shift)  # Hold shift key
     
     try:
@@ -140,6 +256,8 @@ def drop_inventory(slots = 28, time_multiplier = 1, z=8):
         if random_value > 0.8:  # Column pattern
             for i in range(4):
                 for slot in range(i + 1, slots + 1, 4):
+                    if not drop(slot):
+                        continue
                     inv_slot(slot, time_multiplier, z)
                     sleep(.1, .1, .1)
                     if rnd.random() > 0.98:  # Occasional extra delay
@@ -153,7 +271,7 @@ def drop_inventory(slots = 28, time_multiplier = 1, z=8):
                 if row % 2 == 0:  # Left to right
                     for col in range(4):
                         slot = row * 4 + col + 1
-                        if slot <= slots:
+                        if slot <= slots and drop(slot):
                             inv_slot(slot, time_multiplier, z)
                             sleep(.1, .1, .1)
                             if rnd.random() > 0.98:
@@ -164,7 +282,7 @@ def drop_inventory(slots = 28, time_multiplier = 1, z=8):
                 else:  # Right to left
                     for col in range(3, -1, -1):
                         slot = row * 4 + col + 1
-                        if slot <= slots:
+                        if slot <= slots and drop(slot):
                             inv_slot(slot, time_multiplier, z)
                             sleep(.1, .1, .1)
                             if rnd.random() > 0.95:
@@ -175,6 +293,8 @@ def drop_inventory(slots = 28, time_multiplier = 1, z=8):
                                 
         else:  # Sequential pattern
             for slot in range(1, slots + 1):
+                if not drop(slot):
+                    continue
                 inv_slot(slot, time_multiplier, z)
                 sleep(.1, .1, .1)
                 if rnd.random() > 0.98:
@@ -220,8 +340,8 @@ def simp_inv_slot(slot = 1, time_multiplier = 1, z=8):
     row = slot // 4
     column = slot % 4
     
-    x = base_x + (x_spacing * column)
-    y = base_y + (y_spacing * row)
+    x = round(base_x + (x_spacing * column))
+    y = round(base_y + (y_spacing * row))
     
     # Add random variance
     x = rnd.randint(x - z, x + z)
@@ -230,29 +350,72 @@ def simp_inv_slot(slot = 1, time_multiplier = 1, z=8):
     # Move to the slot
     simple_move(x, y, time_multiplier)
 
-def bank_slot(slot = 1, time_multiplier = 1, sleep_for = .01, sleep_upto = .01, x = 520, y=160, z=10):
+def bank_slot(slot = 1, time_multiplier = 1, sleep_for = .01, sleep_upto = .01, x = None, y=None, z=10):
     """
     Move to a bank slot position.
     
     Bank Interface Properties:
     - 8 slots per row (fixed width)
-    - Consistent 69px horizontal, 52px vertical spacing
+    - Origin and spacing measured with
+      python -m utils.calibration.vision.screenshot bank --roi ... --rows 8 --cols 8,
+      otherwise 69px horizontal, 52px vertical spacing from (520, 160)
     - z=10 provides natural click distribution
     - Short sleep times optimize banking speed
+    - x, y override the first slot in the default layout (see ui_box())
     
     Note: Bank rows adjust based on item count but spacing remains constant
     """
+    config = load_grid_config_cached('bank')
+    base_x, base_y = config['base_x'], config['base_y']
+    if x is not None or y is not None:
+        base_x, base_y = default_to_screen(DEFAULT_BANK_CONFIG['base_x'] if x is None else x,
+                                   DEFAULT_BANK_CONFIG['base_y'] if y is None else y)
     slot -= 1
-    row = slot // 8  # 8 slots per row (fixed)
-    column = slot % 8
-    x = x + (69 * column)  # 69px horizontal spacing
-    y = y + (52 * row)    # 52px vertical spacing
+    row = slot // config['columns']
+    column = slot % config['columns']
+    x = round(base_x + (config['x_spacing'] * column))
+    y = round(base_y + (config['y_spacing'] * row))
     x = rnd.randint(x - z, x + z)
     y = rnd.randint(y - z, y + z)
     #print("Slot:", slot, " Row:", row, " Column:", column, " X:", x, " Y:", y)
     bezierMove(x, y, time_multiplier)
     sleep(sleep_for, sleep_upto, .003)
 
+def ui_box(name, x1, x2, y1, y2):
+    """
+    Get the click box of a UI element.
+    
+    If a template with this name is registered (see utils/vision/templates.py)
+    and found on screen, its location is used. Otherwise the given box, tuned
+    for 1920x1080 with 45% RuneLite scaling, is returned shifted by how far
+    the client window moved from where the defaults fit (see
+    calibration/profiles.default_origin()), so it is unchanged until the
+    client is moved.
+    
+    Args:
+        name: Template name, e.g. 'exit_bank'
+        x1, x2, y1, y2: Default click box
+    
+    Returns:
+        tuple: (x1, x2, y1, y2) on the screen
+    """
+    x1, y1 = default_to_screen(x1, y1)
+    x2, y2 = default_to_screen(x2, y2)
+    if locate_box is None:
+        return x1, x2, y1, y2
+    return locate_box(name, (x1, x2, y1, y2))
+
+def bezier_to(name, x1, x2, y1, y2, time=0.4):
+    """
+    Move into the click box of a UI element, see ui_box().
+    
+    Args:
+        name: Template name
+        x1, x2, y1, y2: Default click box
+        time: Base movement time, as for bezier_between
+    """
+    bezier_between(*ui_box(name, x1, x2, y1, y2), time)
+
 def bank_near_inv(x1=1480, x2=1540, y1=615, y2=885, time= rnd.randint(23, 48)/100, wait=.3):
     """
     Move to bank interface near inventory.
@@ -270,7 +433,7 @@ def bank_near_inv(x1=1480, x2=1540, y1=615, y2=885, time= rnd.randint(23, 48)/10
     The wait parameter (0.3s default) provides time for the bank interface to respond
     after clicking, with a double sleep pattern to create natural timing variance.
     """
-    bezier_between(x1, x2, y1, y2, time) 
+    bezier_to('bank_near_inv', x1, x2, y1, y2, time)
     sleep(.1, wait, .05) #sleep#open up the bank.
     sleep()
 
@@ -294,6 +457,7 @@ def exit_bank(x1=1075, x2=1100, y1=41, y2=64, time= rnd.randint(30, 52)/100, pau
     The double sleep pattern (pause + standard sleep) creates a natural
     rhythm for finishing a banking session before continuing with gameplay.
     """
+    x1, x2, y1, y2 = ui_box('exit_bank', x1, x2, y1, y2)
     if (rnd.random() > 0.6):
         bezier_between(x1, x2, y1, y2, time)
     else:
@@ -321,6 +485,8 @@ def deposit_all(x=1030, y=760, size=9, time = rnd.randint(30, 45)/100, pause_upt
     pattern uses specific offsets that create a slightly asymmetric but natural
     click area (15x16px) based on common user click patterns.
     """
+    x1, x2, y1, y2 = ui_box('deposit_all', x-size, x+size, y-size, y+size)
+    x, y = (x1 + x2) // 2, (y1 + y2) // 2
     if (rnd.random() > 0.7):
         bezier_between(x-size, x+size, y-size, y+size, time)
     else:
@@ -337,11 +503,12 @@ def deposit_all(x=1030, y=760, size=9, time = rnd.randint(30, 45)/100, pause_upt
 
 
 #RELATIVE MOVEMENT
-def get_x_items(x1 = -30, x2 = 20, y1 = 93, y2 = 97, time= rnd.random() * 0.1 + rnd.randint(13, 39)/100, pause_upto=.2):
+def get_x_items(x1 = -30, x2 = 20, y1 = 93, y2 = 97, time= rnd.random() * 0.1 + rnd.randint(13, 39)/100, pause_upto=.2, entry=MENU_X_ENTRY):
     """
     Select X items from right-click menu.
     
     Movement Pattern:
+    - Into the located menu entry when possible, otherwise relative to the cursor:
     - Wider horizontal range (-30 to +20) matches menu shape
     - Narrow vertical range (93-97) for precise option selection
     - Time calculation combines smooth (0.1) and stepped (13-39ms) components
@@ -351,7 +518,9 @@ def get_x_items(x1 = -30, x2 = 20, y1 = 93, y2 = 97, time= rnd.random() * 0.1 +
     """
     sleep(.03, .09)
     right_click()
-    if rnd.random() > 0.69420:  # ~31% chance for wider movement range (specific value not critical)
+    if menu_entry(entry, time):  # Located on screen, no offsets needed
+        pass
+    elif rnd.random() > 0.69420:  # ~31% chance for wider movement range (specific value not critical)
         bezier_relative(x1-15, x2+10, y1, y2, time)  # Wider movement
     else:
         bezier_relative(x1, x2, y1+1, y2-1, time)  # Precise movement
@@ -361,18 +530,20 @@ def get_x_items(x1 = -30, x2 = 20, y1 = 93, y2 = 97, time= rnd.random() * 0.1 +
      # Copy the get_x_items() function with this line: pag.moveRel(rnd.randint(-30, 17), rnd.randint(101, 114), yrt * 0.12 + 0.23) #move mouse down to quantity of all
 
 
-def get_all_items(x1 = -30, x2 = 20, y1 = 132, y2 = 136, time= rnd.random() * 0.15 + 0.3, pause_upto=.2):
+def get_all_items(x1 = -30, x2 = 20, y1 = 132, y2 = 136, time= rnd.random() * 0.15 + 0.3, pause_upto=.2, entry=MENU_ALL_ENTRY):
     """
     Select all items from right-click menu.
     
     Differences from get_x_items:
-    - Lower y-position (132-136) for "All" option
+    - Lower entry (MENU_ALL_ENTRY, y-position 132-136 without detection) for "All" option
     - Longer base time (0.3 vs 0.1) as it's often a deliberate choice
     - Same x-range as menu width is consistent
     """
     sleep(.03, .09)
     right_click()
-    if rnd.random() > 0.69420:
+    if menu_entry(entry, time):
+        pass
+    elif rnd.random() > 0.69420:
         bezier_relative(x1-15, x2+10, y1, y2+5, time)
     else:
         bezier_relative(x1, x2, y1+1, y2-1, time)
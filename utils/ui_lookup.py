@@ -0,0 +1,96 @@
+"""
+UI Lookup Helpers for OSWS Framework
+
+This module locates interface elements that item_slots.py clicks besides the
+inventory itself:
+- Named slot grids (bank, ...) loaded from the calibration, cached and
+  following moves of the client window
+- Entries of the right-click menu, located on screen
+
+item_slots.py imports these helpers, so scripts keep using them from there.
+"""
+
+import os
+
+# Movement utilities
+from .movements import bezier_between
+
+# Calibration utilities
+from .calibration.config import GRIDS_FILE, load_grid_config
+from .calibration.profiles import translate_config
+
+# Client window position, (0, 0) without X11 or a client window
+from .vision.window import client_origin
+
+# Menu detection needs OpenCV and a capture backend, callers fall back to
+# their fixed offsets without it
+try:
+    from .vision.menus import entry_box
+except ImportError:
+    entry_box = None
+
+# Named grids (bank, ...) with the client position and the grids file
+# modification time they were loaded for
+_grid_configs = {}
+
+# Entries the relative offsets in item_slots.get_x_items() and get_all_items()
+# land on with the default menu layout (1-based, the header does not count)
+MENU_X_ENTRY = 5
+MENU_ALL_ENTRY = 7
+
+def _grids_mtime():
+    """Modification time of the grids file, None if there is none."""
+    try:
+        return os.path.getmtime(GRIDS_FILE)
+    except OSError:
+        return None
+
+def load_grid_config_cached(name):
+    """
+    Load a named slot grid with caching, following moves of the client window.
+    
+    The grid is loaded again when grids.json changed, so a grid calibrated
+    while a script runs is picked up. Unknown grids are not cached.
+
+    Args:
+        name: Grid name, e.g. 'bank'
+
+    Returns:
+        dict: Grid with base_x, base_y, x_spacing, y_spacing, columns and rows,
+              or None for an unknown grid
+    """
+    origin = client_origin()
+    mtime = _grids_mtime()
+    cached = _grid_configs.get(name)
+    if cached is None or cached[2] != mtime:
+        config = load_grid_config(name)
+    else:
+        config, cached_origin, _ = cached
+        if cached_origin != origin:
+            config = translate_config(config, origin[0] - cached_origin[0],
+                                      origin[1] - cached_origin[1])
+    if config is None:
+        _grid_configs.pop(name, None)
+    else:
+        _grid_configs[name] = (config, origin, mtime)
+    return config
+
+def menu_entry(entry, time):
+    """
+    Move into an entry of the right-click menu that was just opened.
+
+    The entry is located on screen by utils/vision/menus.py, so a different
+    entry count or a menu clamped at the screen edge does not matter.
+
+    Args:
+        entry: 1-based entry number, the header does not count
+        time: Movement time in seconds
+
+    Returns:
+        bool: True if the entry was located and moved to, False if the caller
+              should fall back to its fixed offsets
+    """
+    box = entry_box(entry) if entry_box is not None else None
+    if box is not None:
+        bezier_between(*box, time)
+    return box is not None
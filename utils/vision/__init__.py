@@ -2,4 +2,8 @@
 Computer vision utilities for the OSWS framework.
 This package contains tools for capturing and analyzing screenshots
 to detect UI elements like inventory slots.
-""" 
\ No newline at end of file
+"""
+
+__all__ = ["capture", "drift", "watcher", "templates", "occupancy", "frame_bus",
+           "digits", "icons", "states", "window",
+           "probes", "menus"]
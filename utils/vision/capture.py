@@ -0,0 +1,317 @@
+"""
+Screen Capture Utilities
+
+This module provides region-of-interest screen capture for the OSWS vision code.
+Only the requested rectangle is read from the display, so calibration and
+per-cycle checks only pay for the pixels they actually use.
+
+Key features:
+- Region capture through mss (XGetImage/XShm on X11) when it is installed
+- Automatic fallback to pyautogui when mss is missing or fails
+- Frames returned as BGR NumPy arrays ready for OpenCV
+- CaptureSession with preallocated BGRA buffers filled in place on every grab
+- Helpers for the screen size and the bottom right quadrant region
+
+Regions follow the pyautogui convention: (left, top, width, height) in
+absolute desktop pixels.
+
+Performance considerations:
+- A 640x540 inventory quadrant is ~1/4 of a 1920x1080 frame, so capture and
+  conversion cost drop by roughly the same factor
+- mss keeps its X11 connection open per thread, avoiding a reconnect per grab
+- grab_region() allocates a fresh array per call. Loops that capture the same
+  region repeatedly should use a CaptureSession, which copies each frame once
+  into a buffer it owns and hands out views instead of new arrays. Its BGR
+  views are not contiguous: reading them is free, drawing on them needs a copy
+"""
+
+import logging
+import threading
+import numpy as np
+
+try:
+    import mss
+except ImportError:
+    mss = None
+
+try:
+    import pyautogui
+except Exception:  # pyautogui raises on import when no display is available
+    pyautogui = None
+
+# Set up logging
+logging.basicConfig(level=logging.INFO,
+                    format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Capture backends in order of preference
+CAPTURE_BACKENDS = ('mss', 'pyautogui')
+
+# Backend forced through set_capture_backend(), None means automatic
+_forced_backend = None
+
+# mss instances hold an X11 connection and must not be shared between threads
+_thread_state = threading.local()
+
+def _get_mss():
+    """Return the mss instance for the calling thread, creating it on first use."""
+    sct = getattr(_thread_state, 'sct', None)
+    if sct is None:
+        sct = mss.mss()
+        _thread_state.sct = sct
+    return sct
+
+def available_backends():
+    """
+    List the capture backends that can be used in this environment.
+
+    Returns:
+        list: Backend names in order of preference
+    """
+    backends = []
+    if mss is not None:
+        backends.append('mss')
+    if pyautogui is not None:
+        backends.append('pyautogui')
+    return backends
+
+def set_capture_backend(backend=None):
+    """
+    Force a specific capture backend.
+
+    Args:
+        backend (str, optional): 'mss', 'pyautogui' or None for automatic selection
+    """
+    global _forced_backend
+    if backend is not None and backend not in CAPTURE_BACKENDS:
+        raise ValueError(f"Unknown capture backend: {backend}. Must be one of {CAPTURE_BACKENDS}.")
+    _forced_backend = backend
+
+def get_capture_backend():
+    """
+    Get the backend that grab_region() will use.
+
+    Returns:
+        str: Backend name, or None if no backend is available
+    """
+    if _forced_backend is not None:
+        return _forced_backend
+    backends = available_backends()
+    return backends[0] if backends else None
+
+def screen_size():
+    """
+    Get the size of the primary screen.
+
+    Returns:
+        tuple: (width, height) in pixels
+    """
+    if get_capture_backend() == 'mss':
+        monitor = _get_mss().monitors[1]
+        return monitor['width'], monitor['height']
+    if pyautogui is not None:
+        width, height = pyautogui.size()
+        return width, height
+    raise RuntimeError("No screen capture backend available. Install mss or pyautogui.")
+
+def full_screen_region():
+    """
+    Get the region covering the entire primary screen.
+
+    Returns:
+        tuple: (left, top, width, height)
+    """
+    if get_capture_backend() == 'mss':
+        monitor = _get_mss().monitors[1]
+        return monitor['left'], monitor['top'], monitor['width'], monitor['height']
+    width, height = screen_size()
+    return 0, 0, width, height
+
+def bottom_right_quadrant(size=None):
+    """
+    Get the region covering the bottom right quarter of the screen.
+
+    Matches crop_bottom_right_quadrant() in the calibration code, so a region
+    capture returns the same pixels as cropping a full screenshot.
+
+    Args:
+        size (tuple, optional): (width, height) of the screen, detected if omitted
+
+    Returns:
+        tuple: (left, top, width, height)
+    """
+    width, height = size if size else screen_size()
+    return width // 2, height // 2, width - width // 2, height - height // 2
+
+def _grab_mss(region):
+    """Capture a region with mss and return a BGRA view of the raw frame."""
+    left, top, width, height = region
+    shot = _get_mss().grab({'left': left, 'top': top, 'width': width, 'height': height})
+    return np.frombuffer(shot.raw, dtype=np.uint8).reshape(shot.height, shot.width, 4)
+
+def _grab_pyautogui(region):
+    """Capture a region with pyautogui and return an RGB array."""
+    return np.asarray(pyautogui.screenshot(region=tuple(region)))
+
+def grab_region(region=None, backend=None):
+    """
+    Capture a region of the screen.
+
+    Args:
+        region (tuple, optional): (left, top, width, height) to capture.
+            Captures the entire primary screen when omitted.
+        backend (str, optional): Backend to use, defaults to get_capture_backend()
+
+    Returns:
+        numpy.ndarray: Captured region as a contiguous BGR array (height, width, 3)
+
+    Example:
+        inventory = grab_region((1600, 600, 300, 400))
+    """
+    backend = backend or get_capture_backend()
+    if backend is None:
+        raise RuntimeError("No screen capture backend available. Install mss or pyautogui.")
+    if region is None:
+        region = full_screen_region()
+
+    if backend == 'mss':
+        try:
+            return np.ascontiguousarray(_grab_mss(region)[..., :3])
+        except Exception as e:
+            if pyautogui is None:
+                raise
+            logger.warning(f"mss capture failed ({e}). Falling back to pyautogui.")
+
+    # pyautogui returns RGB, reverse the channels for OpenCV
+    return np.ascontiguousarray(_grab_pyautogui(region)[..., ::-1])
+
+class CaptureSession:
+    """
+    Persistent capture session with one preallocated frame buffer per region.
+
+    grab_region() builds a new array on every call. A session instead keeps a
+    BGRA buffer for each region it has seen and fills it in place, so a polling
+    loop does a single copy per frame and no allocations after the first grab.
+
+    The buffers are reused: a frame returned by grab() is overwritten by the
+    next grab of the same region. Copy it if it has to outlive that.
+
+    Example:
+        session = CaptureSession()
+        frame = session.grab(region)       # BGRA buffer, filled in place
+        bgr = session.grab_bgr(region)     # BGR view of the same buffer, read-only use
+        canvas = np.ascontiguousarray(bgr) # Copy before drawing on it with OpenCV
+    """
+
+    def __init__(self, backend=None):
+        """
+        Args:
+            backend (str, optional): Backend to use, defaults to get_capture_backend()
+        """
+        self.backend = backend or get_capture_backend()
+        if self.backend is None:
+            raise RuntimeError("No screen capture backend available. Install mss or pyautogui.")
+        self._buffers = {}
+
+    def buffer(self, region):
+        """
+        Get the preallocated BGRA buffer for a region, allocating it on first use.
+
+        Args:
+            region (tuple): (left, top, width, height)
+
+        Returns:
+            numpy.ndarray: Buffer of shape (height, width, 4)
+        """
+        region = tuple(region)
+        buf = self._buffers.get(region)
+        if buf is None:
+            buf = np.empty((region[3], region[2], 4), dtype=np.uint8)
+            buf[..., 3] = 255  # The pyautogui path only writes the colour channels
+            self._buffers[region] = buf
+        return buf
+
+    def grab(self, region=None, out=None):
+        """
+        Capture a region into its preallocated buffer.
+
+        Args:
+            region (tuple, optional): (left, top, width, height), full screen if omitted
+            out (numpy.ndarray, optional): Caller-owned (height, width, 4) buffer to
+                fill instead of the session buffer
+
+        Returns:
+            numpy.ndarray: The filled BGRA buffer
+        """
+        if region is None:
+            region = full_screen_region()
+        buf = out if out is not None else self.buffer(region)
+
+        if self.backend == 'mss':
+            try:
+                np.copyto(buf, _grab_mss(region))
+                return buf
+            except Exception as e:
+                if pyautogui is None:
+                    raise
+                logger.warning(f"mss capture failed ({e}). Falling back to pyautogui.")
+
+        # Reverse RGB into the colour channels of the buffer in a single pass
+        np.copyto(buf[..., :3], _grab_pyautogui(region)[..., ::-1])
+        return buf
+
+    def grab_bgr(self, region=None):
+        """
+        Capture a region and return a BGR view of its buffer.
+
+        The view shares memory with the BGRA buffer but is not contiguous (its
+        pixels are 4 bytes apart). OpenCV functions that only read it accept
+        it, copying it internally where they need to. Functions that write into
+        it (cv2.circle, cv2.rectangle, dst= arguments, ...) raise, so pass
+        np.ascontiguousarray(view) or view.copy() to those instead.
+
+        Args:
+            region (tuple, optional): (left, top, width, height), full screen if omitted
+
+        Returns:
+            numpy.ndarray: BGR view of shape (height, width, 3)
+        """
+        return bgr_view(self.grab(region))
+
+    def release(self, region=None):
+        """
+        Free the buffer of one region, or all buffers when region is omitted.
+
+        Args:
+            region (tuple, optional): (left, top, width, height)
+        """
+        if region is None:
+            self._buffers.clear()
+        else:
+            self._buffers.pop(tuple(region), None)
+
+def bgr_view(frame):
+    """
+    Get a BGR view of a BGRA frame without copying.
+
+    The view of a BGRA frame is not contiguous, see CaptureSession.grab_bgr():
+    make it contiguous with np.ascontiguousarray() before any OpenCV write.
+
+    Args:
+        frame (numpy.ndarray): BGRA or BGR image
+
+    Returns:
+        numpy.ndarray: BGR view sharing memory with frame (read-only use)
+    """
+    if frame.ndim == 3 and frame.shape[2] == 4:
+        return frame[..., :3]
+    return frame
+
+# For testing
+if __name__ == "__main__":
+    print("Screen Capture Utilities")
+    print("------------------------")
+    print(f"Available backends: {available_backends()}")
+    print(f"Selected backend: {get_capture_backend()}")
+    print(f"Screen size: {screen_size()}")
+    print(f"Quadrant frame shape: {grab_region(bottom_right_quadrant()).shape}")
@@ -0,0 +1,406 @@
+"""
+Calibration Drift Monitor
+
+This module detects when the saved inventory grid no longer matches the game
+client, for example after the window was moved or resized, and recalibrates
+only then.
+
+At calibration time a few small reference patches are cut from the screenshot
+at the gaps between inventory slots, where the interface background is static
+whatever the slots contain. Every N cycles the monitor captures the small
+region holding those patches and compares it with the references using
+normalized cross-correlation. The full detect_inventory_slots() pipeline only
+runs when the score drops below a threshold.
+
+Key features:
+- Reference patches saved next to inventory_config.json and tied to the grid
+  they were taken with, together with the client window position, so a
+  reference still matches its grid after the client window moved
+- Median score over several patches, so the mouse cursor over one patch does
+  not trigger a recalibration
+- Automatic recalibration that saves the new grid and fresh references
+- Only runs with a saved reference; the screen at some arbitrary moment is
+  never taken as the reference, since the inventory state then is unknown
+- A failed recalibration (e.g. the slot highlights are off during play)
+  disables the monitor instead of retrying on every check
+
+Performance considerations:
+- A check captures one region of roughly the inventory's size and compares
+  four 12x12 patches in NumPy, about a millisecond in total
+- Checks only run every DRIFT_CHECK_INTERVAL cycles; between checks tick()
+  is a counter increment
+"""
+
+import os
+import logging
+import numpy as np
+import cv2
+
+from .frame_bus import capture_session
+from .window import client_origin, client_quadrant
+
+# Set up logging
+logging.basicConfig(level=logging.INFO,
+                    format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Get the project root directory
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '../..'))
+REFERENCE_FILE = os.path.join(project_root, 'config', 'drift_reference.npz')
+
+# Drift check settings
+DRIFT_CHECK_INTERVAL = 50  # Cycles between checks
+DRIFT_THRESHOLD = 0.6      # Median correlation below which the grid is considered moved
+PATCH_COUNT = 4            # Reference patches kept
+PATCH_FRACTION = 0.25      # Patch size relative to the smaller slot spacing, keeps clear of slot highlights
+FLAT_STD = 2.0             # Patches with less contrast than this are compared by brightness only
+FLAT_TOLERANCE = 12.0      # Maximum brightness difference between two flat patches
+
+GRID_KEYS = ('base_x', 'base_y', 'x_spacing', 'y_spacing')
+
+def gap_points(config):
+    """
+    Get the points where four inventory slots meet.
+
+    Args:
+        config (dict): Inventory config with base_x, base_y, x_spacing, y_spacing
+
+    Returns:
+        numpy.ndarray: (18, 2) array of (x, y) screen coordinates for the 3x6 inner gaps
+    """
+    cols, rows = np.meshgrid(np.arange(3) + 0.5, np.arange(6) + 0.5)
+    x = config['base_x'] + cols.ravel() * config['x_spacing']
+    y = config['base_y'] + rows.ravel() * config['y_spacing']
+    return np.stack([x, y], axis=1)
+
+def patch_size(config):
+    """
+    Get the side length of a reference patch for a grid.
+
+    Args:
+        config (dict): Inventory config
+
+    Returns:
+        int: Patch side in pixels (even, at least 6)
+    """
+    size = int(min(config['x_spacing'], config['y_spacing']) * PATCH_FRACTION)
+    return max(6, size - size % 2)
+
+def _cut_patches(gray, origin, points, size):
+    """
+    Cut square patches centred on screen points from a grayscale frame.
+
+    Args:
+        gray (numpy.ndarray): Grayscale frame
+        origin (tuple): Screen position of the frame's top-left pixel
+        points (numpy.ndarray): (k, 2) integer screen points
+        size (int): Patch side
+
+    Returns:
+        numpy.ndarray: (k, size, size) patches, or None if any patch leaves the frame
+    """
+    half = size // 2
+    corners = points - np.asarray(origin) - half
+    if (corners < 0).any() or (corners[:, 0] + size > gray.shape[1]).any() \
+            or (corners[:, 1] + size > gray.shape[0]).any():
+        return None
+    return np.stack([gray[y:y + size, x:x + size] for x, y in corners])
+
+def patch_similarity(patches, references):
+    """
+    Normalized cross-correlation between matching pairs of patches.
+
+    Pairs where both patches are flat have no texture to correlate, so they
+    score 1.0 when their brightness matches and 0.0 otherwise.
+
+    Args:
+        patches (numpy.ndarray): (k, h, w) patches
+        references (numpy.ndarray): (k, h, w) reference patches
+
+    Returns:
+        numpy.ndarray: (k,) scores from -1.0 to 1.0
+    """
+    a = patches.reshape(len(patches), -1).astype(np.float32)
+    b = references.reshape(len(references), -1).astype(np.float32)
+    mean_a = a.mean(axis=1, keepdims=True)
+    mean_b = b.mean(axis=1, keepdims=True)
+    a = a - mean_a
+    b = b - mean_b
+    norm = np.sqrt((a * a).sum(axis=1) * (b * b).sum(axis=1))
+    scores = np.divide((a * b).sum(axis=1), norm, out=np.zeros(len(a), np.float32), where=norm > 0)
+
+    flat = (a.std(axis=1) < FLAT_STD) & (b.std(axis=1) < FLAT_STD)
+    same_brightness = np.abs(mean_a - mean_b)[:, 0] <= FLAT_TOLERANCE
+    return np.where(flat, same_brightness.astype(np.float32), scores)
+
+def build_reference(config, frame, origin=(0, 0)):
+    """
+    Build reference patches for a grid from a frame showing the inventory.
+
+    The most textured gap points are used, since they give the sharpest
+    correlation peak.
+
+    Args:
+        config (dict): Inventory config the frame was calibrated with
+        frame (numpy.ndarray): BGR or BGRA frame
+        origin (tuple): Screen position of the frame's top-left pixel
+
+    Returns:
+        dict: Reference with 'grid', 'points' and 'patches', or None if the
+              gap points are not inside the frame
+    """
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGRA2GRAY if frame.shape[2] == 4 else cv2.COLOR_BGR2GRAY)
+    size = patch_size(config)
+    points = np.rint(gap_points(config)).astype(np.int64)
+    patches = _cut_patches(gray, origin, points, size)
+    if patches is None:
+        logger.warning("Inventory gaps are outside the frame, no drift reference built")
+        return None
+
+    textured = np.argsort(patches.reshape(len(patches), -1).std(axis=1))[::-1][:PATCH_COUNT]
+    return {
+        'grid': np.array([config[key] for key in GRID_KEYS], dtype=np.float64),
+        'points': points[textured],
+        'patches': patches[textured].copy(),
+    }
+
+def save_drift_reference(config, frame, origin=(0, 0), path=REFERENCE_FILE):
+    """
+    Build and save the drift reference for a freshly calibrated grid.
+
+    Args:
+        config (dict): Saved inventory config
+        frame (numpy.ndarray): Calibration screenshot
+        origin (tuple): Screen position of the screenshot's top-left pixel
+        path (str): Reference file
+
+    Returns:
+        bool: True if saved, False otherwise
+    """
+    reference = build_reference(config, frame, origin)
+    return reference is not None and _write_reference(reference, path)
+
+def _write_reference(reference, path):
+    """Write a reference to disk with the current client position, returning True on success."""
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        np.savez(path, origin=np.array(client_origin(), dtype=np.int64), **reference)
+        logger.info(f"Drift reference saved to {path}")
+        return True
+    except Exception as e:
+        logger.error(f"Error saving drift reference: {e}")
+        return False
+
+def load_drift_reference(config, path=REFERENCE_FILE):
+    """
+    Load the saved drift reference if it belongs to a grid.
+
+    The reference is shifted by how far the client window moved since it was
+    saved, the same shift the cached inventory config gets, before the grids
+    are compared.
+
+    Args:
+        config (dict): Inventory config in use
+        path (str): Reference file
+
+    Returns:
+        dict: Reference, or None if missing or taken with a different grid
+    """
+    try:
+        if not os.path.exists(path):
+            return None
+        with np.load(path) as data:
+            reference = {key: data[key] for key in ('grid', 'points', 'patches')}
+            saved_origin = data['origin'] if 'origin' in data else None
+    except Exception as e:
+        logger.error(f"Error loading drift reference from {path}: {e}")
+        return None
+
+    # References saved without a client position stay where they were taken
+    if saved_origin is not None:
+        move = np.array(client_origin(), dtype=np.int64) - saved_origin
+        reference['grid'] = reference['grid'] + np.concatenate([move, [0, 0]])
+        reference['points'] = reference['points'] + move
+
+    grid = np.array([config[key] for key in GRID_KEYS], dtype=np.float64)
+    if not np.allclose(reference['grid'], grid):
+        logger.info("Drift reference was taken with a different grid, ignoring it")
+        return None
+    return reference
+
+class DriftMonitor:
+    """
+    Periodic check that the inventory grid still matches the screen.
+
+    Example:
+        monitor = DriftMonitor(load_inventory_config())
+        while running:
+            config = monitor.tick()   # Checks every DRIFT_CHECK_INTERVAL calls
+            ...
+    """
+
+    def __init__(self, config, interval=DRIFT_CHECK_INTERVAL, threshold=DRIFT_THRESHOLD,
+                 recalibrate=None, reference_file=REFERENCE_FILE):
+        """
+        Args:
+            config (dict): Inventory config in use
+            interval (int): Cycles between checks
+            threshold (float): Score below which the grid is recalibrated
+            recalibrate (callable, optional): Function returning a new config or None.
+                Defaults to a full screenshot calibration.
+            reference_file (str): Reference file to load and update
+        """
+        self.config = config
+        self.interval = interval
+        self.threshold = threshold
+        self.reference_file = reference_file
+        self._recalibrate = recalibrate or recalibrate_from_screen
+        self._cycles = 0
+        self._session = None
+        self._disabled = False
+        self.reference = load_drift_reference(config, reference_file)
+        self.last_score = None
+        if self.reference is None:
+            logger.info("No drift reference for this grid, drift monitoring is off")
+            self._disabled = True
+
+    def _region(self):
+        """Screen region covering every reference patch."""
+        size = self.reference['patches'].shape[1]
+        half = size // 2
+        left, top = self.reference['points'].min(axis=0) - half
+        right, bottom = self.reference['points'].max(axis=0) - half + size
+        return int(left), int(top), int(right - left), int(bottom - top)
+
+    def _capture(self, region):
+        """Capture a region as BGRA through the monitor's session."""
+        if self._session is None:
+            self._session = capture_session()
+        return self._session.grab(region)
+
+    def score(self):
+        """
+        Compare the screen with the reference patches.
+
+        Returns:
+            float: Median correlation over the patches
+
+        Raises:
+            RuntimeError: Without a saved reference for the grid
+        """
+        if self.reference is None:
+            raise RuntimeError("No drift reference for this grid, save a screenshot calibration first")
+
+        region = self._region()
+        gray = cv2.cvtColor(self._capture(region), cv2.COLOR_BGRA2GRAY)
+        size = self.reference['patches'].shape[1]
+        patches = _cut_patches(gray, region[:2], self.reference['points'], size)
+        return float(np.median(patch_similarity(patches, self.reference['patches'])))
+
+    def check(self):
+        """
+        Run one drift check, recalibrating if the score is below the threshold.
+
+        A failed recalibration disables the monitor: it runs in the caller's
+        click path and needs the slot highlights, so retrying every interval
+        during normal play would only repeat the failure.
+
+        Returns:
+            bool: True if drift was detected
+        """
+        try:
+            self.last_score = self.score()
+        except Exception as e:
+            logger.warning(f"Drift check unavailable ({e}). Disabling drift monitor.")
+            self._disabled = True
+            return False
+
+        if self.last_score >= self.threshold:
+            return False
+
+        logger.warning(f"Inventory drift detected (score {self.last_score:.2f} < {self.threshold}). "
+                       f"Recalibrating...")
+        result = self._recalibrate()
+        if result is None:
+            logger.warning("Recalibration failed, keeping the current inventory config and "
+                           "disabling the drift monitor. Run the screenshot calibrator to fix it.")
+            self._disabled = True
+            return True
+
+        config, frame, origin = result
+        self.config = config
+        self.reference = build_reference(config, frame, origin)
+        if self.reference is not None:
+            _write_reference(self.reference, self.reference_file)
+        logger.info(f"Inventory recalibrated: base ({config['base_x']}, {config['base_y']}), "
+                    f"spacing {config['x_spacing']}x{config['y_spacing']}")
+        return True
+
+    def translate(self, dx, dy):
+        """
+        Follow a move of the client window without recalibrating.
+
+        Args:
+            dx, dy: Screen offset of the move
+
+        Returns:
+            dict: The shifted inventory config
+        """
+        # Imported here, profiles loads the calibration package
+        from ..calibration.profiles import translate_config
+        self.config = translate_config(self.config, dx, dy)
+        if self.reference is not None:
+            move = np.rint((dx, dy)).astype(np.int64)
+            self.reference = dict(self.reference, points=self.reference['points'] + move,
+                                  grid=self.reference['grid'] + np.concatenate([move, [0, 0]]))
+        return self.config
+
+    def tick(self):
+        """
+        Count one cycle and check for drift every interval cycles.
+
+        Returns:
+            dict: The inventory config to use, updated after a recalibration
+        """
+        if self._disabled:
+            return self.config
+        self._cycles += 1
+        if self._cycles >= self.interval:
+            self._cycles = 0
+            self.check()
+        return self.config
+
+def recalibrate_from_screen():
+    """
+    Run the full screenshot calibration and save the result.
+
+    Returns:
+        tuple: (config, frame, origin) on success, None if detection fell back to defaults
+    """
+    # Imported here so the monitor itself does not load the calibration pipeline
+    from ..calibration.vision.screenshot import take_screenshot, detect_inventory_slots
+    from ..calibration.config import save_inventory_config
+
+    region = client_quadrant()
+    frame = take_screenshot(region)
+    if frame is None:
+        return None
+    result = detect_inventory_slots(frame, offset=region[:2])
+    if result.get('using_defaults', False):
+        return None
+
+    config = {key: result[key] for key in GRID_KEYS}
+    if not save_inventory_config(config):
+        return None
+    return config, frame, region[:2]
+
+# For testing
+if __name__ == "__main__":
+    from ..calibration.config import load_inventory_config
+
+    print("Calibration Drift Monitor")
+    print("-------------------------")
+    monitor = DriftMonitor(load_inventory_config())
+    print(f"Reference loaded: {monitor.reference is not None}")
+    if monitor.reference is not None:
+        print(f"Score: {monitor.score():.3f} (threshold {monitor.threshold})")
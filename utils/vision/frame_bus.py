@@ -0,0 +1,496 @@
+"""
+Shared Memory Frame Bus
+
+This module lets one capture loop feed every vision feature, in the same
+process or in others. A producer captures a screen region at a fixed rate
+into a ring of frame slots in multiprocessing.shared_memory. Consumers read
+the latest frame straight from shared memory, so adding another watcher,
+drift check or occupancy check no longer adds another capture.
+
+Shared memory layout:
+    header   8 int64: magic, version, slots, left, top, width, height, latest sequence
+    seqs     slots uint64: sequence number of the frame in each slot, 0 while it is written
+    times    slots float64: time.monotonic() when each frame was captured
+    frames   slots x height x width x 4 uint8 BGRA frames
+
+Key features:
+- FrameBusProducer: capture thread writing the ring, also runnable on its own
+  with python -m utils.vision.frame_bus
+- FrameBus: attach to a running bus and read the latest frame with its
+  sequence number and timestamp, or wait for a newer one
+- capture_session(): a drop-in for CaptureSession that serves regions inside
+  the bus from shared memory and captures anything else directly
+
+Performance considerations:
+- FrameBus.latest() returns views into shared memory, nothing is copied. A
+  frame stays intact until the producer wraps around the ring, slots - 1
+  frames later (about 100 ms with the defaults), so callers of the raw view
+  must check it with FrameBus.valid() after using it
+- capture_session() copies the region it serves into a reused buffer and
+  checks the sequence number again after the copy, so its frames are never
+  torn and stay valid like those of a CaptureSession
+- A per-slot sequence number works as a seqlock: the producer clears it before
+  overwriting a slot, so a reader never mistakes a half-written frame for a
+  complete one
+- Capture cost is one grab per producer tick however many consumers read it
+"""
+
+import os
+import time
+import logging
+import threading
+from collections import namedtuple
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from .capture import CaptureSession, full_screen_region
+from .window import client_region, client_quadrant
+
+# Set up logging
+logging.basicConfig(level=logging.INFO,
+                    format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Bus settings
+DEFAULT_BUS_NAME = 'osws_frames'
+DEFAULT_SLOTS = 4           # Frames kept in the ring
+DEFAULT_RATE = 30.0         # Frames captured per second
+MAX_FRAME_AGE = 0.5         # Seconds after which a bus frame is too old to serve
+
+BUS_MAGIC = 0x4F535753      # "OSWS"
+BUS_VERSION = 1
+HEADER_FIELDS = ('magic', 'version', 'slots', 'left', 'top', 'width', 'height', 'latest')
+_MAGIC, _VERSION, _SLOTS, _LEFT, _TOP, _WIDTH, _HEIGHT, _LATEST = range(len(HEADER_FIELDS))
+
+Frame = namedtuple('Frame', ['seq', 'timestamp', 'slot', 'image'])
+
+def _layout(slots, width, height):
+    """
+    Byte offsets of the bus sections.
+
+    Returns:
+        tuple: (seqs offset, times offset, frames offset, total size)
+    """
+    seqs = len(HEADER_FIELDS) * 8
+    times = seqs + slots * 8
+    frames = -(-(times + slots * 8) // 64) * 64  # Cache line aligned frames
+    return seqs, times, frames, frames + slots * height * width * 4
+
+class _BusMemory:
+    """NumPy views over a bus shared memory block."""
+
+    def __init__(self, shm, slots, width, height):
+        seqs, times, frames, _ = _layout(slots, width, height)
+        self.shm = shm
+        self.header = np.ndarray((len(HEADER_FIELDS),), np.int64, shm.buf, 0)
+        self.seqs = np.ndarray((slots,), np.uint64, shm.buf, seqs)
+        self.times = np.ndarray((slots,), np.float64, shm.buf, times)
+        self.frames = np.ndarray((slots, height, width, 4), np.uint8, shm.buf, frames)
+
+    def close(self):
+        """Drop the views and detach from the block."""
+        self.header = self.seqs = self.times = self.frames = None
+        self.shm.close()
+
+def _attach(name):
+    """
+    Open an existing shared memory block without taking ownership of it.
+
+    Before Python 3.13 every process that opens a block registers it with its
+    resource tracker, which unlinks the block when that process exits. Readers
+    unregister it so only the producer decides when the bus goes away.
+    """
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        shm = shared_memory.SharedMemory(name=name)
+        try:
+            from multiprocessing import resource_tracker
+            resource_tracker.unregister(shm._name, 'shared_memory')
+        except Exception:
+            pass  # Windows does not track shared memory
+        return shm
+
+def _remove_stale_bus(name, max_age=2.0, grace=2.0):
+    """
+    Remove a bus left behind by a producer that did not shut down cleanly.
+
+    A bus without any frame may belong to a producer that has only just
+    created it, so it is given grace seconds to publish its first frame.
+
+    Args:
+        name (str): Shared memory name
+        max_age (float): Seconds without a new frame after which a bus is stale
+        grace (float): Seconds a bus without frames has to publish its first one
+
+    Returns:
+        bool: True if the block was stale and removed, False if its producer is alive
+    """
+    try:
+        bus = FrameBus(name)
+    except (RuntimeError, TypeError):
+        return False  # Not a frame bus, leave it alone
+    frame = bus.latest()
+    if frame is None:
+        frame = bus.wait_newer(0, timeout=grace)
+    bus.close()
+    if frame is not None and time.monotonic() - frame.timestamp < max_age:
+        return False
+
+    logger.warning(f"Removing stale frame bus {name}")
+    shm = shared_memory.SharedMemory(name=name)  # Tracked, so unlink() also unregisters it
+    shm.close()
+    shm.unlink()
+    return True
+
+class FrameBusProducer:
+    """
+    Capture loop writing frames of one region into a shared memory ring.
+
+    Example:
+        producer = FrameBusProducer(client_quadrant())
+        producer.start()
+        ...
+        producer.stop()   # Also removes the shared memory block
+    """
+
+    def __init__(self, region=None, name=DEFAULT_BUS_NAME, slots=DEFAULT_SLOTS, rate=DEFAULT_RATE):
+        """
+        Args:
+            region (tuple, optional): (left, top, width, height), the client
+                window (or the full screen without one) if omitted
+            name (str): Shared memory name consumers attach to
+            slots (int): Frames kept in the ring (at least 2)
+            rate (float): Frames captured per second
+        """
+        if slots < 2:
+            raise ValueError("A frame bus needs at least 2 slots")
+        self.region = tuple(int(v) for v in (region or client_region()))
+        self.name = name
+        self.slots = slots
+        self.interval = 1.0 / rate
+        self._memory = None
+        self._thread = None
+        self._stop = threading.Event()
+        self.seq = 0
+
+    def _create(self):
+        """Create and initialise the shared memory block."""
+        left, top, width, height = self.region
+        size = _layout(self.slots, width, height)[3]
+        try:
+            shm = shared_memory.SharedMemory(name=self.name, create=True, size=size)
+        except FileExistsError:
+            if not _remove_stale_bus(self.name):
+                raise RuntimeError(f"A frame bus named {self.name} is already running")
+            shm = shared_memory.SharedMemory(name=self.name, create=True, size=size)
+
+        self._memory = _BusMemory(shm, self.slots, width, height)
+        self._memory.seqs[:] = 0
+        self._memory.frames[..., 3] = 255
+        header = self._memory.header
+        header[_VERSION], header[_SLOTS] = BUS_VERSION, self.slots
+        header[_LEFT], header[_TOP], header[_WIDTH], header[_HEIGHT] = left, top, width, height
+        header[_LATEST] = 0
+        header[_MAGIC] = BUS_MAGIC  # Written last, readers wait for it
+
+    def publish(self, session):
+        """
+        Capture one frame into the next ring slot.
+
+        Args:
+            session (CaptureSession): Session doing the capture
+
+        Returns:
+            int: Sequence number of the new frame
+        """
+        memory = self._memory
+        seq = self.seq + 1
+        slot = seq % self.slots
+        memory.seqs[slot] = 0                      # Slot is being written
+        session.grab(self.region, out=memory.frames[slot])
+        memory.times[slot] = time.monotonic()
+        memory.seqs[slot] = seq                    # Slot holds a complete frame
+        memory.header[_LATEST] = seq
+        self.seq = seq
+        return seq
+
+    def _run(self):
+        """Capture loop."""
+        session = CaptureSession()
+        while not self._stop.is_set():
+            started = time.monotonic()
+            try:
+                self.publish(session)
+            except Exception as e:
+                logger.error(f"Frame bus capture failed ({e}). Stopping the producer.")
+                return
+            self._stop.wait(max(0.0, self.interval - (time.monotonic() - started)))
+
+    def start(self):
+        """Create the bus and start capturing in a background thread."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        if self._memory is None:
+            self._create()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="FrameBusProducer")
+        self._thread.daemon = True
+        self._thread.start()
+        logger.info(f"Frame bus {self.name} publishing {self.region} "
+                    f"at {1.0 / self.interval:g} fps into {self.slots} slots")
+
+    def stop(self):
+        """Stop capturing and remove the shared memory block."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if self._memory is not None:
+            shm = self._memory.shm
+            self._memory.close()
+            self._memory = None
+            shm.unlink()
+
+class FrameBus:
+    """
+    Reader attached to a running frame bus.
+
+    Example:
+        bus = FrameBus()
+        frame = bus.latest()              # Frame(seq, timestamp, slot, image)
+        if frame is not None:
+            process(frame.image)          # BGRA view into shared memory
+            if not bus.valid(frame):      # Overwritten while processing
+                ...
+        newer = bus.wait_newer(frame.seq, timeout=1)
+    """
+
+    def __init__(self, name=DEFAULT_BUS_NAME):
+        """
+        Args:
+            name (str): Shared memory name of the bus
+
+        Raises:
+            FileNotFoundError: If no bus with that name is running
+            RuntimeError: If the block is not a frame bus of this version
+        """
+        shm = _attach(name)
+        header = np.ndarray((len(HEADER_FIELDS),), np.int64, shm.buf, 0)
+        if header[_MAGIC] != BUS_MAGIC or header[_VERSION] != BUS_VERSION:
+            shm.close()
+            raise RuntimeError(f"Shared memory {name} is not a version {BUS_VERSION} frame bus")
+
+        self.name = name
+        self.slots = int(header[_SLOTS])
+        self.region = tuple(int(header[i]) for i in (_LEFT, _TOP, _WIDTH, _HEIGHT))
+        self._memory = _BusMemory(shm, self.slots, self.region[2], self.region[3])
+
+    def latest(self, max_age=None):
+        """
+        Get the most recent complete frame.
+
+        Args:
+            max_age (float, optional): Ignore frames older than this many seconds
+
+        Returns:
+            Frame: Latest frame, or None if there is none (yet) or it is too old
+        """
+        memory = self._memory
+        for _ in range(self.slots):
+            seq = int(memory.header[_LATEST])
+            if seq == 0:
+                return None
+            slot = seq % self.slots
+            timestamp = float(memory.times[slot])
+            if int(memory.seqs[slot]) != seq:
+                continue  # The producer lapped us while reading, try again
+            if max_age is not None and time.monotonic() - timestamp > max_age:
+                return None
+            return Frame(seq, timestamp, slot, memory.frames[slot])
+        return None
+
+    def valid(self, frame):
+        """
+        Check that a frame has not been overwritten since it was read.
+
+        Args:
+            frame (Frame): Frame returned by latest() or wait_newer()
+
+        Returns:
+            bool: True if the frame's slot still holds it
+        """
+        return int(self._memory.seqs[frame.slot]) == frame.seq
+
+    def wait_newer(self, seq, timeout=None, poll=0.002):
+        """
+        Wait for a frame newer than a sequence number.
+
+        Args:
+            seq (int): Sequence number already seen (0 for any frame)
+            timeout (float, optional): Maximum wait in seconds
+            poll (float): Polling interval in seconds
+
+        Returns:
+            Frame: The newer frame, or None on timeout
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            frame = self.latest()
+            if frame is not None and frame.seq > seq:
+                return frame
+            if deadline is not None and time.monotonic() >= deadline:
+                return None
+            time.sleep(poll)
+
+    def view(self, frame, region):
+        """
+        Cut a region out of a bus frame.
+
+        Args:
+            frame (Frame): Frame from this bus
+            region (tuple): (left, top, width, height) in screen pixels
+
+        Returns:
+            numpy.ndarray: BGRA view of the region, or None if it is not inside the bus region
+        """
+        x = region[0] - self.region[0]
+        y = region[1] - self.region[1]
+        if x < 0 or y < 0 or x + region[2] > self.region[2] or y + region[3] > self.region[3]:
+            return None
+        return frame.image[y:y + region[3], x:x + region[2]]
+
+    def close(self):
+        """Detach from the bus. The producer keeps running."""
+        if self._memory is not None:
+            self._memory.close()
+            self._memory = None
+
+class FrameBusSession:
+    """
+    CaptureSession that reads regions inside a frame bus from shared memory.
+
+    Regions outside the bus, or a bus whose frames are older than
+    MAX_FRAME_AGE (e.g. a stopped producer), are captured directly.
+    Bus regions are copied into a buffer per region, like CaptureSession,
+    so a returned frame stays valid until the next grab of the same region
+    however fast the bus wraps around.
+    """
+
+    def __init__(self, bus, max_age=MAX_FRAME_AGE):
+        """
+        Args:
+            bus (FrameBus): Attached bus
+            max_age (float): Oldest bus frame served, in seconds
+        """
+        self.bus = bus
+        self.max_age = max_age
+        self._direct = None
+        self._buffers = {}
+
+    def _direct_session(self):
+        """Session for regions the bus cannot serve."""
+        if self._direct is None:
+            self._direct = CaptureSession()
+        return self._direct
+
+    def buffer(self, region):
+        """
+        Get the reused BGRA buffer for a region, see CaptureSession.buffer().
+
+        Args:
+            region (tuple): (left, top, width, height)
+
+        Returns:
+            numpy.ndarray: Buffer of shape (height, width, 4)
+        """
+        region = tuple(region)
+        buf = self._buffers.get(region)
+        if buf is None:
+            buf = self._buffers[region] = np.empty((region[3], region[2], 4), dtype=np.uint8)
+        return buf
+
+    def grab(self, region=None, out=None):
+        """
+        Copy a region of the latest bus frame, capturing it directly if needed.
+
+        The frame's sequence number is checked again after the copy. If the
+        producer overwrote the slot meanwhile, the copy is redone from the new
+        latest frame.
+
+        Args:
+            region (tuple, optional): (left, top, width, height), full screen if omitted
+            out (numpy.ndarray, optional): Caller-owned (height, width, 4) buffer to
+                fill instead of the session buffer
+
+        Returns:
+            numpy.ndarray: The filled BGRA buffer
+        """
+        if region is None:
+            region = full_screen_region()
+        for _ in range(self.bus.slots):
+            frame = self.bus.latest(self.max_age)
+            image = None if frame is None else self.bus.view(frame, region)
+            if image is None:
+                break
+            buf = out if out is not None else self.buffer(region)
+            np.copyto(buf, image)
+            if self.bus.valid(frame):
+                return buf
+        return self._direct_session().grab(region, out)
+
+    def grab_bgr(self, region=None):
+        """Non-contiguous BGR view of grab(), see CaptureSession.grab_bgr()."""
+        return self.grab(region)[..., :3]
+
+    def release(self, region=None):
+        """Free capture buffers, see CaptureSession.release()."""
+        if region is None:
+            self._buffers.clear()
+        else:
+            self._buffers.pop(tuple(region), None)
+        if self._direct is not None:
+            self._direct.release(region)
+
+def capture_session(name=DEFAULT_BUS_NAME):
+    """
+    Get a capture session that uses the frame bus when one is running.
+
+    Args:
+        name (str): Shared memory name of the bus
+
+    Returns:
+        FrameBusSession or CaptureSession: Session with the CaptureSession interface
+    """
+    try:
+        return FrameBusSession(FrameBus(name))
+    except (FileNotFoundError, RuntimeError, TypeError, ValueError, OSError):
+        return CaptureSession()
+
+# For testing
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Shared memory frame bus producer")
+    parser.add_argument("--full", action="store_true", help="Publish the whole client window "
+                                                            "instead of its bottom right quadrant")
+    parser.add_argument("--rate", type=float, default=DEFAULT_RATE, help="Frames per second")
+    parser.add_argument("--slots", type=int, default=DEFAULT_SLOTS, help="Frames kept in the ring")
+    parser.add_argument("--name", default=DEFAULT_BUS_NAME, help="Shared memory name")
+    args = parser.parse_args()
+
+    print("Shared Memory Frame Bus")
+    print("-----------------------")
+    region = client_region() if args.full else client_quadrant()
+    producer = FrameBusProducer(region, args.name, args.slots, args.rate)
+    producer.start()
+    print(f"Publishing {region} as {args.name} (pid {os.getpid()}). Press Ctrl+C to stop.")
+    try:
+        while True:
+            time.sleep(5)
+            print(f"Frames published: {producer.seq}")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        producer.stop()
@@ -0,0 +1,504 @@
+"""
+Slot Content Index
+
+This module identifies what the inventory and bank slots hold, so scripts
+can ask which slots contain an item instead of assuming fixed slots (the
+absorption potions in nightmare-zone.py, bank_slot(8) in smith.py).
+
+Every slot is reduced to a 64-bit perceptual hash (dHash: the brightness
+gradient of an 8x9 thumbnail). Icons are learned once by name from a slot
+that holds them, and slot hashes are looked up by Hamming distance, so small
+differences (a stack count, a highlight) still match.
+
+Files (under config/):
+- icons.json: icon name -> list of learned hashes (hex)
+
+Key features:
+- find(): slots containing an item, e.g. find('absorption') -> [9, 10, 11]
+- contents(): the icon name of every slot, None for empty or unknown slots
+- BK-tree over all learned hashes for nearest-icon lookups
+- Inventory grid from the calibration, bank grid from grids.json (or its
+  default), both cached and following moves of the client window
+- Command line to learn and test icons:
+    python -m utils.vision.icons learn absorption 9
+    python -m utils.vision.icons learn gold_bar 8 --bank
+    python -m utils.vision.icons show --bank
+
+Performance considerations:
+- One capture of the grid region per query, one small area resize per slot
+  and a vectorized gradient comparison for all slots at once
+- find() compares the slot hashes with the item's hashes directly, a few
+  XORs and a popcount; contents() queries the BK-tree, which skips most of
+  the database for small distances
+- A full inventory takes well under a millisecond to hash once captured
+"""
+
+import os
+import json
+import logging
+import argparse
+import threading
+
+import numpy as np
+import cv2
+
+from .frame_bus import capture_session
+from ..calibration.config import inventory_region, grid_region
+
+# Set up logging
+logging.basicConfig(level=logging.INFO,
+                    format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Get the project root directory
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '../..'))
+ICON_DB_FILE = os.path.join(project_root, 'config', 'icons.json')
+
+# Hash settings
+ICON_FRACTION = 0.8        # Hashed square relative to the smaller slot spacing
+MAX_DISTANCE = 10          # Largest Hamming distance (of 64 bits) still counted as a match
+FLAT_STD = 4.0             # Slots with less brightness spread are empty
+
+GRIDS = ('inventory', 'bank')
+INVENTORY_COLUMNS = 4
+INVENTORY_ROWS = 7
+
+def grid_geometry(grid):
+    """
+    Get the slot grid configuration of a grid name.
+
+    The grids come from the cached loaders the scripts click with, so they
+    are read from disk once and follow moves of the client window.
+
+    Args:
+        grid (str): 'inventory' or 'bank'
+
+    Returns:
+        tuple: (grid config, (left, top, width, height) region, columns, rows),
+            or None if the grid is not calibrated
+    """
+    # Imported here, item_slots imports this module
+    from ..item_slots import load_inventory_config_cached
+    from ..ui_lookup import load_grid_config_cached
+
+    if grid == 'inventory':
+        config = load_inventory_config_cached()
+        if config is not None:
+            return config, inventory_region(config), INVENTORY_COLUMNS, INVENTORY_ROWS
+    elif grid == 'bank':
+        config = load_grid_config_cached('bank')
+        if config is not None:
+            return config, grid_region(config), config['columns'], config['rows']
+    else:
+        raise ValueError(f"Unknown grid: {grid}. Use one of {GRIDS}.")
+    logger.error(f"The {grid} grid is not calibrated")
+    return None
+
+def icon_boxes(config, region, columns, rows):
+    """
+    Get the hashed square of every slot inside a region capture.
+
+    Args:
+        config (dict): Grid configuration
+        region (tuple): (left, top, width, height) of the capture
+        columns (int): Grid columns
+        rows (int): Grid rows
+
+    Returns:
+        numpy.ndarray: (4, columns * rows) array of x0, y0, x1, y1 (exclusive), clipped to the region
+    """
+    side = max(9, int(min(config['x_spacing'], config['y_spacing']) * ICON_FRACTION))
+    cols, rows = np.meshgrid(np.arange(columns), np.arange(rows))
+    x0 = np.rint(config['base_x'] + cols.ravel() * config['x_spacing'] - region[0]) - side // 2
+    y0 = np.rint(config['base_y'] + rows.ravel() * config['y_spacing'] - region[1]) - side // 2
+
+    boxes = np.stack([x0, y0, x0 + side, y0 + side])
+    boxes[0::2] = np.clip(boxes[0::2], 0, region[2])
+    boxes[1::2] = np.clip(boxes[1::2], 0, region[3])
+    return boxes.astype(np.intp)
+
+def slot_hashes(frame, boxes):
+    """
+    Perceptual hash of every slot.
+
+    Args:
+        frame (numpy.ndarray): BGR or BGRA capture of the grid region
+        boxes (numpy.ndarray): Boxes from icon_boxes()
+
+    Returns:
+        tuple: ((n,) uint64 hashes, (n,) booleans True for empty slots)
+    """
+    code = cv2.COLOR_BGRA2GRAY if frame.shape[2] == 4 else cv2.COLOR_BGR2GRAY
+    gray = cv2.cvtColor(frame, code)
+    thumbnails = np.zeros((boxes.shape[1], 8, 9), np.int16)
+    for i, (x0, y0, x1, y1) in enumerate(boxes.T):
+        if x1 > x0 and y1 > y0:
+            thumbnails[i] = cv2.resize(gray[y0:y1, x0:x1], (9, 8), interpolation=cv2.INTER_AREA)
+
+    bits = (thumbnails[:, :, 1:] > thumbnails[:, :, :-1]).reshape(len(thumbnails), 64)
+    hashes = np.packbits(bits, axis=1).view('>u8').ravel().astype(np.uint64)
+    empty = thumbnails.reshape(len(thumbnails), -1).std(axis=1) < FLAT_STD
+    return hashes, empty
+
+def hamming(a, b):
+    """
+    Hamming distances between 64-bit hashes, broadcast like a ^ b.
+
+    Returns:
+        numpy.ndarray: Number of differing bits
+    """
+    diff = np.atleast_1d(np.bitwise_xor(np.asarray(a, np.uint64), np.asarray(b, np.uint64)))
+    bits = np.unpackbits(diff.reshape(-1, 1).view(np.uint8), axis=1)
+    return bits.sum(axis=1).reshape(diff.shape)
+
+class BKTree:
+    """
+    Burkhard-Keller tree over 64-bit hashes with the Hamming distance.
+
+    Each node keeps its children by their distance to it, so a search for
+    hashes within d of a query only visits children whose distance lies
+    within d of the query's distance to the node.
+    """
+
+    def __init__(self):
+        self.root = None  # [hash, items, {distance: child}]
+        self.size = 0
+
+    def add(self, value, item):
+        """
+        Add an item under a hash.
+
+        Args:
+            value (int): 64-bit hash
+            item: Item returned by search()
+        """
+        value = int(value)
+        self.size += 1
+        if self.root is None:
+            self.root = [value, [item], {}]
+            return
+        node = self.root
+        while True:
+            distance = (value ^ node[0]).bit_count()
+            if distance == 0:
+                node[1].append(item)
+                return
+            child = node[2].get(distance)
+            if child is None:
+                node[2][distance] = [value, [item], {}]
+                return
+            node = child
+
+    def search(self, value, max_distance):
+        """
+        Find every item within a Hamming distance of a hash.
+
+        Args:
+            value (int): 64-bit hash
+            max_distance (int): Largest distance returned
+
+        Returns:
+            list: (distance, item) pairs, nearest first
+        """
+        if self.root is None:
+            return []
+        value = int(value)
+        found = []
+        pending = [self.root]
+        while pending:
+            node = pending.pop()
+            distance = (value ^ node[0]).bit_count()
+            if distance <= max_distance:
+                found.extend((distance, item) for item in node[1])
+            for child_distance, child in node[2].items():
+                if abs(child_distance - distance) <= max_distance:
+                    pending.append(child)
+        found.sort(key=lambda pair: pair[0])
+        return found
+
+class IconIndex:
+    """
+    Learned icons and slot lookups.
+
+    Example:
+        index = IconIndex()
+        slots = index.find('absorption')            # e.g. [9, 10, 11]
+        names = index.contents('bank')              # one name or None per bank slot
+    """
+
+    def __init__(self, db_file=ICON_DB_FILE, session=None):
+        """
+        Args:
+            db_file (str): Icon database file
+            session (CaptureSession, optional): Session used for captures
+        """
+        self.db_file = db_file
+        self._session = session
+        self._lock = threading.Lock()
+        self._boxes = {}
+        self.icons = self._load_db()
+        self._build_tree()
+
+    # Database
+
+    def _load_db(self):
+        """Read the icon database as name -> (k,) uint64 hashes."""
+        try:
+            if os.path.exists(self.db_file):
+                with open(self.db_file, 'r') as f:
+                    data = json.load(f)
+                return {name: np.array([int(h, 16) for h in hashes], dtype=np.uint64)
+                        for name, hashes in data.items()}
+        except Exception as e:
+            logger.error(f"Error loading icon database from {self.db_file}: {e}")
+        return {}
+
+    def _save_db(self):
+        """Write the icon database."""
+        data = {name: [f"{int(h):016x}" for h in hashes] for name, hashes in self.icons.items()}
+        try:
+            os.makedirs(os.path.dirname(self.db_file), exist_ok=True)
+            with open(self.db_file, 'w') as f:
+                json.dump(data, f, indent=4)
+            return True
+        except Exception as e:
+            logger.error(f"Error saving icon database: {e}")
+            return False
+
+    def _build_tree(self):
+        """Index every learned hash."""
+        self.tree = BKTree()
+        for name, hashes in self.icons.items():
+            for value in hashes:
+                self.tree.add(value, name)
+
+    def names(self):
+        """
+        List the learned icons.
+
+        Returns:
+            list: Icon names
+        """
+        return sorted(self.icons)
+
+    def add(self, name, value):
+        """
+        Learn a hash for an icon.
+
+        Args:
+            name (str): Icon name
+            value (int): 64-bit hash of a slot holding the icon
+
+        Returns:
+            bool: True if the database was saved
+        """
+        with self._lock:
+            hashes = self.icons.get(name, np.zeros(0, np.uint64))
+            if np.any(hashes == np.uint64(value)):
+                return True
+            self.icons[name] = np.append(hashes, np.uint64(value))
+            self.tree.add(value, name)
+            return self._save_db()
+
+    def forget(self, name):
+        """
+        Remove an icon and all its hashes.
+
+        Returns:
+            bool: True if the database was saved or had no such icon
+        """
+        with self._lock:
+            if self.icons.pop(name, None) is None:
+                return True
+            self._build_tree()
+            return self._save_db()
+
+    # Slots
+
+    def hashes(self, grid='inventory', frame=None):
+        """
+        Hash every slot of a grid.
+
+        Args:
+            grid (str): 'inventory' or 'bank'
+            frame (numpy.ndarray, optional): Capture of the grid region,
+                captured if omitted
+
+        Returns:
+            tuple: ((n,) uint64 hashes, (n,) booleans True for empty slots), slot order,
+                or None if the grid is not calibrated
+        """
+        geometry = grid_geometry(grid)
+        if geometry is None:
+            return None
+        config, region, columns, rows = geometry
+        key = (grid, region, config['x_spacing'], config['y_spacing'])
+        boxes = self._boxes.get(key)
+        if boxes is None:
+            boxes = icon_boxes(config, region, columns, rows)
+            self._boxes[key] = boxes
+        if frame is None:
+            if self._session is None:
+                self._session = capture_session()
+            frame = self._session.grab(region)
+        return slot_hashes(frame, boxes)
+
+    def identify(self, value, max_distance=MAX_DISTANCE):
+        """
+        Name the icon nearest to a hash.
+
+        Args:
+            value (int): 64-bit slot hash
+            max_distance (int): Largest Hamming distance accepted
+
+        Returns:
+            tuple: (name, distance), or (None, None) if nothing is close enough
+        """
+        found = self.tree.search(value, max_distance)
+        return found[0][::-1] if found else (None, None)
+
+    def contents(self, grid='inventory', frame=None, max_distance=MAX_DISTANCE):
+        """
+        Name the icon in every slot of a grid.
+
+        Args:
+            grid (str): 'inventory' or 'bank'
+            frame (numpy.ndarray, optional): Capture of the grid region
+            max_distance (int): Largest Hamming distance accepted
+
+        Returns:
+            list: Icon name per slot in slot order, None for empty or unknown slots,
+                empty if the grid is not calibrated
+        """
+        slots = self.hashes(grid, frame)
+        if slots is None:
+            return []
+        hashes, empty = slots
+        return [None if is_empty else self.identify(value, max_distance)[0]
+                for value, is_empty in zip(hashes, empty)]
+
+    def find(self, name, grid='inventory', frame=None, max_distance=MAX_DISTANCE):
+        """
+        Find the slots holding an icon.
+
+        Args:
+            name (str): Learned icon name
+            grid (str): 'inventory' or 'bank'
+            frame (numpy.ndarray, optional): Capture of the grid region
+            max_distance (int): Largest Hamming distance accepted
+
+        Returns:
+            list: 1-based slot numbers, empty if the icon is unknown or absent
+                or the grid is not calibrated
+        """
+        learned = self.icons.get(name)
+        if learned is None or learned.size == 0:
+            return []
+        slots = self.hashes(grid, frame)
+        if slots is None:
+            return []
+        hashes, empty = slots
+        distances = hamming(hashes[:, None], learned[None, :]).min(axis=1)
+        return [int(i) + 1 for i in np.flatnonzero((distances <= max_distance) & ~empty)]
+
+    def learn(self, name, slot, grid='inventory', frame=None):
+        """
+        Learn an icon from a slot that currently holds it.
+
+        Args:
+            name (str): Icon name
+            slot (int): 1-based slot number
+            grid (str): 'inventory' or 'bank'
+            frame (numpy.ndarray, optional): Capture of the grid region
+
+        Returns:
+            bool: True if learned and saved
+        """
+        slots = self.hashes(grid, frame)
+        if slots is None:
+            return False
+        hashes, empty = slots
+        if not 1 <= slot <= len(hashes):
+            logger.error(f"Slot {slot} is outside the {grid} grid (1-{len(hashes)})")
+            return False
+        if empty[slot - 1]:
+            logger.error(f"{grid.capitalize()} slot {slot} looks empty, nothing to learn")
+            return False
+        logger.info(f"Learned {name} from {grid} slot {slot}")
+        return self.add(name, hashes[slot - 1])
+
+_index = None
+_index_lock = threading.Lock()
+
+def get_icon_index():
+    """
+    Get the shared icon index.
+
+    Returns:
+        IconIndex: Index using config/icons.json
+    """
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = IconIndex()
+        return _index
+
+def find_item(name, grid='inventory', frame=None):
+    """
+    Find the slots holding a learned icon.
+
+    Unlearned icons cost nothing beyond a dict lookup, so scripts can ask for
+    an item and keep their fixed slot when it has not been learned.
+
+    Args:
+        name (str): Icon name
+        grid (str): 'inventory' or 'bank'
+        frame (numpy.ndarray, optional): Capture of the grid region
+
+    Returns:
+        list: 1-based slot numbers, empty if unknown or absent
+    """
+    return get_icon_index().find(name, grid, frame)
+
+def main():
+    """Command line for learning and testing icons."""
+    parser = argparse.ArgumentParser(description="Slot content index")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    learn = commands.add_parser("learn", help="Learn an icon from a slot")
+    learn.add_argument("name")
+    learn.add_argument("slot", type=int, help="1-based slot number")
+    learn.add_argument("--bank", action="store_true", help="Slot of the bank grid")
+
+    find = commands.add_parser("find", help="List the slots holding an icon")
+    find.add_argument("name")
+    find.add_argument("--bank", action="store_true", help="Search the bank grid")
+
+    show = commands.add_parser("show", help="Name the contents of every slot")
+    show.add_argument("--bank", action="store_true", help="Show the bank grid")
+
+    commands.add_parser("forget", help="Remove an icon").add_argument("name")
+
+    args = parser.parse_args()
+    index = get_icon_index()
+    grid = 'bank' if getattr(args, 'bank', False) else 'inventory'
+
+    if args.command == "learn":
+        if not index.learn(args.name, args.slot, grid):
+            raise SystemExit(1)
+    elif args.command == "find":
+        print(f"{args.name}: {index.find(args.name, grid)}")
+    elif args.command == "forget":
+        index.forget(args.name)
+    else:
+        geometry = grid_geometry(grid)
+        if geometry is None:
+            raise SystemExit(1)
+        columns = geometry[2]
+        names = index.contents(grid)
+        for row in range(0, len(names), columns):
+            print(" | ".join(f"{name or '-':<14}" for name in names[row:row + columns]))
+
+# For testing
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,367 @@
+"""
+Right-click Menu Geometry
+
+This module finds the entries of the right-click menu on screen, so scripts
+can click "entry N" instead of a fixed offset below the cursor. Fixed offsets
+break whenever the entry count, the font size or the clamping of the menu at
+the screen edge changes.
+
+After right_click() a small region around the cursor is captured. The menu
+body is the connected area of the menu background colour under the cursor,
+and the entry rows are found from the horizontal projection of the text
+pixels inside it: every entry is one run of rows holding text, so the body
+height divided by the number of runs is the row height.
+
+The row height and the position of the menu body relative to the cursor are
+cached per display profile (see calibration/profiles.py). Later menus only
+need a check at the cached position: the row just above the cached body top
+must be the header or border, and every entry row from the top down to the
+requested entry must be menu background. A menu clamped at the screen edge
+moves its top edge and a menu with fewer entries ends above the entry, so
+both fail the check and the full detection runs again.
+
+Files (under config/):
+- menus.json: profile name -> row height and body offset
+
+Key features:
+- entry_box(): click box (x1, x2, y1, y2) of entry N of the open menu
+- detect_menu(): menu body and entry rows in a capture
+- Command line to test the detection (right-click something first):
+    python -m utils.vision.menus 5
+
+Performance considerations:
+- The full detection captures at most MENU_SEARCH_SIZE around the cursor
+  and runs one inRange, one connected component pass and one row sum
+- With a cached geometry a lookup captures one narrow strip from the top
+  edge of the body to the requested entry
+"""
+
+import os
+import time
+import logging
+import argparse
+import threading
+
+import numpy as np
+import cv2
+
+try:
+    import pyautogui
+except Exception:  # pyautogui raises on import when no display is available
+    pyautogui = None
+
+from .frame_bus import capture_session
+from .window import client_region
+from ..calibration.config import CONFIG_DIR, load_config, save_config
+
+# Set up logging
+logging.basicConfig(level=logging.INFO,
+                    format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+MENUS_FILE = os.path.join(CONFIG_DIR, 'menus.json')
+DEFAULT_PROFILE_NAME = 'default'
+
+# Menu background colour (BGR) and the largest per-channel difference still counted as background
+MENU_BACKGROUND = (71, 84, 93)
+BACKGROUND_TOLERANCE = 10
+
+# Detection settings
+MENU_SEARCH_SIZE = (400, 420)  # Width and height of the region searched around the cursor
+MENU_SEARCH_ABOVE = 30         # Pixels above the cursor included in the search
+MIN_MENU_WIDTH = 40            # Smallest menu body width in pixels
+ROW_HEIGHT_RANGE = (8, 40)     # Plausible entry row height in pixels
+TEXT_GAP = 2                   # Blank rows inside one line of text (dots, accents)
+
+# Existence check and click box settings
+CHECK_HALF_WIDTH = 20          # Half width of the checked strip and of cached click boxes
+MIN_BACKGROUND_FRACTION = 0.3  # Share of background pixels in an entry row of an open menu
+CLICK_MARGIN = 0.3             # Fraction of the row height kept clear above and below the click box
+MENU_TIMEOUT = 0.4             # Seconds to wait for the menu to appear
+POLL_INTERVAL = 0.02
+
+def background_mask(frame):
+    """
+    Mask of the menu background colour.
+
+    Args:
+        frame (numpy.ndarray): BGR or BGRA capture
+
+    Returns:
+        numpy.ndarray: uint8 mask, 255 where the colour is menu background
+    """
+    low = np.array([max(0, c - BACKGROUND_TOLERANCE) for c in MENU_BACKGROUND], np.uint8)
+    high = np.array([min(255, c + BACKGROUND_TOLERANCE) for c in MENU_BACKGROUND], np.uint8)
+    return cv2.inRange(np.ascontiguousarray(frame[..., :3]), low, high)
+
+def text_runs(body_mask):
+    """
+    Find the rows holding text inside a menu body.
+
+    Args:
+        body_mask (numpy.ndarray): Background mask of the menu body only
+
+    Returns:
+        list: (first row, last row + 1) of every line of text, top to bottom
+    """
+    # Skip the border columns, count non-background pixels per row
+    profile = (body_mask[:, 1:-1] == 0).sum(axis=1)
+    rows = np.flatnonzero(profile > 0)
+    if rows.size == 0:
+        return []
+    breaks = np.flatnonzero(np.diff(rows) > TEXT_GAP + 1)
+    starts = np.concatenate([[rows[0]], rows[breaks + 1]])
+    ends = np.concatenate([rows[breaks], [rows[-1]]]) + 1
+    return list(zip(starts.tolist(), ends.tolist()))
+
+def detect_menu(frame, cursor):
+    """
+    Find the menu body and its entry rows in a capture.
+
+    Args:
+        frame (numpy.ndarray): BGR or BGRA capture around the cursor
+        cursor (tuple): (x, y) of the cursor inside the capture
+
+    Returns:
+        dict: 'body' (left, top, width, height) in capture pixels, 'entries'
+            (number of rows) and 'row_height', or None if no menu was found
+    """
+    mask = background_mask(frame)
+    count, labels, stats, _ = cv2.connectedComponentsWithStats(mask, connectivity=4)
+    if count < 2:
+        return None
+
+    left, top = stats[1:, cv2.CC_STAT_LEFT], stats[1:, cv2.CC_STAT_TOP]
+    width, height = stats[1:, cv2.CC_STAT_WIDTH], stats[1:, cv2.CC_STAT_HEIGHT]
+    # The body spans the cursor column and starts just below the header the cursor is in
+    candidates = ((left <= cursor[0]) & (left + width > cursor[0]) & (width >= MIN_MENU_WIDTH)
+                  & (top >= cursor[1] - MENU_SEARCH_ABOVE) & (top <= cursor[1] + ROW_HEIGHT_RANGE[1])
+                  & (height >= ROW_HEIGHT_RANGE[0]))
+    if not candidates.any():
+        return None
+    index = int(np.argmax(np.where(candidates, stats[1:, cv2.CC_STAT_AREA], -1)))
+    body = tuple(int(v) for v in (left[index], top[index], width[index], height[index]))
+
+    x, y, w, h = body
+    runs = text_runs(mask[y:y + h, x:x + w])
+    if not runs:
+        return None
+    row_height = h / len(runs)
+    if not ROW_HEIGHT_RANGE[0] <= row_height <= ROW_HEIGHT_RANGE[1]:
+        logger.debug(f"Implausible menu row height {row_height:.1f}")
+        return None
+    return {'body': body, 'entries': len(runs), 'row_height': row_height}
+
+class MenuReader:
+    """
+    Entry geometry of the right-click menu with a per-profile cache.
+
+    Example:
+        right_click()
+        box = MenuReader().entry_box(5)   # (x1, x2, y1, y2) or None
+        if box:
+            bezier_between(*box)
+    """
+
+    def __init__(self, menus_file=MENUS_FILE, session=None):
+        """
+        Args:
+            menus_file (str): Geometry cache file
+            session (CaptureSession, optional): Session used for captures
+        """
+        self.menus_file = menus_file
+        self._session = session
+        self._lock = threading.Lock()
+        self._profile = None
+        self.cache = load_config(menus_file)
+
+    def _grab(self, region):
+        """Capture a region through the reader's session."""
+        if self._session is None:
+            self._session = capture_session()
+        return self._session.grab(region)
+
+    def profile(self):
+        """Name of the display profile the geometry is cached under."""
+        if self._profile is None:
+            # Imported here, profiles loads the calibration package
+            from ..calibration.profiles import current_profile_key, key_to_string
+            key = current_profile_key()
+            self._profile = key_to_string(key) if key is not None else DEFAULT_PROFILE_NAME
+        return self._profile
+
+    def _search_region(self, cursor):
+        """Region around the cursor searched by the full detection, clipped to the client."""
+        bounds = client_region()
+        width, height = MENU_SEARCH_SIZE
+        left = max(bounds[0], cursor[0] - width // 2)
+        top = max(bounds[1], cursor[1] - MENU_SEARCH_ABOVE)
+        right = min(bounds[0] + bounds[2], left + width)
+        bottom = min(bounds[1] + bounds[3], top + height)
+        return left, top, right - left, bottom - top
+
+    def detect(self, cursor):
+        """
+        Run the full detection around the cursor and cache the geometry.
+
+        Args:
+            cursor (tuple): (x, y) screen position of the cursor
+
+        Returns:
+            dict: Result of detect_menu() with the body in screen coordinates,
+                or None if no menu was found
+        """
+        region = self._search_region(cursor)
+        if region[2] <= 0 or region[3] <= 0:
+            return None
+        menu = detect_menu(self._grab(region), (cursor[0] - region[0], cursor[1] - region[1]))
+        if menu is None:
+            return None
+
+        x, y, w, h = menu['body']
+        menu['body'] = (x + region[0], y + region[1], w, h)
+        geometry = {'row_height': round(menu['row_height'], 3),
+                    'top_offset': menu['body'][1] - cursor[1]}
+        with self._lock:
+            if self.cache.get(self.profile()) != geometry:
+                self.cache[self.profile()] = geometry
+                save_config(self.cache, self.menus_file)
+        return menu
+
+    def check(self, entry, cursor):
+        """
+        Check that the open menu matches the cached geometry down to an entry.
+
+        The row above the cached body top must not be menu background (it is
+        the header or the border), and each entry row from the first to the
+        requested one must be. A moved top edge or a body ending above the
+        entry fails the check.
+
+        Args:
+            entry (int): 1-based entry number
+            cursor (tuple): (x, y) screen position of the cursor
+
+        Returns:
+            tuple: (top, row height) of the entry on screen, or None if there
+                is no cached geometry or the menu does not match it
+        """
+        geometry = self.cache.get(self.profile())
+        if geometry is None or entry < 1:
+            return None
+        row_height = geometry['row_height']
+        body_top = cursor[1] + geometry['top_offset']
+        bottom = int(round(entry * row_height))
+        region = (cursor[0] - CHECK_HALF_WIDTH, body_top - 1, 2 * CHECK_HALF_WIDTH, bottom + 1)
+        background = np.count_nonzero(background_mask(self._grab(region)), axis=1) / region[2]
+
+        # Row 0 is the edge above the body, the entry rows follow
+        if background[0] >= MIN_BACKGROUND_FRACTION:
+            return None
+        bounds = np.rint(np.arange(entry + 1) * row_height).astype(int) + 1
+        for start, end in zip(bounds[:-1], bounds[1:]):
+            if background[start:max(end, start + 1)].mean() < MIN_BACKGROUND_FRACTION:
+                return None
+        return body_top + (entry - 1) * row_height, row_height
+
+    def entry_box(self, entry, cursor=None, timeout=MENU_TIMEOUT):
+        """
+        Get the click box of a menu entry.
+
+        Args:
+            entry (int): 1-based entry number, the header does not count
+            cursor (tuple, optional): (x, y) screen position the menu was
+                opened at, defaults to the current mouse position
+            timeout (float): Seconds to wait for the menu to appear
+
+        Returns:
+            tuple: (x1, x2, y1, y2) on the screen, or None if the menu or the
+                entry was not found
+        """
+        if cursor is None:
+            if pyautogui is None:
+                return None
+            cursor = tuple(pyautogui.position())
+
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                found = self.check(entry, cursor)
+                if found is not None:
+                    top, row_height = found
+                    x1, x2 = cursor[0] - CHECK_HALF_WIDTH, cursor[0] + CHECK_HALF_WIDTH
+                    return self._box(x1, x2, top, row_height)
+
+                menu = self.detect(cursor)
+            except Exception as e:
+                logger.warning(f"Menu detection unavailable: {e}")
+                return None
+            if menu is not None:
+                if entry > menu['entries']:
+                    logger.warning(f"Menu has {menu['entries']} entries, no entry {entry}")
+                    return None
+                left, top, width, _ = menu['body']
+                row_height = menu['row_height']
+                return self._box(left + 4, left + width - 4, top + (entry - 1) * row_height, row_height)
+            if time.monotonic() >= deadline:
+                return None
+            time.sleep(POLL_INTERVAL)
+
+    @staticmethod
+    def _box(x1, x2, top, row_height):
+        """Click box inside an entry row, clear of the rows above and below."""
+        margin = row_height * CLICK_MARGIN
+        return (int(x1), int(x2), int(round(top + margin)), int(round(top + row_height - margin)))
+
+_reader = None
+_reader_lock = threading.Lock()
+
+def get_menu_reader():
+    """
+    Get the shared menu reader.
+
+    Returns:
+        MenuReader: Reader using config/menus.json
+    """
+    global _reader
+    with _reader_lock:
+        if _reader is None:
+            _reader = MenuReader()
+        return _reader
+
+def entry_box(entry, cursor=None):
+    """
+    Get the click box of an entry of the open right-click menu.
+
+    Args:
+        entry (int): 1-based entry number, the header does not count
+        cursor (tuple, optional): (x, y) the menu was opened at, defaults to
+            the current mouse position
+
+    Returns:
+        tuple: (x1, x2, y1, y2) on the screen, or None if not found
+    """
+    return get_menu_reader().entry_box(entry, cursor)
+
+def main():
+    """Detect the open menu under the cursor."""
+    parser = argparse.ArgumentParser(description="Right-click menu geometry")
+    parser.add_argument("entry", type=int, nargs="?", default=1, help="1-based entry number")
+    parser.add_argument("--delay", type=float, default=3, help="Seconds to open a menu first")
+    args = parser.parse_args()
+
+    print(f"Right-click something within {args.delay:g} seconds...")
+    time.sleep(args.delay)
+    reader = get_menu_reader()
+    cursor = tuple(pyautogui.position())
+    start = time.perf_counter()
+    menu = reader.detect(cursor)
+    elapsed = (time.perf_counter() - start) * 1000
+    print(f"Menu: {menu} ({elapsed:.2f} ms)")
+    start = time.perf_counter()
+    box = reader.entry_box(args.entry, cursor)
+    elapsed = (time.perf_counter() - start) * 1000
+    print(f"Entry {args.entry}: {box} ({elapsed:.2f} ms with the cached geometry)")
+
+# For testing
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,424 @@
+"""
+Pixel Probes
+
+This module reads a handful of pixels or small boxes for status checks, so a
+walker that needs "is the run orb green" or "is the prayer icon lit" does
+not capture a frame. All probes of a call are read with a single capture of
+their bounding box and returned as one array.
+
+Named probe sets keep the positions and the colours they had when recorded,
+with positions relative to the client window (see window.py), so a moved
+client does not invalidate them.
+
+Files (under config/):
+- probes.json: probe set name -> boxes, recorded colours and tolerance
+
+Key features:
+- probe(): mean BGR colour of points (x, y) and boxes (left, top, width,
+  height) in screen coordinates, as an (n, 3) float32 array
+- ProbeSet: a precompiled set, read() and matches() without re-parsing
+- check_probes(): whether a named set still shows its recorded colours,
+  None when the set was never recorded, so scripts can keep a fallback
+- wait_for_probes(): poll a named set until it matches
+- Command line to record and test sets:
+    python -m utils.vision.probes record run_on 1785,160 1790,150,4,4
+    python -m utils.vision.probes show run_on --watch
+
+Performance considerations:
+- One grab of the bounding box per read: a single XGetImage through mss, or
+  a view into shared memory while the frame bus runs. Keep the probes of a
+  set close together, the capture grows with the box around them
+- Points are gathered with one fancy index, boxes are averaged from an
+  integral image with four lookups each, about 0.06 ms for a few probes
+  once captured
+- The bounding box and index arrays are computed once per set and shifted
+  with the client window
+"""
+
+import os
+import time
+import logging
+import argparse
+import threading
+
+import numpy as np
+import cv2
+
+from .frame_bus import capture_session
+from .window import client_origin, to_client
+from ..calibration.config import CONFIG_DIR, load_config, save_config
+
+# Set up logging
+logging.basicConfig(level=logging.INFO,
+                    format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+PROBES_FILE = os.path.join(CONFIG_DIR, 'probes.json')
+
+# Probe settings
+DEFAULT_TOLERANCE = 20     # Largest per-channel difference from the recorded colour
+POLL_INTERVAL = 0.01       # Seconds between checks in wait_for_probes()
+
+def as_boxes(items):
+    """
+    Normalise probe items to boxes.
+
+    Args:
+        items (list): Points (x, y) and boxes (left, top, width, height)
+
+    Returns:
+        numpy.ndarray: (n, 4) int64 boxes, points as 1x1 boxes
+    """
+    boxes = []
+    for item in items:
+        if len(item) == 2:
+            boxes.append((item[0], item[1], 1, 1))
+        elif len(item) == 4 and item[2] > 0 and item[3] > 0:
+            boxes.append(tuple(item))
+        else:
+            raise ValueError(f"Invalid probe {item}: expected (x, y) or (left, top, width, height)")
+    return np.array(boxes, dtype=np.int64).reshape(-1, 4)
+
+class ProbeSet:
+    """
+    Precompiled probes read with one capture.
+
+    Example:
+        probes = ProbeSet([(1785, 160), (1790, 150, 4, 4)])
+        colours = probes.read()             # (2, 3) mean BGR
+    """
+
+    def __init__(self, items, colors=None, tolerance=DEFAULT_TOLERANCE, relative=False):
+        """
+        Args:
+            items (list): Points (x, y) and boxes (left, top, width, height)
+            colors (list, optional): Expected BGR colour per probe for matches()
+            tolerance (int): Largest per-channel difference in matches()
+            relative (bool): Positions are relative to the client window
+        """
+        self.boxes = as_boxes(items)
+        if len(self.boxes) == 0:
+            raise ValueError("A probe set needs at least one probe")
+        self.colors = None if colors is None else np.asarray(colors, dtype=np.float32)
+        self.tolerance = tolerance
+        self.relative = relative
+
+        left, top = self.boxes[:, :2].min(axis=0)
+        right, bottom = (self.boxes[:, :2] + self.boxes[:, 2:]).max(axis=0)
+        self.bbox = (int(left), int(top), int(right - left), int(bottom - top))
+
+        # Box corners inside the bounding box capture
+        x0 = self.boxes[:, 0] - left
+        y0 = self.boxes[:, 1] - top
+        self._points_only = bool((self.boxes[:, 2:] == 1).all())
+        self._x0, self._y0 = x0, y0
+        self._x1, self._y1 = x0 + self.boxes[:, 2], y0 + self.boxes[:, 3]
+        self._areas = (self.boxes[:, 2] * self.boxes[:, 3]).astype(np.float32)[:, None]
+
+    def region(self):
+        """
+        Get the screen region captured by read().
+
+        Returns:
+            tuple: (left, top, width, height)
+        """
+        if not self.relative:
+            return self.bbox
+        dx, dy = client_origin()
+        return self.bbox[0] + dx, self.bbox[1] + dy, self.bbox[2], self.bbox[3]
+
+    def values(self, frame):
+        """
+        Mean BGR colour of every probe in a capture of region().
+
+        Args:
+            frame (numpy.ndarray): BGR or BGRA capture of the bounding box
+
+        Returns:
+            numpy.ndarray: (n, 3) float32 mean colours in probe order
+        """
+        if self._points_only:
+            return frame[self._y0, self._x0, :3].astype(np.float32)
+        integral = cv2.integral(np.ascontiguousarray(frame[..., :3]), sdepth=cv2.CV_64F)
+        sums = (integral[self._y1, self._x1] - integral[self._y0, self._x1]
+                - integral[self._y1, self._x0] + integral[self._y0, self._x0])
+        return (sums / self._areas).astype(np.float32)
+
+    def read(self, session=None):
+        """
+        Capture the bounding box once and read every probe.
+
+        Args:
+            session (CaptureSession, optional): Session used for the capture
+
+        Returns:
+            numpy.ndarray: (n, 3) float32 mean BGR colours in probe order
+        """
+        session = session or capture_session()
+        return self.values(session.grab(self.region()))
+
+    def matches(self, values=None, session=None):
+        """
+        Compare the probes with their expected colours.
+
+        Args:
+            values (numpy.ndarray, optional): Result of read(), read if omitted
+            session (CaptureSession, optional): Session used for the capture
+
+        Returns:
+            numpy.ndarray: (n,) booleans, True where a probe is within tolerance
+        """
+        if self.colors is None:
+            raise ValueError("Probe set has no expected colours")
+        if values is None:
+            values = self.read(session)
+        return (np.abs(values - self.colors) <= self.tolerance).all(axis=1)
+
+class ProbeStore:
+    """
+    Named probe sets stored in config/probes.json.
+
+    Example:
+        store = ProbeStore()
+        store.record('run_on', [(1785, 160)])
+        if store.check('run_on'):
+            ...
+    """
+
+    def __init__(self, probes_file=PROBES_FILE, session=None):
+        """
+        Args:
+            probes_file (str): Probe set file
+            session (CaptureSession, optional): Session used for captures
+        """
+        self.probes_file = probes_file
+        self._session = session
+        self._lock = threading.Lock()
+        self._sets = {}
+        self.data = load_config(probes_file)
+
+    def _session_or_new(self):
+        """Capture session of the store, created on first use."""
+        if self._session is None:
+            self._session = capture_session()
+        return self._session
+
+    def names(self):
+        """
+        List the recorded probe sets.
+
+        Returns:
+            list: Set names
+        """
+        return sorted(self.data)
+
+    def get(self, name):
+        """
+        Get a recorded probe set.
+
+        Args:
+            name (str): Set name
+
+        Returns:
+            ProbeSet: The set, or None if it was never recorded
+        """
+        with self._lock:
+            probes = self._sets.get(name)
+            if probes is None and name in self.data:
+                entry = self.data[name]
+                probes = ProbeSet(entry['boxes'], entry['colors'],
+                                  entry.get('tolerance', DEFAULT_TOLERANCE), relative=True)
+                self._sets[name] = probes
+            return probes
+
+    def record(self, name, items, tolerance=DEFAULT_TOLERANCE):
+        """
+        Record probes at screen positions with the colours they show now.
+
+        Args:
+            name (str): Set name, e.g. 'run_on'
+            items (list): Points (x, y) and boxes (left, top, width, height) on the screen
+            tolerance (int): Largest per-channel difference still matching
+
+        Returns:
+            bool: True if saved
+        """
+        try:
+            boxes = as_boxes(items)
+            colors = ProbeSet(boxes).read(self._session_or_new())
+        except Exception as e:
+            logger.error(f"Error recording probe set {name}: {e}")
+            return False
+
+        relative = [[*to_client(int(left), int(top)), int(width), int(height)]
+                    for left, top, width, height in boxes]
+        with self._lock:
+            self.data[name] = {
+                'boxes': relative,
+                'colors': np.round(colors, 1).tolist(),
+                'tolerance': tolerance
+            }
+            self._sets.pop(name, None)
+        logger.info(f"Recorded probe set {name} with {len(relative)} probes")
+        return save_config(self.data, self.probes_file)
+
+    def forget(self, name):
+        """
+        Remove a probe set.
+
+        Returns:
+            bool: True if saved or the set did not exist
+        """
+        with self._lock:
+            if self.data.pop(name, None) is None:
+                return True
+            self._sets.pop(name, None)
+        return save_config(self.data, self.probes_file)
+
+    def read(self, name):
+        """
+        Read the probes of a set.
+
+        Returns:
+            numpy.ndarray: (n, 3) float32 mean BGR colours, or None if unknown
+        """
+        probes = self.get(name)
+        return None if probes is None else probes.read(self._session_or_new())
+
+    def check(self, name):
+        """
+        Whether every probe of a set shows its recorded colour.
+
+        Returns:
+            bool: True if all match, or None if the set was never recorded
+        """
+        probes = self.get(name)
+        if probes is None:
+            return None
+        return bool(probes.matches(session=self._session_or_new()).all())
+
+_store = None
+_store_lock = threading.Lock()
+
+def get_probe_store():
+    """
+    Get the shared probe set store.
+
+    Returns:
+        ProbeStore: Store using config/probes.json
+    """
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = ProbeStore()
+        return _store
+
+def probe(items, session=None):
+    """
+    Read points and boxes on the screen with one capture.
+
+    For repeated reads of the same probes, build a ProbeSet once instead.
+
+    Args:
+        items (list): Points (x, y) and boxes (left, top, width, height) on the screen
+        session (CaptureSession, optional): Session used for the capture
+
+    Returns:
+        numpy.ndarray: (n, 3) float32 mean BGR colours in probe order
+    """
+    return ProbeSet(items).read(session)
+
+def check_probes(name):
+    """
+    Whether a named probe set shows its recorded colours.
+
+    Args:
+        name (str): Set name
+
+    Returns:
+        bool: True if every probe matches, None if the set was never recorded
+    """
+    return get_probe_store().check(name)
+
+def wait_for_probes(name, timeout=10.0, interval=POLL_INTERVAL):
+    """
+    Wait until a named probe set shows its recorded colours.
+
+    Args:
+        name (str): Set name
+        timeout (float): Seconds to wait at most
+        interval (float): Seconds between checks
+
+    Returns:
+        bool: True once matched, False on timeout, or None if the set was
+            never recorded (the caller should keep its old wait)
+    """
+    store = get_probe_store()
+    if store.get(name) is None:
+        return None
+    deadline = time.monotonic() + timeout
+    while True:
+        if store.check(name):
+            return True
+        if time.monotonic() >= deadline:
+            return False
+        time.sleep(interval)
+
+def _parse_item(text):
+    """Parse 'x,y' or 'left,top,width,height' from the command line."""
+    try:
+        return tuple(int(v) for v in text.split(','))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Invalid probe {text}")
+
+def main():
+    """Command line for recording and testing probe sets."""
+    parser = argparse.ArgumentParser(description="Pixel probes")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    record = commands.add_parser("record", help="Record probes with their current colours")
+    record.add_argument("name")
+    record.add_argument("items", type=_parse_item, nargs="+", metavar="X,Y[,W,H]",
+                        help="Points or boxes in screen coordinates")
+    record.add_argument("--tolerance", type=int, default=DEFAULT_TOLERANCE)
+
+    commands.add_parser("forget", help="Remove a probe set").add_argument("name")
+    show = commands.add_parser("show", help="Read a probe set")
+    show.add_argument("name", nargs="?", help="Set name, lists the sets when omitted")
+    show.add_argument("--watch", action="store_true", help="Keep reading until Ctrl+C")
+
+    args = parser.parse_args()
+    store = get_probe_store()
+
+    if args.command == "record":
+        if not store.record(args.name, args.items, args.tolerance):
+            raise SystemExit(1)
+    elif args.command == "forget":
+        store.forget(args.name)
+    elif args.name is None:
+        for name in store.names():
+            print(f"{name}: {len(store.data[name]['boxes'])} probes")
+    else:
+        probes = store.get(args.name)
+        if probes is None:
+            print(f"No probe set named {args.name}")
+            raise SystemExit(1)
+        session = capture_session()
+        print(f"Region: {probes.region()}")
+        try:
+            while True:
+                start = time.perf_counter()
+                values = probes.read(session)
+                elapsed = (time.perf_counter() - start) * 1000
+                matched = probes.matches(values)
+                print(f"{int(matched.sum())}/{len(matched)} match ({elapsed:.3f} ms): "
+                      f"{np.round(values).astype(int).tolist()}")
+                if not args.watch:
+                    break
+                time.sleep(0.5)
+        except KeyboardInterrupt:
+            pass
+
+# For testing
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,370 @@
+"""
+Screen State Classification
+
+This module tells which interface state the game is in (bank open, bank
+closed, a dialog) so walkers can confirm a transition and continue as soon
+as it happened instead of padding every step with a long random wait.
+
+A capture of the state region is reduced to a small colour thumbnail and
+compared with labelled reference thumbnails; the nearest reference names the
+state. Captures that are far from every reference are 'unknown'.
+
+The state region is stored relative to the client window (see window.py)
+and the default one follows the client like the other default boxes, so the
+thumbnails keep showing the same interface after the client moved.
+
+Files (under config/):
+- screen_states.npz: the state region, reference labels and thumbnails
+
+Key features:
+- current_state(): 'bank_open', 'bank_closed', 'dialog' (or any label that
+  was recorded), 'unknown' when nothing matches or no references exist
+- wait_for_state(): poll until a state is reached, None when the state has
+  no references, so walkers keep their old waits until it is set up
+- Several references per state, e.g. the bank at different scroll positions
+- Command line to record and test references:
+    python -m utils.vision.states label bank_open
+    python -m utils.vision.states show
+
+Performance considerations:
+- The capture is strided before the area resize, so a thumbnail of a large
+  region costs a fraction of a millisecond
+- References are matched by a single matrix product with precomputed norms.
+  A query of the default region takes about 0.5 ms once captured. With the
+  frame bus running the capture is a copy from shared memory, otherwise it
+  depends on the region size (see capture_benchmark.py)
+"""
+
+import os
+import time
+import logging
+import argparse
+import threading
+
+import numpy as np
+import cv2
+
+from .frame_bus import capture_session
+from .window import client_origin, to_client
+
+# Set up logging
+logging.basicConfig(level=logging.INFO,
+                    format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Get the project root directory
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '../..'))
+STATES_FILE = os.path.join(project_root, 'config', 'screen_states.npz')
+
+# Bank window and chat box at 1920x1080 with 45% scaling, in screen
+# coordinates where the default boxes fit (see profiles.default_origin())
+DEFAULT_STATE_REGION = (0, 20, 1120, 1000)
+
+# Classifier settings
+THUMBNAIL_SIZE = (32, 24)      # Width and height of the reference thumbnails
+STRIDE_TARGET = 128            # Strided capture size before the area resize
+MAX_STATE_DISTANCE = 20.0      # Largest RMS colour difference (0-255) to the nearest reference
+POLL_INTERVAL = 0.05           # Seconds between checks in wait_for_state()
+
+UNKNOWN = 'unknown'
+
+def thumbnail_vector(frame):
+    """
+    Reduce a capture to a colour thumbnail vector.
+
+    Args:
+        frame (numpy.ndarray): BGR or BGRA capture of the state region
+
+    Returns:
+        numpy.ndarray: (width * height * 3,) float32 vector of 0-255 values
+    """
+    step = max(1, min(frame.shape[0], frame.shape[1]) // STRIDE_TARGET)
+    strided = np.ascontiguousarray(frame[::step, ::step, :3])
+    small = cv2.resize(strided, THUMBNAIL_SIZE, interpolation=cv2.INTER_AREA)
+    return small.reshape(-1).astype(np.float32)
+
+class StateClassifier:
+    """
+    Nearest-reference classifier of the screen state.
+
+    Example:
+        classifier = StateClassifier()
+        state, distance = classifier.classify()
+        if state == 'bank_open':
+            bank_slot(8)
+    """
+
+    def __init__(self, states_file=STATES_FILE, session=None):
+        """
+        Args:
+            states_file (str): Reference file
+            session (CaptureSession, optional): Session used for captures
+        """
+        self.states_file = states_file
+        self._session = session
+        self._lock = threading.Lock()
+        self.region = DEFAULT_STATE_REGION
+        self.relative = False  # Region relative to the client window
+        self.labels = []
+        self.references = np.zeros((0, THUMBNAIL_SIZE[0] * THUMBNAIL_SIZE[1] * 3), np.float32)
+        self._load()
+
+    # References
+
+    def _load(self):
+        """Read the references, keep none if missing or of another thumbnail size."""
+        try:
+            if not os.path.exists(self.states_file):
+                return
+            with np.load(self.states_file) as data:
+                region, labels, references = data['region'], data['labels'], data['references']
+                relative = bool(data['relative']) if 'relative' in data else False
+        except Exception as e:
+            logger.error(f"Error loading screen states from {self.states_file}: {e}")
+            return
+        if references.shape[1] != self.references.shape[1]:
+            logger.warning("Screen state references use another thumbnail size, record them again")
+            return
+        self.region = tuple(int(v) for v in region)
+        self.relative = relative
+        self.labels = [str(label) for label in labels]
+        self.references = references.astype(np.float32)
+        self._index()
+
+    def _save(self):
+        """Write the references."""
+        try:
+            os.makedirs(os.path.dirname(self.states_file), exist_ok=True)
+            np.savez(self.states_file, region=np.array(self.region), relative=self.relative,
+                     labels=np.array(self.labels), references=self.references)
+            return True
+        except Exception as e:
+            logger.error(f"Error saving screen states: {e}")
+            return False
+
+    def _index(self):
+        """Precompute the squared norms used by the distance product."""
+        self._norms = np.einsum('ij,ij->i', self.references, self.references)
+
+    def states(self):
+        """
+        List the states with references.
+
+        Returns:
+            list: State labels
+        """
+        return sorted(set(self.labels))
+
+    def screen_region(self):
+        """
+        Get the state region on the screen, following moves of the client window.
+
+        Returns:
+            tuple: (left, top, width, height)
+        """
+        if self.relative:
+            dx, dy = client_origin()
+        elif self.region == DEFAULT_STATE_REGION:
+            # Imported here, profiles loads the calibration package
+            from ..calibration.profiles import default_offset
+            dx, dy = default_offset()
+        else:
+            dx, dy = 0, 0  # Recorded in screen coordinates by an older version
+        return self.region[0] + dx, self.region[1] + dy, self.region[2], self.region[3]
+
+    def set_region(self, region):
+        """
+        Change the state region. References of the old region are dropped.
+
+        Args:
+            region (tuple): (left, top, width, height) on the screen captured for
+                every query, stored relative to the client window
+
+        Returns:
+            bool: True if saved
+        """
+        with self._lock:
+            region = tuple(int(v) for v in region)
+            if region == self.screen_region():
+                return True
+            self.region = (*to_client(region[0], region[1]), region[2], region[3])
+            self.relative = True
+            self.labels = []
+            self.references = self.references[:0]
+            self._index()
+            logger.info(f"State region set to {region}, references cleared")
+            return self._save()
+
+    def add(self, label, frame=None):
+        """
+        Record the current screen as a reference of a state.
+
+        Args:
+            label (str): State label, e.g. 'bank_open'
+            frame (numpy.ndarray, optional): Capture of the state region,
+                captured if omitted
+
+        Returns:
+            bool: True if saved
+        """
+        with self._lock:
+            vector = thumbnail_vector(self._grab() if frame is None else frame)
+            self.labels.append(label)
+            self.references = np.vstack([self.references, vector[None, :]])
+            self._index()
+            logger.info(f"Recorded a reference for {label} "
+                        f"({self.labels.count(label)} references)")
+            return self._save()
+
+    def forget(self, label):
+        """
+        Drop every reference of a state.
+
+        Returns:
+            bool: True if saved or the state had no references
+        """
+        with self._lock:
+            keep = [i for i, name in enumerate(self.labels) if name != label]
+            if len(keep) == len(self.labels):
+                return True
+            self.labels = [self.labels[i] for i in keep]
+            self.references = self.references[keep]
+            self._index()
+            return self._save()
+
+    # Queries
+
+    def _grab(self):
+        """Capture the state region."""
+        if self._session is None:
+            self._session = capture_session()
+        return self._session.grab(self.screen_region())
+
+    def classify(self, frame=None):
+        """
+        Name the current screen state.
+
+        Args:
+            frame (numpy.ndarray, optional): Capture of the state region,
+                captured if omitted
+
+        Returns:
+            tuple: (label, RMS distance to the nearest reference). The label is
+                'unknown' when no reference is within MAX_STATE_DISTANCE
+        """
+        with self._lock:
+            if not self.labels:
+                return UNKNOWN, float('inf')
+            try:
+                vector = thumbnail_vector(self._grab() if frame is None else frame)
+            except Exception as e:
+                logger.error(f"Error capturing the state region: {e}")
+                return UNKNOWN, float('inf')
+
+            squared = self._norms - 2.0 * (self.references @ vector) + vector @ vector
+            nearest = int(np.argmin(squared))
+            distance = float(np.sqrt(max(squared[nearest], 0.0) / vector.size))
+            if distance > MAX_STATE_DISTANCE:
+                return UNKNOWN, distance
+            return self.labels[nearest], distance
+
+_classifier = None
+_classifier_lock = threading.Lock()
+
+def get_state_classifier():
+    """
+    Get the shared screen state classifier.
+
+    Returns:
+        StateClassifier: Classifier using config/screen_states.npz
+    """
+    global _classifier
+    with _classifier_lock:
+        if _classifier is None:
+            _classifier = StateClassifier()
+        return _classifier
+
+def current_state(frame=None):
+    """
+    Name the current screen state.
+
+    Args:
+        frame (numpy.ndarray, optional): Capture of the state region
+
+    Returns:
+        str: Recorded label such as 'bank_open', 'bank_closed' or 'dialog',
+            or 'unknown'
+    """
+    return get_state_classifier().classify(frame)[0]
+
+def wait_for_state(state, timeout=10.0, interval=POLL_INTERVAL):
+    """
+    Wait until the screen reaches a state.
+
+    Args:
+        state (str or tuple): State label, or several labels any of which ends the wait
+        timeout (float): Seconds to wait at most
+        interval (float): Seconds between checks
+
+    Returns:
+        bool: True once reached, False on timeout, or None without references
+            for the state (the caller should keep its old wait)
+
+    Example:
+        click()  # the bank booth
+        if wait_for_state('bank_open', timeout=10) is None:
+            sleep(4, 3)
+    """
+    states = (state,) if isinstance(state, str) else tuple(state)
+    classifier = get_state_classifier()
+    if not any(name in classifier.labels for name in states):
+        return None
+
+    deadline = time.monotonic() + timeout
+    while True:
+        if classifier.classify()[0] in states:
+            return True
+        if time.monotonic() >= deadline:
+            return False
+        time.sleep(interval)
+
+def main():
+    """Command line for recording and testing screen states."""
+    parser = argparse.ArgumentParser(description="Screen state classifier")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    label = commands.add_parser("label", help="Record the screen as a reference of a state")
+    label.add_argument("state", help="e.g. bank_open, bank_closed, dialog")
+    label.add_argument("--region", type=int, nargs=4, metavar=("LEFT", "TOP", "WIDTH", "HEIGHT"),
+                       help="Change the state region first (drops all references)")
+
+    commands.add_parser("forget", help="Drop the references of a state").add_argument("state")
+    show = commands.add_parser("show", help="Print the current state")
+    show.add_argument("--watch", action="store_true", help="Keep printing until Ctrl+C")
+
+    args = parser.parse_args()
+    classifier = get_state_classifier()
+
+    if args.command == "label":
+        if args.region:
+            classifier.set_region(args.region)
+        classifier.add(args.state)
+    elif args.command == "forget":
+        classifier.forget(args.state)
+    else:
+        print(f"Region: {classifier.screen_region()}, states: {classifier.states()}")
+        try:
+            while True:
+                start = time.perf_counter()
+                state, distance = classifier.classify()
+                elapsed = (time.perf_counter() - start) * 1000
+                print(f"{state} (distance {distance:.1f}, {elapsed:.2f} ms)")
+                if not args.watch:
+                    break
+                time.sleep(0.5)
+        except KeyboardInterrupt:
+            pass
+
+# For testing
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,486 @@
+"""
+Template Matching for Fixed UI Elements
+
+This module finds fixed interface elements (bank close button, deposit-all
+button, objects the bots click) on screen, so their click boxes follow the
+client instead of being hard-coded for one layout.
+
+Templates are small screenshots of an element, registered once by name.
+Each one has a search region of interest and a set of scales, and the last
+place it was found is remembered and checked first. The ROI and the last hit
+are stored relative to the client window (see window.py), so both follow the
+client when it moves.
+
+Files (all under config/templates/):
+- registry.json: name -> image file, roi, threshold, scales, last hit
+  (roi and last hit relative to the client window)
+- <name>.png: the template image
+- cache/<name>.npz: precomputed template pyramid (every scale, full and half
+  resolution), rebuilt automatically when the image or scales change
+
+Key features:
+- Last-hit check: a capture of just the previous location, about a millisecond
+- Coarse-to-fine search: all scales matched at half resolution over the ROI,
+  then the best candidate refined at full resolution in a small window
+- Grayscale normalized correlation (TM_CCOEFF_NORMED), robust to brightness
+- Command line to capture and test templates:
+    python -m utils.vision.templates capture exit_bank 1075 41 26 24
+    python -m utils.vision.templates locate exit_bank
+
+Performance considerations:
+- The full ROI search costs one capture, one downscale and a matchTemplate
+  per scale at a quarter of the pixels. Keep ROIs tight: a 400x400 ROI with
+  five scales runs in a few milliseconds, a full 1080p screen in tens
+- The pyramid cache avoids resizing templates on every process start and
+  keeps the registry free of derived data
+"""
+
+import os
+import sys
+import json
+import logging
+import argparse
+import threading
+from collections import namedtuple
+
+import numpy as np
+import cv2
+
+from .capture import full_screen_region, grab_region
+from .frame_bus import capture_session
+from .window import client_origin, to_client
+
+# Set up logging
+logging.basicConfig(level=logging.INFO,
+                    format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Get the project root directory
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '../..'))
+TEMPLATE_DIR = os.path.join(project_root, 'config', 'templates')
+REGISTRY_FILE = 'registry.json'
+CACHE_DIR = 'cache'
+
+# Matching settings
+DEFAULT_THRESHOLD = 0.8                       # Minimum correlation for a match
+DEFAULT_SCALES = (0.8, 0.9, 1.0, 1.1, 1.25)   # Template scales searched
+ROI_MARGIN = 200                              # Default ROI padding around a captured template
+HIT_MARGIN = 6                                # Padding of the last-hit window in pixels
+REFINE_MARGIN = 4                             # Padding of the full resolution refinement window
+REFINE_CANDIDATES = 2                         # Best coarse matches refined at full resolution
+MIN_COARSE_SIDE = 8                           # Smaller half-resolution templates are searched at full resolution
+
+Match = namedtuple('Match', ['left', 'top', 'width', 'height', 'score', 'scale'])
+
+def match_box(match):
+    """
+    Convert a match to the (x1, x2, y1, y2) order used by bezier_between().
+
+    Args:
+        match (Match): Located template
+
+    Returns:
+        tuple: (x1, x2, y1, y2) with inclusive integer bounds
+    """
+    return (match.left, match.left + match.width - 1,
+            match.top, match.top + match.height - 1)
+
+def _to_gray(image):
+    """Convert a BGR or BGRA image to grayscale."""
+    if image.ndim == 2:
+        return image
+    code = cv2.COLOR_BGRA2GRAY if image.shape[2] == 4 else cv2.COLOR_BGR2GRAY
+    return cv2.cvtColor(image, code)
+
+def build_pyramid(image, scales):
+    """
+    Build grayscale template versions for every scale, at full and half resolution.
+
+    Args:
+        image (numpy.ndarray): BGR template
+        scales (tuple): Scales to build
+
+    Returns:
+        dict: Array name -> image, 'full_<i>' and 'half_<i>' for scale index i
+    """
+    gray = _to_gray(image)
+    pyramid = {}
+    for i, scale in enumerate(scales):
+        width = max(1, int(round(gray.shape[1] * scale)))
+        height = max(1, int(round(gray.shape[0] * scale)))
+        interpolation = cv2.INTER_AREA if scale < 1 else cv2.INTER_LINEAR
+        full = cv2.resize(gray, (width, height), interpolation=interpolation)
+        pyramid[f'full_{i}'] = full
+        pyramid[f'half_{i}'] = cv2.resize(full, (max(1, width // 2), max(1, height // 2)),
+                                          interpolation=cv2.INTER_AREA)
+    return pyramid
+
+def _best_match(image, template):
+    """Best TM_CCOEFF_NORMED location of a template in an image, or (-1, None)."""
+    if image.shape[0] < template.shape[0] or image.shape[1] < template.shape[1]:
+        return -1.0, None
+    result = cv2.matchTemplate(image, template, cv2.TM_CCOEFF_NORMED)
+    _, score, _, location = cv2.minMaxLoc(result)
+    if not np.isfinite(score):
+        return -1.0, None
+    return score, location
+
+def _clip(region, bounds):
+    """Clip a (left, top, width, height) region to bounds, None if nothing is left."""
+    left = max(region[0], bounds[0])
+    top = max(region[1], bounds[1])
+    right = min(region[0] + region[2], bounds[0] + bounds[2])
+    bottom = min(region[1] + region[3], bounds[1] + bounds[3])
+    if right <= left or bottom <= top:
+        return None
+    return int(left), int(top), int(right - left), int(bottom - top)
+
+def _entry_offset(entry):
+    """
+    Screen offset of the positions stored in a registry entry.
+
+    Returns:
+        tuple: The client origin for entries stored relative to the client,
+            (0, 0) for entries registered before that, which stay absolute
+    """
+    return client_origin() if entry.get('relative') else (0, 0)
+
+class TemplateMatcher:
+    """
+    Registry and search engine for UI templates.
+
+    Example:
+        matcher = TemplateMatcher()
+        match = matcher.locate('exit_bank')
+        if match:
+            bezier_between(*match_box(match))
+    """
+
+    def __init__(self, directory=TEMPLATE_DIR, session=None):
+        """
+        Args:
+            directory (str): Directory holding the registry, images and cache
+            session (CaptureSession, optional): Session used for captures
+        """
+        self.directory = directory
+        self._session = session
+        self._pyramids = {}
+        self._lock = threading.Lock()
+        self.registry = self._load_registry()
+
+    # Registry
+
+    def _registry_path(self):
+        return os.path.join(self.directory, REGISTRY_FILE)
+
+    def _load_registry(self):
+        """Read the registry file, empty if it does not exist."""
+        path = self._registry_path()
+        try:
+            if os.path.exists(path):
+                with open(path, 'r') as f:
+                    return json.load(f)
+        except Exception as e:
+            logger.error(f"Error loading template registry from {path}: {e}")
+        return {}
+
+    def _save_registry(self):
+        """Write the registry file."""
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(self._registry_path(), 'w') as f:
+                json.dump(self.registry, f, indent=4)
+            return True
+        except Exception as e:
+            logger.error(f"Error saving template registry: {e}")
+            return False
+
+    def names(self):
+        """
+        List the registered templates.
+
+        Returns:
+            list: Template names
+        """
+        return sorted(self.registry)
+
+    def register(self, name, image, roi=None, threshold=DEFAULT_THRESHOLD, scales=DEFAULT_SCALES):
+        """
+        Add or replace a template.
+
+        Args:
+            name (str): Template name, e.g. 'exit_bank'
+            image (numpy.ndarray): BGR image of the element
+            roi (tuple, optional): (left, top, width, height) on the screen searched,
+                full screen if None. Stored relative to the client window
+            threshold (float): Minimum correlation for a match
+            scales (tuple): Template scales searched
+
+        Returns:
+            bool: True if the template was saved
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        filename = f"{name}.png"
+        if not cv2.imwrite(os.path.join(self.directory, filename), image):
+            logger.error(f"Failed to write template image for {name}")
+            return False
+
+        if roi is not None:
+            roi = [*to_client(int(roi[0]), int(roi[1])), int(roi[2]), int(roi[3])]
+        self.registry[name] = {
+            'image': filename,
+            'roi': roi,
+            'relative': True,
+            'threshold': threshold,
+            'scales': list(scales),
+            'last_hit': None,
+        }
+        self._pyramids.pop(name, None)
+        logger.info(f"Registered template {name} ({image.shape[1]}x{image.shape[0]})")
+        return self._save_registry()
+
+    def capture(self, name, region, roi_margin=ROI_MARGIN, **kwargs):
+        """
+        Register a template from the current screen contents.
+
+        Args:
+            name (str): Template name
+            region (tuple): (left, top, width, height) of the element on screen
+            roi_margin (int): Padding around the element used as the search ROI
+            **kwargs: threshold and scales, passed to register()
+
+        Returns:
+            bool: True if the template was saved
+        """
+        image = grab_region(region)
+        roi = _clip((region[0] - roi_margin, region[1] - roi_margin,
+                     region[2] + 2 * roi_margin, region[3] + 2 * roi_margin), full_screen_region())
+        return self.register(name, image, roi=roi, **kwargs)
+
+    # Pyramid cache
+
+    def _pyramid(self, name):
+        """Get the pyramid of a template from memory, the disk cache, or by building it."""
+        pyramid = self._pyramids.get(name)
+        if pyramid is not None:
+            return pyramid
+
+        entry = self.registry[name]
+        image_path = os.path.join(self.directory, entry['image'])
+        stat = os.stat(image_path)
+        signature = np.array([stat.st_mtime_ns, stat.st_size] + [int(s * 1000) for s in entry['scales']],
+                             dtype=np.int64)
+        cache_path = os.path.join(self.directory, CACHE_DIR, f"{name}.npz")
+
+        try:
+            with np.load(cache_path) as cached:
+                if np.array_equal(cached['signature'], signature):
+                    pyramid = {key: cached[key] for key in cached.files if key != 'signature'}
+        except (OSError, KeyError, ValueError):
+            pyramid = None
+
+        if pyramid is None:
+            image = cv2.imread(image_path, cv2.IMREAD_COLOR)
+            if image is None:
+                raise IOError(f"Cannot read template image {image_path}")
+            pyramid = build_pyramid(image, entry['scales'])
+            try:
+                os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+                np.savez(cache_path, signature=signature, **pyramid)
+            except OSError as e:
+                logger.warning(f"Could not cache pyramid for {name}: {e}")
+
+        self._pyramids[name] = pyramid
+        return pyramid
+
+    # Search
+
+    def _grab_gray(self, region):
+        """Capture a region as grayscale."""
+        if self._session is None:
+            self._session = capture_session()
+        return _to_gray(self._session.grab(region))
+
+    def _check_last_hit(self, entry, pyramid, roi, offset):
+        """Look for the template at its last location only."""
+        hit = entry.get('last_hit')
+        if not hit:
+            return None
+        left, top, index = hit
+        template = pyramid[f'full_{index}']
+        window = _clip((left + offset[0] - HIT_MARGIN, top + offset[1] - HIT_MARGIN,
+                        template.shape[1] + 2 * HIT_MARGIN, template.shape[0] + 2 * HIT_MARGIN),
+                       roi)
+        if window is None:
+            return None
+        score, location = _best_match(self._grab_gray(window), template)
+        if score < entry['threshold']:
+            return None
+        return Match(window[0] + location[0], window[1] + location[1],
+                     template.shape[1], template.shape[0], score, entry['scales'][index])
+
+    def _search_roi(self, entry, pyramid, roi):
+        """Coarse-to-fine search of every scale over an ROI."""
+        gray = self._grab_gray(roi)
+        half = cv2.resize(gray, (gray.shape[1] // 2, gray.shape[0] // 2), interpolation=cv2.INTER_AREA)
+
+        candidates = []  # (coarse score, full resolution location, scale index)
+        for index in range(len(entry['scales'])):
+            coarse = pyramid[f'half_{index}']
+            if min(coarse.shape) < MIN_COARSE_SIDE:
+                score, location = _best_match(gray, pyramid[f'full_{index}'])
+            else:
+                score, location = _best_match(half, coarse)
+                if location is not None:
+                    location = (location[0] * 2, location[1] * 2)
+            if location is not None:
+                candidates.append((score, location, index))
+
+        # Refine the best candidates at full resolution; half resolution blurs
+        # small templates enough that neighbouring scales can swap places
+        best = None
+        for _, location, index in sorted(candidates, reverse=True)[:REFINE_CANDIDATES]:
+            template = pyramid[f'full_{index}']
+            x0 = max(0, location[0] - REFINE_MARGIN)
+            y0 = max(0, location[1] - REFINE_MARGIN)
+            window = gray[y0:y0 + template.shape[0] + 2 * REFINE_MARGIN,
+                          x0:x0 + template.shape[1] + 2 * REFINE_MARGIN]
+            score, refined = _best_match(window, template)
+            if refined is not None and (best is None or score > best[0].score):
+                best = (Match(roi[0] + x0 + refined[0], roi[1] + y0 + refined[1],
+                              template.shape[1], template.shape[0], score, entry['scales'][index]),
+                        index)
+
+        if best is None or best[0].score < entry['threshold']:
+            return None
+        return best
+
+    def locate(self, name, roi=None):
+        """
+        Find a registered template on screen.
+
+        The last-hit location is checked first. If the template is not there,
+        the ROI is searched at every scale and the last hit is updated.
+
+        Args:
+            name (str): Template name
+            roi (tuple, optional): (left, top, width, height) overriding the registered ROI
+
+        Returns:
+            Match: Located template, or None if not registered or not found
+        """
+        with self._lock:
+            entry = self.registry.get(name)
+            if entry is None:
+                return None
+            offset = _entry_offset(entry)
+            entry_roi = full_screen_region()
+            if entry['roi']:
+                entry_roi = (entry['roi'][0] + offset[0], entry['roi'][1] + offset[1],
+                             entry['roi'][2], entry['roi'][3])
+            try:
+                pyramid = self._pyramid(name)
+                match = self._check_last_hit(entry, pyramid, entry_roi, offset) if roi is None else None
+                if match is not None:
+                    return match
+
+                search_roi = _clip(roi or entry_roi, full_screen_region())
+                if search_roi is None:
+                    return None
+                found = self._search_roi(entry, pyramid, search_roi)
+            except Exception as e:
+                logger.error(f"Error locating template {name}: {e}")
+                return None
+
+            if found is None:
+                logger.debug(f"Template {name} not found")
+                return None
+
+            match, index = found
+            hit = [int(match.left) - offset[0], int(match.top) - offset[1], int(index)]
+            if entry.get('last_hit') != hit:
+                entry['last_hit'] = hit
+                self._save_registry()
+            return match
+
+    def box(self, name, default=None):
+        """
+        Get the click box of a template, or a default box if it is not found.
+
+        Args:
+            name (str): Template name
+            default (tuple, optional): (x1, x2, y1, y2) used when not found
+
+        Returns:
+            tuple: (x1, x2, y1, y2)
+        """
+        match = self.locate(name) if name in self.registry else None
+        return match_box(match) if match is not None else default
+
+_matcher = None
+_matcher_lock = threading.Lock()
+
+def get_template_matcher():
+    """
+    Get the shared template matcher.
+
+    Returns:
+        TemplateMatcher: Matcher using config/templates
+    """
+    global _matcher
+    with _matcher_lock:
+        if _matcher is None:
+            _matcher = TemplateMatcher()
+        return _matcher
+
+def locate_box(name, default):
+    """
+    Get the click box of a UI element, falling back to a hard-coded box.
+
+    Unregistered templates cost nothing beyond a dict lookup, so callers can
+    use this for every element and register templates only where needed.
+
+    Args:
+        name (str): Template name
+        default (tuple): (x1, x2, y1, y2) for the default 1920x1080 layout
+
+    Returns:
+        tuple: (x1, x2, y1, y2)
+    """
+    return get_template_matcher().box(name, default)
+
+def main():
+    """Capture or test templates from the command line."""
+    parser = argparse.ArgumentParser(description="UI template registry")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    capture = commands.add_parser("capture", help="Register a template from the screen")
+    capture.add_argument("name")
+    capture.add_argument("region", type=int, nargs=4, metavar=("LEFT", "TOP", "WIDTH", "HEIGHT"))
+    capture.add_argument("--margin", type=int, default=ROI_MARGIN, help="ROI padding in pixels")
+    capture.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+
+    locate = commands.add_parser("locate", help="Find a registered template")
+    locate.add_argument("name")
+
+    commands.add_parser("list", help="List registered templates")
+    args = parser.parse_args()
+
+    matcher = get_template_matcher()
+    if args.command == "capture":
+        ok = matcher.capture(args.name, args.region, roi_margin=args.margin, threshold=args.threshold)
+        sys.exit(0 if ok else 1)
+    elif args.command == "locate":
+        import time
+        start = time.perf_counter()
+        match = matcher.locate(args.name)
+        elapsed = (time.perf_counter() - start) * 1000
+        print(f"{args.name}: {match_box(match) if match else 'not found'} "
+              f"{f'score {match.score:.3f} scale {match.scale}' if match else ''} ({elapsed:.1f} ms)")
+    else:
+        for name in matcher.names():
+            entry = matcher.registry[name]
+            print(f"{name:<20} roi={entry['roi']} threshold={entry['threshold']} last_hit={entry['last_hit']}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,365 @@
+"""
+Screen Change Watcher
+
+This module lets bots wait for something to happen on screen instead of
+sleeping for a fixed worst-case time. A background thread samples registered
+regions at a fixed rate and keeps a small thumbnail of each, so waiting code
+can continue as soon as a region changes or settles.
+
+Key features:
+- wait_for_change(region, timeout): return as soon as a region changes
+- wait_until_stable(region, stable_for, timeout): return once a region has
+  stopped changing, e.g. when an inventory is done being processed
+- Regions are registered on first use and sampled by one shared thread
+- Without a capture backend the waits fall back to sleeping out the timeout,
+  so bots keep their old timing
+
+Regions follow the capture convention: (left, top, width, height).
+
+Performance considerations:
+- Each sample captures only the region into a reused buffer and keeps a
+  strided thumbnail of at most ~64 pixels per side, so a 10 Hz watch on an
+  inventory costs well under 1% of a core
+- Changes are measured as the fraction of thumbnail pixels whose colour moved
+  by more than PIXEL_TOLERANCE. The mouse cursor alone covers too few pixels to
+  count as a change
+"""
+
+import time
+import logging
+import threading
+import numpy as np
+
+from .frame_bus import capture_session
+
+# Set up logging
+logging.basicConfig(level=logging.INFO,
+                    format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Watcher settings
+SAMPLE_RATE = 10.0         # Samples per second for every registered region
+THUMBNAIL_SIDE = 64        # Thumbnails keep at most this many pixels per side
+PIXEL_TOLERANCE = 24       # Colour difference that counts a thumbnail pixel as changed
+CHANGE_THRESHOLD = 0.005   # Fraction of changed pixels that counts the region as changed
+
+def thumbnail(frame):
+    """
+    Reduce a frame to a small strided thumbnail of its colour channels.
+
+    Args:
+        frame (numpy.ndarray): BGR or BGRA frame
+
+    Returns:
+        numpy.ndarray: Thumbnail with at most THUMBNAIL_SIDE pixels per side (int16)
+    """
+    step = max(1, -(-max(frame.shape[:2]) // THUMBNAIL_SIDE))
+    return frame[::step, ::step, :3].astype(np.int16)
+
+def change_fraction(previous, current):
+    """
+    Fraction of thumbnail pixels that changed between two samples.
+
+    Args:
+        previous (numpy.ndarray): Earlier thumbnail
+        current (numpy.ndarray): Later thumbnail of the same region
+
+    Returns:
+        float: 0.0 (identical) to 1.0 (every pixel changed)
+    """
+    changed = (np.abs(current - previous) > PIXEL_TOLERANCE).any(axis=2)
+    return float(changed.mean())
+
+class _WatchedRegion:
+    """Sampling state of one region."""
+
+    __slots__ = ('region', 'thumbnail', 'sample', 'captured_at', 'last_change', 'last_used')
+
+    def __init__(self, region):
+        self.region = region
+        self.thumbnail = None   # Latest thumbnail
+        self.sample = 0         # Number of samples taken
+        self.captured_at = 0.0  # When the capture of the latest thumbnail started
+        self.last_change = time.monotonic()
+        self.last_used = time.monotonic()
+
+class ScreenWatcher:
+    """
+    Background sampler for screen regions.
+
+    Example:
+        watcher = ScreenWatcher()
+        if watcher.wait_for_change(region, timeout=5):
+            ...   # The region changed within 5 seconds
+        watcher.wait_until_stable(region, stable_for=3, timeout=70)
+    """
+
+    def __init__(self, rate=SAMPLE_RATE, threshold=CHANGE_THRESHOLD, idle_timeout=60.0):
+        """
+        Args:
+            rate (float): Samples per second for every registered region
+            threshold (float): Default changed-pixel fraction for the waits
+            idle_timeout (float): Seconds after which a region nobody waits on is dropped
+        """
+        self.interval = 1.0 / rate
+        self.threshold = threshold
+        self.idle_timeout = idle_timeout
+        self._regions = {}
+        self._condition = threading.Condition()
+        self._thread = None
+        self._running = False
+        self.available = True  # Cleared when capture fails, waits then only sleep
+
+    def start(self):
+        """Start the sampling thread if it is not running."""
+        with self._condition:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._running = True
+            self._thread = threading.Thread(target=self._run, name="ScreenWatcher")
+            self._thread.daemon = True
+            self._thread.start()
+
+    def stop(self):
+        """Stop the sampling thread."""
+        with self._condition:
+            self._running = False
+            self._condition.notify_all()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def register(self, region):
+        """
+        Start sampling a region.
+
+        Args:
+            region (tuple): (left, top, width, height)
+
+        Returns:
+            tuple: The region as a hashable tuple of ints
+        """
+        region = tuple(int(v) for v in region)
+        with self._condition:
+            watched = self._regions.get(region)
+            if watched is None:
+                self._regions[region] = _WatchedRegion(region)
+                self._condition.notify_all()
+            else:
+                watched.last_used = time.monotonic()
+        self.start()
+        return region
+
+    def unregister(self, region):
+        """
+        Stop sampling a region.
+
+        Args:
+            region (tuple): (left, top, width, height)
+        """
+        with self._condition:
+            self._regions.pop(tuple(int(v) for v in region), None)
+
+    def _run(self):
+        """Sampling loop."""
+        session = capture_session()
+        while True:
+            with self._condition:
+                if not self._running:
+                    return
+                now = time.monotonic()
+                for region in [r for r, w in self._regions.items() if now - w.last_used > self.idle_timeout]:
+                    del self._regions[region]
+                    session.release(region)
+                if not self._regions:
+                    self._condition.wait()
+                    continue
+                regions = list(self._regions.values())
+
+            started = time.monotonic()
+            for watched in regions:
+                captured_at = time.monotonic()
+                try:
+                    current = thumbnail(session.grab(watched.region))
+                except Exception as e:
+                    logger.warning(f"Screen watcher capture failed ({e}). Waits will only sleep.")
+                    with self._condition:
+                        self.available = False
+                        self._running = False
+                        self._condition.notify_all()
+                    return
+
+                with self._condition:
+                    previous = watched.thumbnail
+                    if previous is not None and change_fraction(previous, current) > self.threshold:
+                        watched.last_change = time.monotonic()
+                    watched.thumbnail = current
+                    watched.captured_at = captured_at
+                    watched.sample += 1
+                    self._condition.notify_all()
+
+            with self._condition:
+                if self._running:
+                    self._condition.wait(max(0.0, self.interval - (time.monotonic() - started)))
+
+    def _wait(self, region, timeout, done):
+        """
+        Wait until done(watched) is true for a region.
+
+        Args:
+            region (tuple): Region to watch
+            timeout (float): Maximum wait in seconds, None waits forever
+            done (callable): Condition checked after every sample, under the lock
+
+        Returns:
+            bool: True if the condition was met, False on timeout or without capture
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        if self.available:
+            region = self.register(region)
+            with self._condition:
+                while self.available:
+                    watched = self._regions.get(region)
+                    if watched is None:  # Dropped by unregister(), re-add it
+                        watched = self._regions[region] = _WatchedRegion(region)
+                    watched.last_used = time.monotonic()
+                    if done(watched):
+                        return True
+                    remaining = None if deadline is None else deadline - time.monotonic()
+                    if remaining is not None and remaining <= 0:
+                        return False
+                    self._condition.wait(remaining)
+
+        # No capture backend: keep the caller's worst-case timing
+        if deadline is None:
+            raise RuntimeError("Screen capture is unavailable, cannot wait without a timeout")
+        time.sleep(max(0.0, deadline - time.monotonic()))
+        return False
+
+    def wait_for_change(self, region, timeout=None, threshold=None):
+        """
+        Block until a region differs from how it looked when the wait started.
+
+        The reference is the first sample captured after the call, never the
+        watcher's latest thumbnail, which may predate the click being waited on.
+
+        Args:
+            region (tuple): (left, top, width, height)
+            timeout (float, optional): Maximum wait in seconds
+            threshold (float, optional): Changed-pixel fraction, defaults to the watcher's
+
+        Returns:
+            bool: True if the region changed, False on timeout
+        """
+        threshold = self.threshold if threshold is None else threshold
+        started = time.monotonic()
+        baseline = {}
+
+        def changed(watched):
+            if watched.thumbnail is None or watched.captured_at < started:
+                return False
+            if 'thumbnail' not in baseline:
+                # The first sample captured after the call is the reference
+                baseline['thumbnail'] = watched.thumbnail
+                baseline['sample'] = watched.sample
+                return False
+            return (watched.sample != baseline['sample']
+                    and change_fraction(baseline['thumbnail'], watched.thumbnail) > threshold)
+
+        return self._wait(region, timeout, changed)
+
+    def wait_until_stable(self, region, stable_for=1.0, timeout=None):
+        """
+        Block until a region has not changed for stable_for seconds.
+
+        Args:
+            region (tuple): (left, top, width, height)
+            stable_for (float): Seconds without change that count as stable
+            timeout (float, optional): Maximum wait in seconds
+
+        Returns:
+            bool: True if the region became stable, False on timeout
+        """
+        started = time.monotonic()
+
+        def stable(watched):
+            if watched.thumbnail is None:
+                return False
+            return time.monotonic() - max(watched.last_change, started) >= stable_for
+
+        return self._wait(region, timeout, stable)
+
+_watcher = None
+_watcher_lock = threading.Lock()
+
+def get_screen_watcher():
+    """
+    Get the shared screen watcher.
+
+    Returns:
+        ScreenWatcher: The shared watcher (its thread starts on first wait)
+    """
+    global _watcher
+    with _watcher_lock:
+        if _watcher is None:
+            _watcher = ScreenWatcher()
+        return _watcher
+
+def wait_for_change(region, timeout=None, threshold=None):
+    """
+    Block until a region changes. See ScreenWatcher.wait_for_change().
+
+    Example:
+        click()
+        wait_for_change(inventory_region(config), timeout=0.9)  # Ore arrived or gave up
+    """
+    return get_screen_watcher().wait_for_change(region, timeout, threshold)
+
+def wait_until_stable(region, stable_for=1.0, timeout=None):
+    """
+    Block until a region stops changing. See ScreenWatcher.wait_until_stable().
+
+    Example:
+        wait_until_stable(inventory_region(config), stable_for=5, timeout=69)
+    """
+    return get_screen_watcher().wait_until_stable(region, stable_for, timeout)
+
+def wait_until_done(region, timeout, stable_for, start_timeout=10.0):
+    """
+    Wait for an activity that changes a region and then stops, such as burning
+    or smithing a full inventory.
+
+    Waits for the region to start changing, then for it to settle, never
+    longer than timeout in total. If nothing starts changing within
+    start_timeout, the activity is assumed to run without visible progress
+    and the rest of the timeout is slept out.
+
+    stable_for has no default: it must cover the longest pause the activity
+    makes between two visible changes, which only the calling bot knows.
+
+    Args:
+        region (tuple): (left, top, width, height)
+        timeout (float): Maximum total wait in seconds (the old fixed sleep)
+        stable_for (float): Seconds without change that mark the activity as done
+        start_timeout (float): Maximum wait for the first change
+
+    Returns:
+        bool: True if the activity was seen to finish early, False on timeout
+    """
+    deadline = time.monotonic() + timeout
+    watcher = get_screen_watcher()
+    if not watcher.wait_for_change(region, min(start_timeout, timeout)):
+        time.sleep(max(0.0, deadline - time.monotonic()))
+        return False
+    return watcher.wait_until_stable(region, stable_for, max(0.0, deadline - time.monotonic()))
+
+# For testing
+if __name__ == "__main__":
+    from .capture import bottom_right_quadrant
+
+    print("Screen Change Watcher")
+    print("---------------------")
+    region = bottom_right_quadrant()
+    print(f"Move a window in {region} within 10 seconds...")
+    print(f"Changed: {wait_for_change(region, timeout=10)}")
+    print(f"Stable: {wait_until_stable(region, stable_for=2, timeout=10)}")
@@ -0,0 +1,383 @@
+"""
+Game Client Window Locator
+
+This module finds the game client window on X11 and keeps track of its
+geometry, so captures can cover only the client and coordinates can be
+measured relative to the client instead of the desktop. Moving the window
+then shifts every slot and button by the same offset instead of costing a
+recalibration.
+
+The client is found through the window manager's _NET_CLIENT_LIST (EWMH) by
+its title. Its geometry is read once with TranslateCoordinates and cached. A
+background thread selects StructureNotify events on the window and refreshes
+the cache on every ConfigureNotify, so reading the geometry never talks to
+the X server.
+
+Key features:
+- client_geometry(): (left, top, width, height) of the client, None when no
+  client window is found or python-xlib is not installed
+- client_origin(), to_screen(), to_client(): translate between client and
+  screen coordinates, the identity without a client window
+- client_region() and client_quadrant(): capture regions of the client,
+  falling back to the full screen and its bottom right quadrant
+- Titles searched for are CLIENT_TITLES, or OSWS_CLIENT_TITLE when set
+- Command line to check what was found:
+    python -m utils.vision.window
+    python -m utils.vision.window --watch
+
+Performance considerations:
+- Lookups return the cached geometry, an attribute read under a lock
+- While no client is found, the window list is searched again at most every
+  SEARCH_INTERVAL seconds
+- The watcher waits on the X connection with select(), it costs nothing
+  while the window stays put
+"""
+
+import os
+import time
+import select
+import logging
+import argparse
+import threading
+
+try:
+    from Xlib import X
+    from Xlib import display as xdisplay
+    from Xlib.error import XError
+except ImportError:
+    X = None
+    xdisplay = None
+    XError = Exception
+
+from .capture import full_screen_region, bottom_right_quadrant
+
+# Set up logging
+logging.basicConfig(level=logging.INFO,
+                    format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Window titles of the game client, matched as substrings
+CLIENT_TITLES = ('RuneLite', 'Old School RuneScape')
+TITLE_ENV = 'OSWS_CLIENT_TITLE'
+
+# Locator settings
+SEARCH_INTERVAL = 5.0      # Seconds between searches while no client is found
+WATCH_TIMEOUT = 0.5        # Seconds the watcher waits for events before checking for stop
+
+def client_titles():
+    """
+    Get the window titles searched for.
+
+    Returns:
+        tuple: Title substrings, OSWS_CLIENT_TITLE if set, else CLIENT_TITLES
+    """
+    title = os.environ.get(TITLE_ENV)
+    return (title,) if title else CLIENT_TITLES
+
+class ClientLocator:
+    """
+    Cached geometry of the game client window.
+
+    Example:
+        locator = ClientLocator()
+        x, y = locator.to_screen(520, 160)   # Client to screen coordinates
+    """
+
+    def __init__(self, titles=None, watch=True):
+        """
+        Args:
+            titles (tuple, optional): Title substrings, defaults to client_titles()
+            watch (bool): Follow moves and resizes with a ConfigureNotify watcher
+        """
+        self.titles = tuple(titles) if titles else client_titles()
+        self.watch = watch
+        self._lock = threading.Lock()
+        self._display = None
+        self._window_id = None
+        self._geometry = None
+        self._last_search = None
+        self._thread = None
+        self._stop = threading.Event()
+
+    # X11 queries
+
+    def _connect(self):
+        """Open the X connection of the locator, None if X11 is unavailable."""
+        if self._display is None and xdisplay is not None:
+            try:
+                self._display = xdisplay.Display()
+            except Exception as e:
+                logger.warning(f"Cannot connect to the X server ({e}). Using screen coordinates.")
+        return self._display
+
+    @staticmethod
+    def _title(display, window):
+        """Title of a window, _NET_WM_NAME first, then WM_NAME."""
+        prop = window.get_full_property(display.intern_atom('_NET_WM_NAME'),
+                                        display.intern_atom('UTF8_STRING'))
+        if prop is not None and prop.value:
+            value = prop.value
+            return value.decode('utf-8', 'replace') if isinstance(value, bytes) else str(value)
+        name = window.get_wm_name()
+        if isinstance(name, bytes):
+            return name.decode('latin-1')
+        return name or ''
+
+    @staticmethod
+    def _geometry_of(display, window):
+        """Screen rectangle of a window, translated through any window manager frame."""
+        root = display.screen().root
+        geometry = window.get_geometry()
+        origin = root.translate_coords(window, 0, 0)
+        return int(origin.x), int(origin.y), int(geometry.width), int(geometry.height)
+
+    def find(self):
+        """
+        Search the window manager's client list for the game client.
+
+        Returns:
+            tuple: (window id, (left, top, width, height)), or None if not found
+        """
+        display = self._connect()
+        if display is None:
+            return None
+        try:
+            root = display.screen().root
+            clients = root.get_full_property(display.intern_atom('_NET_CLIENT_LIST'),
+                                             X.AnyPropertyType)
+            if clients is not None:
+                window_ids = list(clients.value)
+            else:  # Window manager without EWMH, look at the top level windows
+                window_ids = [child.id for child in root.query_tree().children]
+
+            for window_id in window_ids:
+                window = display.create_resource_object('window', window_id)
+                title = self._title(display, window)
+                if any(t in title for t in self.titles):
+                    geometry = self._geometry_of(display, window)
+                    logger.info(f"Found game client '{title}' at {geometry}")
+                    return window_id, geometry
+        except XError as e:
+            logger.error(f"Error searching for the game client: {e}")
+        return None
+
+    # Cached geometry
+
+    def geometry(self):
+        """
+        Get the client geometry.
+
+        Returns:
+            tuple: (left, top, width, height), or None if no client was found
+        """
+        with self._lock:
+            if self._geometry is not None:
+                return self._geometry
+            now = time.monotonic()
+            if self._last_search is not None and now - self._last_search < SEARCH_INTERVAL:
+                return None
+            self._last_search = now
+            found = self.find()
+            if found is None:
+                return None
+            self._window_id, self._geometry = found
+            if self.watch:
+                self._start_watcher()
+            return self._geometry
+
+    def forget(self):
+        """Drop the cached geometry, the next lookup searches again."""
+        with self._lock:
+            self._geometry = None
+            self._window_id = None
+            self._last_search = None
+            self.stop()
+
+    def origin(self):
+        """
+        Get the top-left corner of the client on the screen.
+
+        Returns:
+            tuple: (left, top), (0, 0) without a client window
+        """
+        geometry = self.geometry()
+        return (0, 0) if geometry is None else geometry[:2]
+
+    def to_screen(self, x, y):
+        """Translate client coordinates to screen coordinates."""
+        left, top = self.origin()
+        return x + left, y + top
+
+    def to_client(self, x, y):
+        """Translate screen coordinates to client coordinates."""
+        left, top = self.origin()
+        return x - left, y - top
+
+    # ConfigureNotify watcher
+
+    def _start_watcher(self):
+        """Start the watcher thread for the current window, called with the lock held."""
+        if self._thread is not None and self._thread.is_alive():
+            if not self._stop.is_set():
+                return
+            self._thread.join(2 * WATCH_TIMEOUT)  # Watcher of a forgotten window
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._watch, args=(self._window_id,),
+                                        name="ClientLocator", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the watcher thread."""
+        self._stop.set()
+
+    def _watch(self, window_id):
+        """Follow ConfigureNotify events of the client on a connection of its own."""
+        try:
+            display = xdisplay.Display()
+            window = display.create_resource_object('window', window_id)
+            window.change_attributes(event_mask=X.StructureNotifyMask)
+            display.flush()
+        except Exception as e:
+            logger.warning(f"Cannot watch the game client ({e}). Moves are not followed.")
+            return
+
+        try:
+            while not self._stop.is_set():
+                readable, _, _ = select.select([display], [], [], WATCH_TIMEOUT)
+                if not readable and not display.pending_events():
+                    continue
+                moved = False
+                while display.pending_events():
+                    event = display.next_event()
+                    if event.type == X.DestroyNotify:
+                        logger.info("Game client window closed")
+                        with self._lock:
+                            self._geometry = None
+                            self._window_id = None
+                        return
+                    moved = moved or event.type == X.ConfigureNotify
+                if moved:
+                    # Event coordinates are relative to the parent frame, read them again
+                    geometry = self._geometry_of(display, window)
+                    with self._lock:
+                        if geometry != self._geometry:
+                            logger.info(f"Game client moved to {geometry}")
+                            self._geometry = geometry
+        except XError as e:
+            logger.warning(f"Stopped watching the game client: {e}")
+            with self._lock:
+                self._geometry = None
+        finally:
+            display.close()
+
+_locator = None
+_locator_lock = threading.Lock()
+
+def get_client_locator():
+    """
+    Get the shared client locator.
+
+    Returns:
+        ClientLocator: Locator watching the client window
+    """
+    global _locator
+    with _locator_lock:
+        if _locator is None:
+            _locator = ClientLocator()
+        return _locator
+
+def client_geometry():
+    """
+    Get the geometry of the game client window.
+
+    Returns:
+        tuple: (left, top, width, height), or None without a client window
+    """
+    return get_client_locator().geometry()
+
+def client_origin():
+    """
+    Get the top-left corner of the game client on the screen.
+
+    Returns:
+        tuple: (left, top), (0, 0) without a client window
+    """
+    return get_client_locator().origin()
+
+def to_screen(x, y):
+    """
+    Translate client coordinates to screen coordinates.
+
+    Args:
+        x, y: Position relative to the client's top-left corner
+
+    Returns:
+        tuple: (x, y) on the screen
+    """
+    return get_client_locator().to_screen(x, y)
+
+def to_client(x, y):
+    """
+    Translate screen coordinates to client coordinates.
+
+    Args:
+        x, y: Position on the screen
+
+    Returns:
+        tuple: (x, y) relative to the client's top-left corner
+    """
+    return get_client_locator().to_client(x, y)
+
+def client_region():
+    """
+    Get the capture region of the game client.
+
+    Returns:
+        tuple: (left, top, width, height) of the client, or of the full
+            screen without a client window
+    """
+    geometry = client_geometry()
+    return geometry if geometry is not None else full_screen_region()
+
+def client_quadrant():
+    """
+    Get the bottom right quarter of the game client, where the inventory is.
+
+    Returns:
+        tuple: (left, top, width, height), the screen's bottom right quadrant
+            without a client window
+    """
+    geometry = client_geometry()
+    if geometry is None:
+        return bottom_right_quadrant()
+    left, top, width, height = geometry
+    return (left + width // 2, top + height // 2,
+            width - width // 2, height - height // 2)
+
+def main():
+    """Print the client geometry, optionally following it."""
+    parser = argparse.ArgumentParser(description="Game client window locator")
+    parser.add_argument("--watch", action="store_true", help="Keep printing moves until Ctrl+C")
+    args = parser.parse_args()
+
+    if xdisplay is None:
+        print("python-xlib is not installed, coordinates are screen coordinates")
+    print(f"Searching for windows titled {client_titles()}")
+    geometry = client_geometry()
+    print(f"Client: {geometry}")
+    print(f"Capture region: {client_region()}, inventory quadrant: {client_quadrant()}")
+    if not args.watch or geometry is None:
+        return
+    try:
+        while True:
+            time.sleep(0.5)
+            current = client_geometry()
+            if current != geometry:
+                print(f"Client: {current}")
+                geometry = current
+    except KeyboardInterrupt:
+        pass
+
+# For testing
+if __name__ == "__main__":
+    main()